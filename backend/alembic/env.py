@@ -10,9 +10,13 @@ from alembic import context
 from sqlmodel import SQLModel
 from app.core.config import get_settings
 from app.models.user import User  # Import models to register them
-# Import other models if needed for metadata registration
-# from app.models.project import Project
-# from app.models.layer import Layer
+from app.models.company import Company
+from app.models.user_company import UserCompany
+from app.models.project import Project
+from app.models.layer import Layer
+from app.models.export import LayerExport
+from app.models.job import Job
+from app.models.example_model import ExampleModel
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,53 @@
+"""create_jobs_table
+
+Revision ID: 3b7e1d9f5a20
+Revises: 8c2f4a6d19e7
+Create Date: 2026-10-17 23:41:12.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1d9f5a20'
+down_revision: Union[str, Sequence[str], None] = '8c2f4a6d19e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("layer_id", sa.Integer(), nullable=True),
+        sa.Column("params", sa.JSON(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("progress_done", sa.Integer(), nullable=False),
+        sa.Column("progress_total", sa.Integer(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("worker", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["layer_id"], ["layers.id"], ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index(op.f("ix_jobs_layer_id"), "jobs", ["layer_id"], unique=False)
+    op.create_index(op.f("ix_jobs_project_id"), "jobs", ["project_id"], unique=False)
+    op.create_index(op.f("ix_jobs_status"), "jobs", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_jobs_status"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_project_id"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_layer_id"), table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,28 @@
+"""add_layer_pyramid_zooms
+
+Revision ID: 5e0a9c3b71d4
+Revises: d41c8e7f2a63
+Create Date: 2026-10-17 20:41:52.117390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0a9c3b71d4'
+down_revision: Union[str, Sequence[str], None] = 'd41c8e7f2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing layers have no pyramid and keep being read at full resolution
+    op.add_column("layers", sa.Column("pyramid_zooms", sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("layers") as batch_op:
+        batch_op.drop_column("pyramid_zooms")
@@ -0,0 +1,41 @@
+"""create_layer_exports_table
+
+Revision ID: 8c2f4a6d19e7
+Revises: 5e0a9c3b71d4
+Create Date: 2026-10-17 22:15:40.318226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f4a6d19e7'
+down_revision: Union[str, Sequence[str], None] = '5e0a9c3b71d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "layer_exports",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("layer_id", sa.Integer(), nullable=False),
+        sa.Column("format", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("features", sa.Integer(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=True),
+        sa.Column("error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["layer_id"], ["layers.id"], ),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index(op.f("ix_layer_exports_layer_id"), "layer_exports", ["layer_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_layer_exports_layer_id"), table_name="layer_exports")
+    op.drop_table("layer_exports")
@@ -0,0 +1,31 @@
+"""add_layer_version
+
+Revision ID: a94f2c6e8d31
+Revises: 3b7e1d9f5a20
+Create Date: 2026-10-18 00:52:07.481963
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a94f2c6e8d31'
+down_revision: Union[str, Sequence[str], None] = '3b7e1d9f5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing layers start at version 1, last modified now
+    op.add_column("layers", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+    op.add_column(
+        "layers", sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("layers") as batch_op:
+        batch_op.drop_column("updated_at")
+        batch_op.drop_column("version")
@@ -0,0 +1,434 @@
+"""store_geometries_as_wkb
+
+Revision ID: b7d4e2a91c05
+Revises: 63391d50b833
+Create Date: 2026-10-17 10:12:40.512318
+
+"""
+import re
+import struct
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e2a91c05'
+down_revision: Union[str, Sequence[str], None] = '63391d50b833'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+# --- Geometry encodings -----------------------------------------------------
+# A frozen copy of the WKT, WKB and TWKB code this revision was written
+# against, so later changes to app.services.geometry or app.services.wkb do
+# not change what it reads and writes.
+
+Geometry = Dict[str, Any]
+
+
+class GeometryError(ValueError):
+    pass
+
+
+_WKT_TYPES = {
+    "POINT": "Point",
+    "LINESTRING": "LineString",
+    "POLYGON": "Polygon",
+    "MULTIPOINT": "MultiPoint",
+    "MULTILINESTRING": "MultiLineString",
+    "MULTIPOLYGON": "MultiPolygon",
+    "GEOMETRYCOLLECTION": "GeometryCollection",
+}
+_DEPTH = {"Point": 0, "LineString": 1, "MultiPoint": 1, "Polygon": 2, "MultiLineString": 2, "MultiPolygon": 3}
+_WKB_CODES = {name: code for code, name in enumerate(_WKT_TYPES.values(), start=1)}
+_WKB_TYPES = {code: name for name, code in _WKB_CODES.items()}
+_WKT_TOKEN = re.compile(r"\s*([A-Za-z]+|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[(),])")
+
+
+class _WKTParser:
+    def __init__(self, text: str):
+        text = text.strip()
+        self.tokens: List[str] = []
+        pos = 0
+        while pos < len(text):
+            match = _WKT_TOKEN.match(text, pos)
+            if not match:
+                raise GeometryError(f"Invalid WKT near: {text[pos:pos + 20]!r}")
+            self.tokens.append(match.group(1))
+            pos = match.end()
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token.upper() != expected):
+            raise GeometryError(f"Expected {expected!r} in WKT, got {token!r}")
+        self.pos += 1
+        return token
+
+    def is_empty(self) -> bool:
+        if self.peek() and self.peek().upper() == "EMPTY":
+            self.pos += 1
+            return True
+        return False
+
+    def geometry(self) -> Geometry:
+        keyword = self.take().upper()
+        if keyword not in _WKT_TYPES:
+            raise GeometryError(f"Unsupported WKT geometry type: {keyword}")
+        while self.peek() and self.peek().upper() in ("Z", "M", "ZM"):
+            self.pos += 1
+        geom_type = _WKT_TYPES[keyword]
+        if geom_type == "GeometryCollection":
+            return {"type": geom_type, "geometries": [] if self.is_empty() else self.sequence(self.geometry)}
+        if self.is_empty():
+            return {"type": geom_type, "coordinates": []}
+        if geom_type == "Point":
+            return {"type": geom_type, "coordinates": self.sequence(self.coordinate)[0]}
+        if geom_type == "MultiPoint":
+            return {"type": geom_type, "coordinates": self.sequence(self.multipoint_member)}
+        return {"type": geom_type, "coordinates": self.nested(_DEPTH[geom_type])}
+
+    def sequence(self, item) -> List[Any]:
+        self.take("(")
+        items = [item()]
+        while self.peek() == ",":
+            self.take(",")
+            items.append(item())
+        self.take(")")
+        return items
+
+    def nested(self, depth: int) -> List[Any]:
+        return self.sequence(self.coordinate if depth == 1 else lambda: self.nested(depth - 1))
+
+    def coordinate(self) -> List[float]:
+        values = []
+        while self.peek() not in (",", ")", None):
+            try:
+                values.append(float(self.take()))
+            except ValueError:
+                raise GeometryError("Invalid coordinate in WKT")
+        if len(values) < 2:
+            raise GeometryError("Coordinates need at least two dimensions")
+        return values
+
+    def multipoint_member(self) -> List[float]:
+        if self.peek() == "(":
+            return self.sequence(self.coordinate)[0]
+        return self.coordinate()
+
+
+def parse_wkt(text: str) -> Geometry:
+    if text.upper().startswith("SRID="):
+        if ";" not in text:
+            raise GeometryError("EWKT SRID prefix must end with ';'")
+        text = text.split(";", 1)[1]
+    parser = _WKTParser(text)
+    geometry = parser.geometry()
+    if parser.peek() is not None:
+        raise GeometryError("Unexpected trailing content in WKT")
+    return geometry
+
+
+def _format_number(value: float) -> str:
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+def _format_coordinates(coordinates: Any, depth: int) -> str:
+    if depth == 0:
+        return " ".join(_format_number(v) for v in coordinates)
+    return "(" + ", ".join(_format_coordinates(c, depth - 1) for c in coordinates) + ")"
+
+
+def to_wkt(geometry: Geometry) -> str:
+    geom_type = geometry["type"]
+    keyword = geom_type.upper()
+    if geom_type == "GeometryCollection":
+        members = geometry.get("geometries") or []
+        return f"{keyword} (" + ", ".join(to_wkt(g) for g in members) + ")" if members else f"{keyword} EMPTY"
+    if geom_type not in _DEPTH:
+        raise GeometryError(f"Unsupported geometry type: {geom_type}")
+    coordinates = geometry.get("coordinates")
+    if not coordinates:
+        return f"{keyword} EMPTY"
+    if geom_type == "Point":
+        return f"{keyword} ({_format_coordinates(coordinates, 0)})"
+    return f"{keyword} {_format_coordinates(coordinates, _DEPTH[geom_type])}"
+
+
+def _first_position(geometry: Geometry) -> Optional[List[float]]:
+    if geometry["type"] == "GeometryCollection":
+        for member in geometry.get("geometries") or []:
+            position = _first_position(member)
+            if position is not None:
+                return position
+        return None
+    coordinates = geometry.get("coordinates")
+    for _ in range(_DEPTH.get(geometry["type"], 0)):
+        if not coordinates:
+            return None
+        coordinates = coordinates[0]
+    return coordinates or None
+
+
+def _write_wkb(geometry: Geometry, dims: int, out: List[bytes]) -> None:
+    geom_type = geometry["type"]
+    if geom_type not in _WKB_CODES:
+        raise GeometryError(f"Unsupported geometry type: {geom_type}")
+    out.append(struct.pack("<BI", 1, _WKB_CODES[geom_type] + (1000 if dims == 3 else 0)))
+    fmt = "<" + "d" * dims
+
+    def position(p):
+        return struct.pack(fmt, *(list(p[:dims]) + [0.0] * (dims - len(p))))
+
+    def sequence(points):
+        out.append(struct.pack("<I", len(points)))
+        out.extend(position(p) for p in points)
+
+    coordinates = geometry.get("coordinates")
+    if geom_type == "GeometryCollection":
+        members = geometry.get("geometries") or []
+        out.append(struct.pack("<I", len(members)))
+        for member in members:
+            _write_wkb(member, dims, out)
+    elif geom_type == "Point":
+        out.append(position(coordinates) if coordinates else struct.pack(fmt, *([float("nan")] * dims)))
+    elif geom_type == "LineString":
+        sequence(coordinates or [])
+    elif geom_type == "Polygon":
+        out.append(struct.pack("<I", len(coordinates or [])))
+        for ring in coordinates or []:
+            sequence(ring)
+    else:
+        out.append(struct.pack("<I", len(coordinates or [])))
+        for member in coordinates or []:
+            _write_wkb({"type": geom_type[5:], "coordinates": member}, dims, out)
+
+
+def to_wkb(geometry: Geometry) -> bytes:
+    out: List[bytes] = []
+    position = _first_position(geometry)
+    _write_wkb(geometry, 3 if position and len(position) > 2 else 2, out)
+    return b"".join(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def unpack(self, fmt: str):
+        try:
+            values = struct.unpack_from(fmt, self.data, self.pos)
+        except struct.error:
+            raise GeometryError("Truncated WKB")
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            if self.pos >= len(self.data):
+                raise GeometryError("Truncated TWKB")
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return result
+
+    def svarint(self) -> int:
+        value = self.varint()
+        return (value >> 1) ^ -(value & 1)
+
+
+def _read_wkb(reader: _Reader) -> Geometry:
+    (byte_order,) = reader.unpack("B")
+    if byte_order not in (0, 1):
+        raise GeometryError("Invalid WKB byte order")
+    endian = "<" if byte_order == 1 else ">"
+    (code,) = reader.unpack(endian + "I")
+    has_z, has_m = bool(code & 0x80000000), bool(code & 0x40000000)
+    if code & 0x20000000:
+        reader.unpack(endian + "I")
+    code &= 0x0FFFFFFF
+    has_z = has_z or code >= 3000 or 1000 <= code < 2000
+    has_m = has_m or code >= 2000
+    geom_type = _WKB_TYPES.get(code % 1000)
+    if geom_type is None:
+        raise GeometryError(f"Unsupported WKB geometry code: {code}")
+    fmt = endian + "d" * (2 + has_z + has_m)
+
+    def position():
+        values = reader.unpack(fmt)
+        return list(values[:3]) if has_z else list(values[:2])
+
+    def sequence():
+        (count,) = reader.unpack(endian + "I")
+        return [position() for _ in range(count)]
+
+    if geom_type == "Point":
+        coordinates = position()
+        return {"type": "Point", "coordinates": [] if coordinates[0] != coordinates[0] else coordinates}
+    if geom_type == "LineString":
+        return {"type": geom_type, "coordinates": sequence()}
+    (count,) = reader.unpack(endian + "I")
+    if geom_type == "Polygon":
+        return {"type": geom_type, "coordinates": [sequence() for _ in range(count)]}
+    members = [_read_wkb(reader) for _ in range(count)]
+    if geom_type == "GeometryCollection":
+        return {"type": geom_type, "geometries": members}
+    return {"type": geom_type, "coordinates": [m["coordinates"] for m in members]}
+
+
+def _read_twkb(reader: _Reader) -> Geometry:
+    if reader.pos + 2 > len(reader.data):
+        raise GeometryError("Truncated TWKB")
+    header, metadata = reader.data[reader.pos], reader.data[reader.pos + 1]
+    reader.pos += 2
+    geom_type = _WKB_TYPES.get(header & 0x0F)
+    if geom_type is None:
+        raise GeometryError("Unsupported TWKB geometry type")
+    zigzag_precision = header >> 4
+    scale = 10.0 ** ((zigzag_precision >> 1) ^ -(zigzag_precision & 1))
+    if metadata & 0x08:
+        raise GeometryError("TWKB with extended dimensions is not supported")
+    if metadata & 0x10:
+        return {"type": geom_type, "geometries" if geom_type == "GeometryCollection" else "coordinates": []}
+    for _ in range(4 if metadata & 0x01 else 0):
+        reader.varint()
+    if metadata & 0x02:
+        reader.varint()
+
+    def count_and_ids() -> int:
+        count = reader.varint()
+        for _ in range(count if metadata & 0x04 else 0):
+            reader.varint()
+        return count
+
+    if geom_type == "GeometryCollection":
+        return {"type": geom_type, "geometries": [_read_twkb(reader) for _ in range(count_and_ids())]}
+    last = [0, 0]
+
+    def positions(count):
+        points = []
+        for _ in range(count):
+            last[0] += reader.svarint()
+            last[1] += reader.svarint()
+            points.append([last[0] / scale, last[1] / scale])
+        return points
+
+    def rings():
+        return [positions(reader.varint()) for _ in range(reader.varint())]
+
+    if geom_type == "Point":
+        return {"type": geom_type, "coordinates": positions(1)[0]}
+    if geom_type == "LineString":
+        return {"type": geom_type, "coordinates": positions(reader.varint())}
+    if geom_type == "Polygon":
+        return {"type": geom_type, "coordinates": rings()}
+    count = count_and_ids()
+    if geom_type == "MultiPoint":
+        return {"type": geom_type, "coordinates": positions(count)}
+    if geom_type == "MultiLineString":
+        return {"type": geom_type, "coordinates": [positions(reader.varint()) for _ in range(count)]}
+    return {"type": geom_type, "coordinates": [rings() for _ in range(count)]}
+
+
+def decode_geometry(data: bytes) -> Geometry:
+    """
+    Decode a stored geometry: WKB, or TWKB prefixed with b"T".
+    """
+    data = bytes(data)
+    if data[:1] == b"T":
+        return _read_twkb(_Reader(data, 1))
+    return _read_wkb(_Reader(data))
+
+
+def _geometry_tables() -> List[str]:
+    """
+    example_layer and the per-layer data tables. None of them were created by a
+    migration (create_all and the ingest service made them), so each one is
+    only converted if it exists.
+    """
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = []
+    if inspector.has_table("example_layer"):
+        tables.append("example_layer")
+    if inspector.has_table("layers"):
+        names = bind.execute(sa.text("SELECT data_table FROM layers")).scalars().all()
+        tables.extend(name for name in names if inspector.has_table(name))
+    return tables
+
+
+def _geom_is_binary(table_name: str) -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns(table_name)
+    geom = next((c for c in columns if c["name"] == "geom"), None)
+    return geom is not None and isinstance(geom["type"], sa.LargeBinary)
+
+
+def _has_postgis() -> bool:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    return bind.execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is not None
+
+
+def _convert(table_name: str, new_type: sa.types.TypeEngine, convert: Callable) -> None:
+    """
+    Rewrite the geom column of a table through ``convert``, in id order batches.
+    Values that cannot be converted become NULL.
+    """
+    bind = op.get_bind()
+    op.add_column(table_name, sa.Column("geom_new", new_type, nullable=True))
+
+    table = sa.table(table_name, sa.column("id", sa.Integer), sa.column("geom"), sa.column("geom_new", new_type))
+    update = table.update().where(table.c.id == sa.bindparam("row_id")).values(geom_new=sa.bindparam("value"))
+    last_id = None
+    while True:
+        query = sa.select(table.c.id, table.c.geom).where(table.c.geom.is_not(None)).order_by(table.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        params = []
+        for row_id, geom in rows:
+            try:
+                value = convert(geom)
+            except GeometryError:
+                value = None
+            params.append({"row_id": row_id, "value": value})
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table(table_name) as batch_op:
+        batch_op.drop_column("geom")
+        batch_op.alter_column("geom_new", new_column_name="geom")
+
+
+def upgrade() -> None:
+    postgis = _has_postgis()
+    for table_name in _geometry_tables():
+        if _geom_is_binary(table_name):
+            continue
+        if postgis:
+            op.execute(
+                f'ALTER TABLE "{table_name}" ALTER COLUMN geom TYPE bytea '
+                "USING ST_AsBinary(ST_GeomFromEWKT(geom))"
+            )
+        else:
+            _convert(table_name, sa.LargeBinary(), lambda geom: to_wkb(parse_wkt(geom)))
+
+
+def downgrade() -> None:
+    for table_name in _geometry_tables():
+        if _geom_is_binary(table_name):
+            _convert(table_name, sa.Text(), lambda geom: to_wkt(decode_geometry(geom)))
@@ -0,0 +1,59 @@
+"""create_project_and_layer_tables
+
+Revision ID: d41c8e7f2a63
+Revises: b7d4e2a91c05
+Create Date: 2026-10-17 14:03:11.208734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c8e7f2a63'
+down_revision: Union[str, Sequence[str], None] = 'b7d4e2a91c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # These tables used to be created by create_all at startup. A database
+    # that already has them is adopted with `alembic stamp` (see README.md).
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index(op.f("ix_projects_name"), "projects", ["name"], unique=False)
+    op.create_table(
+        "layers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("data_table", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("srid", sa.Integer(), nullable=True),
+        sa.Column("geometry_type", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index(op.f("ix_layers_name"), "layers", ["name"], unique=False)
+    op.create_table(
+        "example_layer",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("geom", sa.LargeBinary(), nullable=True),
+        sa.PrimaryKeyConstraint("id")
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("example_layer")
+    op.drop_index(op.f("ix_layers_name"), table_name="layers")
+    op.drop_table("layers")
+    op.drop_index(op.f("ix_projects_name"), table_name="projects")
+    op.drop_table("projects")
@@ -36,9 +36,13 @@ async def signup(
         )
     
     # Create user
+    try:
+        hashed_password = await security.hash_password_async(user_in.password)
+    except security.PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     user = User(
         email=user_in.email,
-        hashed_password=security.hash_password(user_in.password),
+        hashed_password=hashed_password,
         auth_provider=user_in.auth_provider,
         is_active=True
     )
@@ -67,7 +71,13 @@ async def login(
     user = result.first()
 
     # Authenticate
-    if not user or not user.hashed_password or not security.verify_password(form_data.password, user.hashed_password):
+    try:
+        verified = bool(user and user.hashed_password) and await security.verify_password_async(
+            form_data.password, user.hashed_password
+        )
+    except security.PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect email or password",
@@ -1,5 +1,9 @@
 from fastapi import APIRouter
 
+from app.core.http import outbound_http
+from app.db.engine import engine, replicas
+from app.db.pool import pool_stats
+
 router = APIRouter()
 
 @router.get("/health", tags=["health"])
@@ -8,3 +12,30 @@ def health_check():
     Health check endpoint to verify service status.
     """
     return {"status": "ok", "service": "layer-flow-backend"}
+
+@router.get("/pool", tags=["health"])
+def pool_status():
+    """
+    Connection pool occupancy and checkout wait times for the primary and
+    each read replica, with the replicas' last health check results.
+    """
+    return {
+        "primary": pool_stats(engine.pool),
+        "replicas": [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "latency_seconds": replica.latency,
+                "lag_seconds": replica.lag,
+                **pool_stats(replica.engine.pool),
+            }
+            for replica in replicas.replicas
+        ],
+    }
+
+@router.get("/http", tags=["health"])
+def outbound_http_status():
+    """
+    Call counts, errors and latencies of outbound requests per OAuth provider.
+    """
+    return {"providers": outbound_http.stats()}
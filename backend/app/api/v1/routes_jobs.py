@@ -0,0 +1,30 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.deps import get_current_user
+from app.db.session import get_session
+from app.models.job import Job
+from app.models.project import Project
+from app.models.user import User
+from app.schemas.job import JobRead
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Return the status, progress and result of a background job of one of the
+    current user's projects. Jobs are read from the primary, so polling sees
+    progress as soon as it is recorded.
+    """
+    job = await session.get(Job, job_id)
+    if job is not None:
+        project = await session.get(Project, job.project_id)
+        if project is not None and project.owner_id == current_user.id:
+            return job
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
@@ -0,0 +1,377 @@
+import os
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.compression import compress, decompress, negotiate
+from app.core.config import get_settings
+from app.core.deps import get_layer, get_layer_read_session
+from app.db.session import get_session
+from app.models.export import LayerExport
+from app.models.job import Job
+from app.models.layer import Layer
+from app.schemas.export import LayerExportRead
+from app.schemas.job import JobRead
+from app.schemas.layer import LayerRead
+from app.schemas.pagination import Page
+from app.services.aggregate import SHAPES, aggregate_layer, cell_collection
+from app.services.clusters import cluster_collection, get_cluster_index
+from app.services.exports import (
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    export_filename,
+    export_path,
+    precompress_encodings,
+    precompressed_path,
+)
+from app.services.features import stream_feature_collection
+from app.services.geometry import GeometryError, parse_bbox, parse_wkt
+from app.services.jobs import JOB_STATUSES, enqueue_job
+from app.services.mvt import is_valid_tile
+from app.services.pagination import CursorError, decode_cursor, keyset_page
+from app.services.pyramid import level_for_resolution, parse_zooms
+from app.services.reproject import ReprojectionError, get_transformer
+from app.services.tile_cache import tile_cache
+from app.services.tiles import render_tile
+
+settings = get_settings()
+
+router = APIRouter()
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+
+def _layer_validators(layer: Layer) -> Dict[str, str]:
+    """
+    ETag and Last-Modified of anything derived from the layer's data. Clients
+    must revalidate, which costs them a 304 as long as the layer is unchanged.
+    """
+    headers = {"ETag": f'W/"{layer.id}-{layer.version}"', "Cache-Control": "private, no-cache"}
+    if layer.updated_at is not None:
+        updated_at = layer.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def _not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Whether the client's copy is current, by If-None-Match (weak comparison)
+    or, when that is absent, If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers["ETag"].removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+@router.get("/{layer_id}", response_model=LayerRead)
+async def get_layer_metadata(
+    request: Request,
+    response: Response,
+    layer: Layer = Depends(get_layer)
+) -> Any:
+    """
+    Return the layer's metadata, including the version its data is at.
+    """
+    headers = _layer_validators(layer)
+    if _not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return layer
+
+@router.get("/{layer_id}/tiles/{z}/{x}/{y}.mvt")
+async def get_layer_tile(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_layer_read_session)
+) -> Response:
+    """
+    Return a Mapbox Vector Tile for the layer, served from the tile cache when
+    possible, or a 304 when the client has the tile of the current layer version.
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile out of range")
+    headers = _layer_validators(layer)
+    if _not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = (layer.id, layer.version, z, x, y)
+    data = await run_in_threadpool(tile_cache.get, key)
+    if data is None:
+        try:
+            data = await render_tile(session, layer, z, x, y)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        encoding = tile_cache.encoding
+        if data and encoding:
+            level = settings.COMPRESSION_TYPES.get(MVT_MEDIA_TYPE, {}).get(encoding)
+            data = await run_in_threadpool(compress, data, encoding, level)
+        await run_in_threadpool(tile_cache.set, key, data)
+
+    if not data:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+    if tile_cache.encoding:
+        # Tiles are cached compressed; other clients get them decompressed
+        # (and maybe compressed again their way by the middleware)
+        if negotiate(request.headers.get("accept-encoding"), [tile_cache.encoding]):
+            headers.update({"Content-Encoding": tile_cache.encoding, "Vary": "Accept-Encoding"})
+        else:
+            data = await run_in_threadpool(decompress, data, tile_cache.encoding)
+    return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+@router.get("/{layer_id}/features")
+async def get_layer_features(
+    request: Request,
+    bbox: Optional[str] = Query(default=None, description="Filter by minx,miny,maxx,maxy"),
+    intersects: Optional[str] = Query(default=None, description="Filter by intersection with a WKT geometry"),
+    limit: Optional[int] = Query(default=None, ge=1, le=settings.PAGE_SIZE_MAX, description="Page size; all features if omitted"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    resolution: Optional[float] = Query(default=None, gt=0, description="Display resolution in layer units per pixel; lines and polygons are simplified to it"),
+    srid: Optional[int] = Query(default=None, description="EPSG code to return geometries in; the layer's own if omitted"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_layer_read_session)
+) -> Response:
+    """
+    Stream the layer's features as a GeoJSON FeatureCollection.
+
+    Pages are keyed on the feature id: when ``limit`` is set and more features
+    follow, the collection carries a ``next_cursor`` to pass back as ``cursor``.
+    With ``resolution``, geometries come from the coarsest pyramid level that
+    is accurate to it. With ``srid``, geometries are reprojected to it; bbox,
+    intersects and resolution stay in the layer's SRID. Answers 304 when the
+    client's ETag is the layer's current one, without reading its data.
+    """
+    if bbox is not None and intersects is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either bbox or intersects, not both")
+    bounds = geometry = after = None
+    try:
+        if cursor is not None:
+            (after,) = decode_cursor(cursor, ("id",))
+            limit = limit or settings.PAGE_SIZE_DEFAULT
+        if bbox is not None:
+            bounds = parse_bbox(bbox)
+        if intersects is not None:
+            geometry = parse_wkt(intersects)
+        if srid is not None:
+            get_transformer(layer.srid or 4326, srid)
+    except (GeometryError, CursorError, ReprojectionError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    headers = _layer_validators(layer)
+    if _not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return StreamingResponse(
+        stream_feature_collection(
+            session,
+            layer,
+            bbox=bounds,
+            intersects=geometry,
+            after=after,
+            limit=limit,
+            level=level_for_resolution(layer, resolution),
+            srid=srid,
+        ),
+        media_type=GEOJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+@router.get("/{layer_id}/clusters")
+async def get_layer_clusters(
+    request: Request,
+    z: int = Query(ge=0, le=30, description="Map zoom level"),
+    bbox: Optional[str] = Query(default=None, description="Only clusters centred in minx,miny,maxx,maxy"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_layer_read_session)
+) -> Response:
+    """
+    Return the point layer's clusters at zoom ``z`` as a GeoJSON FeatureCollection.
+
+    Each cluster is a Point at the centroid of its members, with their count
+    in ``properties`` and their extent as the feature's ``bbox``; a cluster of
+    one carries that feature's id.
+    """
+    headers = _layer_validators(layer)
+    if _not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        bounds = parse_bbox(bbox) if bbox is not None else None
+        index = await get_cluster_index(session, layer)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    clusters = await run_in_threadpool(index.query, z, bounds)
+    return JSONResponse(content=cluster_collection(clusters), media_type=GEOJSON_MEDIA_TYPE, headers=headers)
+
+@router.get("/{layer_id}/aggregate")
+async def get_layer_aggregate(
+    request: Request,
+    size: float = Query(gt=0, description="Cell size in layer units: square width or hexagon radius"),
+    shape: str = Query(default="hex", description="Cell shape: " + " or ".join(SHAPES)),
+    attribute: Optional[str] = Query(default=None, description="Numeric property to summarise"),
+    bbox: Optional[str] = Query(default=None, description="Only features overlapping minx,miny,maxx,maxy"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_layer_read_session)
+) -> Response:
+    """
+    Bin the layer's features into square or hexagonal cells and return the
+    non-empty cells as a GeoJSON FeatureCollection of polygons.
+
+    Every cell has the ``count`` of features whose bbox centre falls in it and,
+    with ``attribute``, the ``sum``, ``mean``, ``min`` and ``max`` of that
+    property over the features where it is a number.
+    """
+    headers = _layer_validators(layer)
+    if _not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        bounds = parse_bbox(bbox) if bbox is not None else None
+        stats = await aggregate_layer(session, layer, shape, size, attribute=attribute, bbox=bounds)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    collection = await run_in_threadpool(cell_collection, stats, shape, size, attribute is not None)
+    return JSONResponse(content=collection, media_type=GEOJSON_MEDIA_TYPE, headers=headers)
+
+async def _get_export(layer: Layer, export_id: int, session: AsyncSession) -> LayerExport:
+    export = await session.get(LayerExport, export_id)
+    if export is None or export.layer_id != layer.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found")
+    return export
+
+@router.post("/{layer_id}/exports", response_model=LayerExportRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_layer_export(
+    format: str = Query(default="parquet", description="File format: " + " or ".join(EXPORT_FORMATS)),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Start exporting the layer to a GeoParquet or FlatGeobuf file.
+
+    The export runs as a background job; poll the export until its status
+    is "completed", then fetch the file from its download URL.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown export format; expected one of: " + ", ".join(EXPORT_FORMATS),
+        )
+    export = LayerExport(layer_id=layer.id, format=format)
+    session.add(export)
+    await session.commit()
+    await session.refresh(export)
+    await enqueue_job(session, "export", layer.project_id, layer_id=layer.id, params={"export_id": export.id})
+    return export
+
+@router.get("/{layer_id}/exports/{export_id}", response_model=LayerExportRead)
+async def get_layer_export(
+    export_id: int,
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Return the status of an export.
+    """
+    return await _get_export(layer, export_id, session)
+
+@router.get("/{layer_id}/exports/{export_id}/download")
+async def download_layer_export(
+    request: Request,
+    export_id: int,
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> FileResponse:
+    """
+    Download a completed export. Range requests are supported, so clients can
+    resume downloads and cloud-native readers can fetch parts of the file.
+    Whole-file downloads are served from a pre-compressed copy when the format
+    has them and the client accepts one.
+    """
+    export = await _get_export(layer, export_id, session)
+    if export.status != "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export is {export.status}")
+    filename = export_filename(layer, export)
+    if "range" not in request.headers:
+        offered = [e for e in precompress_encodings(export.format) if os.path.exists(precompressed_path(export, e))]
+        encoding = negotiate(request.headers.get("accept-encoding"), offered)
+        if encoding is not None:
+            response = FileResponse(
+                precompressed_path(export, encoding),
+                media_type=MEDIA_TYPES[export.format],
+                filename=filename,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            # Ranges of the identity file are what resuming clients expect
+            del response.headers["accept-ranges"]
+            return response
+    return FileResponse(export_path(export), media_type=MEDIA_TYPES[export.format], filename=filename)
+
+@router.post("/{layer_id}/pyramid", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_layer_pyramid(
+    zooms: Optional[str] = Query(default=None, description="Comma-separated zooms; PYRAMID_ZOOMS if omitted"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Rebuild the layer's simplified geometry pyramid in a background job.
+    """
+    try:
+        levels = parse_zooms(zooms) if zooms is not None else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="zooms must be comma-separated integers")
+    return await enqueue_job(session, "pyramid", layer.project_id, layer_id=layer.id, params={"zooms": levels})
+
+@router.post("/{layer_id}/reproject", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def reproject_layer_data(
+    srid: int = Query(description="EPSG code to store the layer's geometries in"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Reproject the layer's stored geometries to another SRID in a background job,
+    for example to EPSG:3857 so that it can be served as vector tiles.
+    """
+    if srid == (layer.srid or 4326):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Layer is already in EPSG:{srid}")
+    try:
+        get_transformer(layer.srid or 4326, srid)
+    except ReprojectionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return await enqueue_job(session, "reproject", layer.project_id, layer_id=layer.id, params={"srid": srid})
+
+@router.get("/{layer_id}/jobs", response_model=Page[JobRead])
+async def list_layer_jobs(
+    status_filter: Optional[str] = Query(default=None, alias="status", pattern="^(" + "|".join(JOB_STATUSES) + ")$"),
+    limit: int = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    layer: Layer = Depends(get_layer),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    List the background jobs of the layer, newest last, one keyset page at a time.
+    """
+    where = [Job.layer_id == layer.id]
+    if status_filter is not None:
+        where.append(Job.status == status_filter)
+    try:
+        items, next_cursor = await keyset_page(session, Job, *where, order="id", cursor=cursor, limit=limit)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Page[JobRead](items=items, next_cursor=next_cursor)
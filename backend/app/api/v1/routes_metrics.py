@@ -0,0 +1,86 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.http import outbound_http
+from app.core.metrics import registry
+from app.core.oidc import oidc_metadata
+from app.core.user_cache import user_cache
+from app.db.engine import engine, replicas
+from app.db.pool import pool_stats
+from app.services.tile_cache import tile_cache
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections",
+    "Connections per pool by state (size, checked_in, checked_out, overflow).",
+    ("database", "state"),
+)
+POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts",
+    "Connections handed out by the pool.",
+    ("database",),
+)
+POOL_WAIT = registry.counter(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("database",),
+)
+POOL_WAIT_MAX = registry.gauge(
+    "db_pool_checkout_wait_seconds_max",
+    "Longest wait for a pooled connection since start-up.",
+    ("database",),
+)
+REPLICA_HEALTHY = registry.gauge(
+    "db_replica_healthy",
+    "1 while a read replica passes its health check.",
+    ("database",),
+)
+CACHE_HITS = registry.counter("cache_hits", "Cache hits.", ("cache",))
+CACHE_MISSES = registry.counter("cache_misses", "Cache misses.", ("cache",))
+OUTBOUND_CALLS = registry.counter(
+    "outbound_http_requests",
+    "Requests sent to OAuth providers.",
+    ("provider",),
+)
+OUTBOUND_SECONDS = registry.counter(
+    "outbound_http_request_seconds",
+    "Time spent in requests to OAuth providers.",
+    ("provider",),
+)
+
+
+@registry.collector
+def _collect_pools() -> None:
+    pools = [("primary", engine.pool)] + [(replica.name, replica.engine.pool) for replica in replicas.replicas]
+    for database, pool in pools:
+        stats = pool_stats(pool)
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in stats:
+                POOL_CONNECTIONS.set(stats[state], database=database, state=state)
+        if "checkouts" in stats:
+            POOL_CHECKOUTS.set(stats["checkouts"], database=database)
+            POOL_WAIT.set(stats["wait_seconds_total"], database=database)
+            POOL_WAIT_MAX.set(stats["wait_seconds_max"], database=database)
+    for replica in replicas.replicas:
+        REPLICA_HEALTHY.set(int(replica.healthy), database=replica.name)
+
+
+@registry.collector
+def _collect_caches() -> None:
+    for name, cache in (("user", user_cache), ("tile", tile_cache), ("oidc_metadata", oidc_metadata)):
+        CACHE_HITS.set(cache.hits, cache=name)
+        CACHE_MISSES.set(cache.misses, cache=name)
+    for provider, stats in outbound_http.stats().items():
+        OUTBOUND_CALLS.set(stats["calls"], provider=provider)
+        OUTBOUND_SECONDS.set(stats["seconds_total"], provider=provider)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status, Request
@@ -99,16 +100,23 @@ async def github_callback(
     Handle GitHub OAuth callback.
     """
     token = await oauth.github.authorize_access_token(request)
-    resp = await oauth.github.get("user", token=token)
+    # The profile and the email list are independent, fetch them together
+    resp, resp_emails = await asyncio.gather(
+        oauth.github.get("user", token=token),
+        oauth.github.get("user/emails", token=token),
+        return_exceptions=True,
+    )
+    if isinstance(resp, BaseException):
+        raise resp
     user_info = resp.json()
 
-    # GitHub email might be private, fetch explicitly if needed
+    # GitHub email might be private, use the verified primary address then
     email = user_info.get("email")
     sub = str(user_info.get("id")) # GitHub ID is integer
 
     if not email:
-        # Fetch emails
-        resp_emails = await oauth.github.get("user/emails", token=token)
+        if isinstance(resp_emails, BaseException):
+            raise resp_emails
         emails = resp_emails.json()
         primary_email = next((e for e in emails if e["primary"] and e["verified"]), None)
         if primary_email:
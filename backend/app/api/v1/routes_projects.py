@@ -0,0 +1,125 @@
+import os
+import shutil
+import uuid
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.deps import get_current_user, get_project
+from app.db.session import get_read_session, get_session
+from app.models.job import Job
+from app.models.layer import Layer
+from app.models.project import Project
+from app.models.user import User
+from app.schemas.job import JobRead
+from app.schemas.layer import LayerRead
+from app.schemas.pagination import Page
+from app.schemas.project import ProjectRead
+from app.services.ingest import FORMATS, IngestError, detect_format
+from app.services.jobs import JOB_STATUSES, enqueue_job
+from app.services.pagination import CursorError, keyset_page
+
+settings = get_settings()
+
+router = APIRouter()
+
+ORDER_QUERY = Query(default="name", pattern="^(name|id)$", description="Sort by name (then id) or by id")
+LIMIT_QUERY = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX)
+CURSOR_QUERY = Query(default=None, description="next_cursor of the previous page")
+
+@router.get("", response_model=Page[ProjectRead])
+async def list_projects(
+    order: str = ORDER_QUERY,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+) -> Any:
+    """
+    List the current user's projects, one keyset page at a time.
+    """
+    try:
+        items, next_cursor = await keyset_page(
+            session, Project, Project.owner_id == current_user.id, order=order, cursor=cursor, limit=limit
+        )
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Page[ProjectRead](items=items, next_cursor=next_cursor)
+
+@router.get("/{project_id}/layers", response_model=Page[LayerRead])
+async def list_layers(
+    order: str = ORDER_QUERY,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    project: Project = Depends(get_project),
+    session: AsyncSession = Depends(get_read_session)
+) -> Any:
+    """
+    List the layers of a project, one keyset page at a time.
+    """
+    try:
+        items, next_cursor = await keyset_page(
+            session, Layer, Layer.project_id == project.id, order=order, cursor=cursor, limit=limit
+        )
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Page[LayerRead](items=items, next_cursor=next_cursor)
+
+def _save_upload(file: UploadFile) -> str:
+    os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_UPLOAD_DIR, uuid.uuid4().hex)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+    return path
+
+@router.post("/{project_id}/layers", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_layer_from_file(
+    name: str = Form(...),
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(default=None, description="geojson, ndjson or csv; detected from the file name if omitted"),
+    srid: Optional[int] = Form(default=None),
+    project: Project = Depends(get_project),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    Create a layer in the project from an uploaded GeoJSON, newline-delimited GeoJSON
+    or CSV-with-WKT file, bulk loading its features into a new data table.
+
+    The file is loaded by a background job; poll it until its status is
+    "completed", when its ``layer_id`` is the new layer.
+    """
+    try:
+        input_format = format or detect_format(file.filename)
+    except IngestError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if input_format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format {input_format!r}; expected one of: " + ", ".join(FORMATS),
+        )
+
+    path = await run_in_threadpool(_save_upload, file)
+    params = {"path": path, "name": name, "format": input_format, "srid": srid}
+    return await enqueue_job(session, "ingest", project.id, params=params)
+
+@router.get("/{project_id}/jobs", response_model=Page[JobRead])
+async def list_project_jobs(
+    status_filter: Optional[str] = Query(default=None, alias="status", pattern="^(" + "|".join(JOB_STATUSES) + ")$"),
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    project: Project = Depends(get_project),
+    session: AsyncSession = Depends(get_session)
+) -> Any:
+    """
+    List the project's background jobs, newest last, one keyset page at a time.
+    """
+    where = [Job.project_id == project.id]
+    if status_filter is not None:
+        where.append(Job.status == status_filter)
+    try:
+        items, next_cursor = await keyset_page(session, Job, *where, order="id", cursor=cursor, limit=limit)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Page[JobRead](items=items, next_cursor=next_cursor)
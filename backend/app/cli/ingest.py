@@ -0,0 +1,65 @@
+"""
+Bulk load a GeoJSON, newline-delimited GeoJSON or CSV-with-WKT file into a new layer.
+
+Usage:
+    python -m app.cli.ingest data/parcels.ndjson --project-id 1 --name parcels
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.db.engine import engine
+from app.db.session import async_session_factory
+from app.models.project import Project
+from app.services.ingest import FORMATS, IngestError, detect_format, ingest_file
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with async_session_factory() as session:
+        project = await session.get(Project, args.project_id)
+        if project is None:
+            print(f"Project {args.project_id} not found", file=sys.stderr)
+            return 1
+
+        started = time.perf_counter()
+        try:
+            input_format = args.format or detect_format(args.path)
+            with open(args.path, "rb") as stream:
+                layer, result = await ingest_file(
+                    session,
+                    project.id,
+                    args.name,
+                    stream,
+                    input_format,
+                    srid=args.srid,
+                    batch_size=args.batch_size,
+                )
+        except IngestError as e:
+            print(f"Ingestion failed: {e}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - started
+
+    rate = result.features / elapsed if elapsed else 0
+    print(
+        f"Layer {layer.id} ({layer.data_table}): {result.features} features, "
+        f"{layer.geometry_type or 'no geometry'}, EPSG:{layer.srid} "
+        f"in {elapsed:.1f}s ({rate:,.0f} features/s)"
+    )
+    await engine.dispose()
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk load a file into a new layer.")
+    parser.add_argument("path", help="Input file")
+    parser.add_argument("--project-id", type=int, required=True)
+    parser.add_argument("--name", required=True, help="Layer name")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (detected from the extension by default)")
+    parser.add_argument("--srid", type=int, help="Override the SRID declared by the input")
+    parser.add_argument("--batch-size", type=int, help="Rows per COPY batch")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+(Re)build the simplified geometry pyramid of an existing layer.
+
+Layers ingested before pyramids existed are read at full resolution until this
+has run for them.
+
+Usage:
+    python -m app.cli.pyramid 12
+    python -m app.cli.pyramid 12 --zooms 4,8,12
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.db.engine import engine
+from app.db.session import async_session_factory
+from app.models.layer import Layer
+from app.services.pyramid import build_pyramid, parse_zooms
+from app.services.tile_cache import tile_cache
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with async_session_factory() as session:
+        layer = await session.get(Layer, args.layer_id)
+        if layer is None:
+            print(f"Layer {args.layer_id} not found", file=sys.stderr)
+            return 1
+
+        started = time.perf_counter()
+        zooms = parse_zooms(args.zooms) if args.zooms is not None else None
+        written = await build_pyramid(session, layer, zooms=zooms, chunk_size=args.batch_size)
+        await session.commit()
+        elapsed = time.perf_counter() - started
+
+    tile_cache.invalidate_layer(layer.id)
+    if layer.pyramid_zooms:
+        print(f"Layer {layer.id}: {written} simplified geometries for zooms {layer.pyramid_zooms} in {elapsed:.1f}s")
+    else:
+        print(f"Layer {layer.id}: no pyramid ({layer.geometry_type or 'no geometry'}, EPSG:{layer.srid})")
+    await engine.dispose()
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild a layer's simplified geometry pyramid.")
+    parser.add_argument("layer_id", type=int)
+    parser.add_argument("--zooms", help="Comma-separated zooms (default: PYRAMID_ZOOMS)")
+    parser.add_argument("--batch-size", type=int, help="Rows simplified per batch")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
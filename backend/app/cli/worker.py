@@ -0,0 +1,77 @@
+"""
+Run background jobs (ingestion, exports, pyramid builds) outside the API.
+
+Each worker process runs its own event loop and database pool with up to
+JOB_CONCURRENCY jobs at a time; CPU-heavy steps of one job no longer hold up
+the others or the API. Set JOBS_IN_PROCESS=false on the API when workers run.
+
+Usage:
+    python -m app.cli.worker
+    python -m app.cli.worker --processes 4 --concurrency 2
+    python -m app.cli.worker --once
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.core.logging import configure_logging
+from app.db.engine import engine
+from app.services.jobs import JobDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(concurrency: Optional[int], once: bool) -> int:
+    dispatcher = JobDispatcher(concurrency=concurrency)
+    try:
+        if once:
+            count = await dispatcher.drain()
+            print(f"Ran {count} jobs")
+        else:
+            logger.info("Worker %s waiting for jobs", dispatcher.worker_id)
+            await dispatcher.run_forever()
+    finally:
+        await dispatcher.stop()
+        await engine.dispose()
+    return 0
+
+
+def _worker_process(concurrency: Optional[int]) -> int:
+    configure_logging()
+    try:
+        return asyncio.run(serve(concurrency, once=False))
+    except KeyboardInterrupt:
+        return 0
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.once or args.processes == 1:
+        return asyncio.run(serve(args.concurrency, args.once))
+
+    # Spawned rather than forked, so no process inherits the parent's
+    # connections or event loop
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.processes, mp_context=context) as pool:
+        futures = [pool.submit(_worker_process, args.concurrency) for _ in range(args.processes)]
+        try:
+            return max(future.result() for future in futures)
+        except KeyboardInterrupt:
+            return 0
+
+
+def main() -> None:
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, help="Jobs run at a time per process (default: JOB_CONCURRENCY)")
+    parser.add_argument("--once", action="store_true", help="Run the pending jobs in this process, then exit")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Response compression: content negotiation, codecs and an ASGI middleware.
+
+The middleware compresses responses whose media type has a rule in
+COMPRESSION_TYPES and whose body is at least that rule's ``min_size``, with
+the client's preferred encoding among COMPRESSION_ENCODINGS. Responses that
+already have a Content-Encoding (tiles and exports stored pre-compressed) are
+passed through as they are, as are partial (Range) responses.
+"""
+import zlib
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# File name suffixes of pre-compressed files
+SUFFIXES = {"gzip": ".gz", "br": ".br", "zstd": ".zst"}
+ENCODINGS = tuple(SUFFIXES)
+DEFAULT_LEVELS = {"gzip": 6, "br": 5, "zstd": 6}
+
+
+class Compressor:
+    """
+    Incremental compressor. ``compress(data, flush=True)`` returns everything
+    needed to decode ``data`` so far, which keeps streamed responses progressive.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        level = DEFAULT_LEVELS[encoding] if level is None else level
+        if encoding == "gzip":
+            self._gzip = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._br = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "gzip":
+            out = self._gzip.compress(data)
+            return out + self._gzip.flush(zlib.Z_SYNC_FLUSH) if flush else out
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + self._br.flush() if flush else out
+        out = self._zstd.compress(data)
+        return out + self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._gzip.flush()
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._zstd.flush()
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return zlib.decompress(data, 47)
+    if encoding == "br":
+        return brotli.decompress(data)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+def compress_file(source: str, target: str, encoding: str, level: Optional[int] = None, chunk_size: int = 1 << 20) -> None:
+    """
+    Write a compressed copy of a file, a chunk at a time.
+    """
+    compressor = Compressor(encoding, level)
+    with open(source, "rb") as src, open(target, "wb") as out:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            out.write(compressor.compress(chunk))
+        out.write(compressor.finish())
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into {coding: q}.
+    """
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    The offered encoding the client prefers, ties going to the first offered,
+    or None when it accepts none of them.
+    """
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = [value.strip() for value in headers.get("vary", "").split(",") if value.strip()]
+    if not any(value.lower() in ("accept-encoding", "*") for value in vary):
+        headers["vary"] = ", ".join(vary + ["Accept-Encoding"])
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses per media type (see module docstring).
+
+    ``rules`` maps a media type to ``{"min_size": bytes, "<encoding>": level}``.
+    Bodies sent in one message are compressed only from ``min_size``; streamed
+    bodies are always compressed, each message flushed so clients can decode
+    what has arrived.
+    """
+
+    def __init__(self, app: ASGIApp, encodings: Sequence[str], rules: Mapping[str, Mapping[str, int]]):
+        self.app = app
+        self.encodings: List[str] = [e for e in encodings if e in ENCODINGS]
+        self.rules = {media_type(key): value for key, value in rules.items()}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        rule: Optional[Mapping[str, int]] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, rule, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                rule = self.rules.get(media_type(headers.get("content-type")))
+                if (
+                    rule is None
+                    or message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or "content-range" in headers
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body message tells whether it is worth it
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < rule.get("min_size", 0):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding, rule.get(encoding))
+                headers = MutableHeaders(raw=start["headers"])
+                headers["content-encoding"] = encoding
+                add_vary(headers)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed body is a different representation
+                    headers["etag"] = "W/" + etag
+                del headers["content-length"]
+                # Ranges would apply to the compressed body
+                del headers["accept-ranges"]
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["content-length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+            body = compressor.compress(body, flush=more_body)
+            if not more_body:
+                body += compressor.finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 import os
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -18,6 +18,27 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds before a connection is replaced; -1 keeps connections forever
+    DB_POOL_RECYCLE: int = 1800
+    # "always" pings on every checkout, "idle" only connections idle for longer
+    # than DB_POOL_PING_IDLE_SECONDS, "never" relies on DB_POOL_RECYCLE alone
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PING_IDLE_SECONDS: float = 30.0
+    # Connections opened at startup
+    DB_POOL_WARM_CONNECTIONS: int = 2
+    # Startup compares the database with the Alembic head: "error" refuses to
+    # start when it is behind, "warn" logs it, "off" skips the check
+    DB_SCHEMA_CHECK: str = "error"
+
+    # Read replicas (comma-separated postgresql+asyncpg URLs). Read-only
+    # endpoints use the fastest healthy replica that is less than
+    # REPLICA_MAX_LAG_SECONDS behind, and the primary when there is none.
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 10.0
     
     ENVIRONMENT: str = "local"
     
@@ -26,6 +47,17 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     
+    # Password hashing runs on its own executor: "thread" or "process".
+    # Calls beyond PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE get a 503.
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+
+    # Authenticated-user cache: verified tokens and user snapshots, per process.
+    # Set USER_CACHE_TTL_SECONDS to 0 to disable it.
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
     # Session Settings (for OAuth state)
     SESSION_SECRET_KEY: str = "super-secret-session-key"
 
@@ -33,16 +65,133 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/api/v1/auth/google/callback"
+    GOOGLE_HTTP_TIMEOUT_SECONDS: float = 10.0
 
     # Microsoft OAuth Settings
     MICROSOFT_CLIENT_ID: str = ""
     MICROSOFT_CLIENT_SECRET: str = ""
     MICROSOFT_REDIRECT_URI: str = "http://localhost:8000/api/v1/auth/microsoft/callback"
+    MICROSOFT_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # OpenID Connect discovery documents and signing keys are cached on disk
+    # and refreshed in the background; set the directory to "" for memory only
+    OIDC_METADATA_CACHE_DIR: str = ".cache/oidc"
+    OIDC_METADATA_TTL_SECONDS: int = 3600
 
     # GitHub OAuth Settings
     GITHUB_CLIENT_ID: str = ""
     GITHUB_CLIENT_SECRET: str = ""
     GITHUB_REDIRECT_URI: str = "http://localhost:8000/api/v1/auth/github/callback"
+    GITHUB_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # Outbound HTTP to OAuth providers goes through one keep-alive pool
+    OAUTH_HTTP_MAX_CONNECTIONS: int = 50
+    OAUTH_HTTP_MAX_KEEPALIVE: int = 20
+    OAUTH_HTTP_KEEPALIVE_SECONDS: float = 60.0
+
+    # Vector Tile Settings
+    TILE_EXTENT: int = 4096
+    TILE_BUFFER: int = 64
+    # Set TILE_CACHE_DIR to an empty string to keep the tile cache in memory only
+    TILE_CACHE_DIR: str = ".cache/tiles"
+    TILE_CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024
+    TILE_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Tiles are cached compressed with this encoding (gzip, br or zstd) and
+    # served as they are to clients accepting it; "" caches them raw
+    TILE_CACHE_ENCODING: str = "gzip"
+    # Rows are read and encoded TILE_RENDER_CHUNK_SIZE at a time, off the event
+    # loop; a tile stops at TILE_MAX_FEATURES features
+    TILE_RENDER_CHUNK_SIZE: int = 2000
+    TILE_MAX_FEATURES: int = 50000
+    # Up to TILE_POINT_THIN_MAX_ZOOM, at most one point is kept per cell of a
+    # TILE_POINT_GRID x TILE_POINT_GRID grid over the tile (0 disables thinning)
+    TILE_POINT_THIN_MAX_ZOOM: int = 12
+    TILE_POINT_GRID: int = 512
+
+    # Pagination Settings
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 1000
+
+    # Feature Export Settings
+    FEATURE_STREAM_CHUNK_SIZE: int = 1000
+
+    # Spatial Index Settings
+    # "auto" uses the in-process R-tree unless the database is PostgreSQL;
+    # "memory" and "database" force one filter path
+    SPATIAL_INDEX_BACKEND: str = "auto"
+    SPATIAL_INDEX_NODE_SIZE: int = 16
+    SPATIAL_INDEX_ID_BATCH: int = 500
+
+    # Point Clustering Settings
+    # Clusters are grid cells CLUSTER_CELL_PIXELS wide on screen, precomputed
+    # for zooms 0 to CLUSTER_MAX_ZOOM; deeper zooms reuse the last one
+    CLUSTER_CELL_PIXELS: int = 60
+    CLUSTER_MAX_ZOOM: int = 16
+    CLUSTER_INDEX_MAX_LAYERS: int = 32
+
+    # Grid Aggregation Settings
+    AGGREGATE_MAX_CELLS: int = 100000
+
+    # Export Settings
+    # Finished GeoParquet and FlatGeobuf exports are kept under EXPORT_DIR;
+    # EXPORT_CHUNK_SIZE features are read per query (one Parquet row group)
+    EXPORT_DIR: str = "storage/exports"
+    EXPORT_CHUNK_SIZE: int = 10000
+
+    # Background Job Settings
+    # Ingestion, exports, pyramid builds and reprojection run as jobs.
+    # JOBS_IN_PROCESS runs them inside the API process; turn it off when
+    # `python -m app.cli.worker` runs them instead. A running job whose worker
+    # has not reported for JOB_STALE_SECONDS is requeued, up to
+    # JOB_MAX_ATTEMPTS runs in total.
+    JOBS_IN_PROCESS: bool = True
+    JOB_CONCURRENCY: int = 2
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_STALE_SECONDS: float = 300.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_PROGRESS_SECONDS: float = 1.0
+    # Uploaded files wait here until their ingest job has run; workers must see the same directory
+    JOB_UPLOAD_DIR: str = "storage/uploads"
+
+    # Geometry Storage Settings
+    # "wkb" stores exact ISO WKB; "twkb" stores 2D geometries as TWKB rounded
+    # to TWKB_PRECISION decimal places (7 is about 1cm in degrees)
+    GEOMETRY_ENCODING: str = "wkb"
+    TWKB_PRECISION: int = 7
+
+    # Ingestion Settings
+    INGEST_BATCH_SIZE: int = 10000
+    # Zooms to precompute simplified geometries for when lines and polygons
+    # are ingested (tolerance: half a tile pixel at that zoom); "" disables it
+    PYRAMID_ZOOMS: str = "3,6,9,12"
+
+    # Compression Settings
+    # Responses are compressed with the client's preferred encoding among
+    # COMPRESSION_ENCODINGS (ties go to the first listed). Only media types in
+    # COMPRESSION_TYPES are compressed: "min_size" is the smallest body worth
+    # it, the other keys the level per encoding (gzip 1-9, br 0-11, zstd 1-22).
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    COMPRESSION_TYPES: Dict[str, Dict[str, int]] = {
+        "application/geo+json": {"min_size": 1024, "gzip": 6, "br": 5, "zstd": 6},
+        "application/json": {"min_size": 1024, "gzip": 6, "br": 5, "zstd": 6},
+        "application/vnd.mapbox-vector-tile": {"min_size": 512, "gzip": 6, "br": 5, "zstd": 6},
+        "application/flatgeobuf": {"min_size": 1024, "gzip": 6, "br": 6, "zstd": 9},
+        "text/plain": {"min_size": 1024, "gzip": 6, "br": 5, "zstd": 6},
+    }
+    # Exports in these formats are also stored compressed with every
+    # COMPRESSION_ENCODINGS encoding (Parquet pages are compressed already)
+    EXPORT_PRECOMPRESS_FORMATS: str = "fgb"
+
+    # Monitoring Settings
+    # Serve Prometheus metrics on /metrics and record per-route request metrics
+    METRICS_ENABLED: bool = True
+    # Opt-in SQL profiling: per-request query counts and DB time (returned as
+    # a Server-Timing header when DEBUG is on), a log of statements slower than
+    # SQL_SLOW_QUERY_MS and of requests running more than SQL_PROFILING_MAX_QUERIES
+    SQL_PROFILING: bool = False
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_PROFILING_MAX_QUERIES: int = 50
 
     class Config:
         env_file = ".env"
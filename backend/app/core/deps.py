@@ -1,27 +1,56 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core import config, security
 from app.core.config import get_settings
-from app.db.session import get_session
+from app.core.user_cache import user_cache
+from app.db.engine import replicas
+from app.db.session import get_read_session, get_session
 from app.models.user import User
+from app.models.project import Project
+from app.models.layer import Layer
 from app.schemas.auth import TokenData
+from app.services.layer_data import known_version, note_version
 
 settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/login")
 
+async def _get_fresh(read_session: AsyncSession, session: AsyncSession, model, ident):
+    """
+    Look a row up on the read session, falling back to the primary when a
+    replica has not caught up with a recent insert yet.
+    """
+    row = await read_session.get(model, ident)
+    if row is None and read_session is not session:
+        row = await session.get(model, ident)
+    return row
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
+    read_session: AsyncSession = Depends(get_read_session),
     session: AsyncSession = Depends(get_session)
 ) -> User:
     """
     Validate the access token and return the current user.
+
+    Verified tokens are cached with a snapshot of their user (see
+    app.core.user_cache), so repeat requests skip both the signature check
+    and the database lookup. The user is read through the read session and may
+    come from a replica; merge it into the primary session before changing it.
     """
+    snapshot = user_cache.get(token)
+    if snapshot is not None:
+        # Attach the snapshot to the session as if it had been loaded, without a query
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await read_session.merge(user, load=False)
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,7 +65,84 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
         
-    user = await session.get(User, token_data.user_id)
+    user = await _get_fresh(read_session, session, User, token_data.user_id)
     if user is None:
         raise credentials_exception
+    user_cache.set(token, user.model_dump(), token_expires_at=payload.get("exp"))
     return user
+
+async def get_project(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_session),
+    session: AsyncSession = Depends(get_session)
+) -> Project:
+    """
+    Return the requested project if it is owned by the current user.
+    """
+    project = await _get_fresh(read_session, session, Project, project_id)
+    if project is None or project.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return project
+
+async def _layer_snapshot(
+    layer_id: int,
+    read_session: AsyncSession = Depends(get_read_session),
+    session: AsyncSession = Depends(get_session)
+) -> Tuple[Optional[Layer], AsyncSession]:
+    """
+    The layer and the session to read its data through.
+
+    A layer's version is bumped in the same transaction as its data, so a read
+    session with the current version also has that version's data. A replica
+    is trusted on its own when its last check found it caught up and it has at
+    least the version this process last wrote or saw; otherwise the version is
+    read on the primary, and a replica behind on this layer is skipped for the
+    request. Its old version would otherwise end up in ETags and tile cache
+    keys, or be paired with data it does not match.
+    """
+    layer = await read_session.get(Layer, layer_id)
+    if read_session is session:
+        return layer, session
+    replica = read_session.info.get("replica")
+    if (
+        layer is not None
+        and replica is not None
+        and replicas.caught_up(replica)
+        and layer.version >= known_version(layer_id)
+    ):
+        return layer, read_session
+    version = (await session.exec(select(Layer.version).where(Layer.id == layer_id))).first()
+    if version is None:
+        return None, session
+    note_version(layer_id, version)
+    if layer is not None and layer.version == version:
+        return layer, read_session
+    return await session.get(Layer, layer_id), session
+
+async def get_layer(
+    current_user: User = Depends(get_current_user),
+    snapshot: Tuple[Optional[Layer], AsyncSession] = Depends(_layer_snapshot),
+    read_session: AsyncSession = Depends(get_read_session),
+    session: AsyncSession = Depends(get_session)
+) -> Layer:
+    """
+    Return the requested layer if it belongs to a project owned by the current user.
+    Its version is always the primary's (see _layer_snapshot).
+    """
+    layer = snapshot[0]
+    if layer is not None:
+        project = await _get_fresh(read_session, session, Project, layer.project_id)
+        if project is not None and project.owner_id == current_user.id:
+            return layer
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Layer not found")
+
+async def get_layer_read_session(
+    snapshot: Tuple[Optional[Layer], AsyncSession] = Depends(_layer_snapshot)
+) -> AsyncSession:
+    """
+    Session for reading the requested layer's data: the read session when it
+    has caught up with the layer's current version, otherwise the primary.
+    Use it with get_layer wherever the layer version keys a response.
+    """
+    return snapshot[1]
@@ -0,0 +1,109 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class CallStats:
+    count: int = 0
+    errors: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+
+    def record(self, seconds: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+
+class _ProviderTransport(httpx.AsyncBaseTransport):
+    """
+    One provider's view of the shared connection pool; times every request.
+    """
+
+    def __init__(self, shared: "SharedTransport", name: str):
+        self.shared = shared
+        self.name = name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.shared.stats_for(self.name)
+        start = time.perf_counter()
+        try:
+            response = await self.shared.transport.handle_async_request(request)
+        except Exception:
+            stats.record(time.perf_counter() - start, failed=True)
+            raise
+        stats.record(time.perf_counter() - start, failed=response.status_code >= 500)
+        return response
+
+    async def aclose(self) -> None:
+        # Authlib closes its client after every call; the pool outlives it
+        pass
+
+
+class SharedTransport:
+    """
+    Keep-alive connection pool shared by the outbound HTTP clients of the
+    OAuth providers and the OIDC metadata cache.
+
+    Authlib builds a new httpx client for every call it makes, so without this
+    each callback paid for fresh TCP and TLS handshakes with the provider.
+    ``for_provider`` returns a transport to hand to those clients; it reuses
+    this pool and records per-provider call counts and latencies.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive_connections: int, keepalive_expiry: float):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._stats: Dict[str, CallStats] = {}
+
+    @property
+    def transport(self) -> httpx.AsyncHTTPTransport:
+        # Created on first use, inside the event loop that will drive it
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(limits=self.limits)
+        return self._transport
+
+    def for_provider(self, name: str) -> httpx.AsyncBaseTransport:
+        return _ProviderTransport(self, name)
+
+    def stats_for(self, name: str) -> CallStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CallStats()
+        return stats
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "calls": stats.count,
+                "errors": stats.errors,
+                "seconds_total": stats.seconds_total,
+                "seconds_max": stats.seconds_max,
+                "seconds_avg": stats.seconds_total / stats.count if stats.count else 0.0,
+            }
+            for name, stats in self._stats.items()
+        }
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            transport, self._transport = self._transport, None
+            await transport.aclose()
+
+
+outbound_http = SharedTransport(
+    max_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.OAUTH_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=settings.OAUTH_HTTP_KEEPALIVE_SECONDS,
+)
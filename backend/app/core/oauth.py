@@ -1,38 +1,106 @@
-from authlib.integrations.starlette_client import OAuth
+import threading
+from typing import Any, Callable, Dict, List
+
 from app.core.config import get_settings
+from app.core.http import outbound_http
+from app.core.oidc import oidc_metadata
 
 settings = get_settings()
 
-oauth = OAuth()
-
-oauth.register(
-    name="google",
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={
-        "scope": "openid email profile"
-    }
-)
-
-oauth.register(
-    name="microsoft",
-    client_id=settings.MICROSOFT_CLIENT_ID,
-    client_secret=settings.MICROSOFT_CLIENT_SECRET,
-    server_metadata_url="https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration",
-    client_kwargs={
-        "scope": "openid email profile"
-    }
-)
-
-oauth.register(
-    name="github",
-    client_id=settings.GITHUB_CLIENT_ID,
-    client_secret=settings.GITHUB_CLIENT_SECRET,
-    authorize_url="https://github.com/login/oauth/authorize",
-    access_token_url="https://github.com/login/oauth/access_token",
-    api_base_url="https://api.github.com/",
-    client_kwargs={
-        "scope": "user:email"
-    }
-)
+
+def _google() -> Dict[str, Any]:
+    return dict(
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+        client_kwargs={
+            "scope": "openid email profile",
+            "timeout": settings.GOOGLE_HTTP_TIMEOUT_SECONDS,
+        }
+    )
+
+
+def _microsoft() -> Dict[str, Any]:
+    return dict(
+        client_id=settings.MICROSOFT_CLIENT_ID,
+        client_secret=settings.MICROSOFT_CLIENT_SECRET,
+        server_metadata_url="https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration",
+        client_kwargs={
+            "scope": "openid email profile",
+            "timeout": settings.MICROSOFT_HTTP_TIMEOUT_SECONDS,
+        }
+    )
+
+
+def _github() -> Dict[str, Any]:
+    return dict(
+        client_id=settings.GITHUB_CLIENT_ID,
+        client_secret=settings.GITHUB_CLIENT_SECRET,
+        authorize_url="https://github.com/login/oauth/authorize",
+        access_token_url="https://github.com/login/oauth/access_token",
+        api_base_url="https://api.github.com/",
+        client_kwargs={
+            "scope": "user:email",
+            "timeout": settings.GITHUB_HTTP_TIMEOUT_SECONDS,
+        }
+    )
+
+
+PROVIDERS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "google": _google,
+    "microsoft": _microsoft,
+    "github": _github,
+}
+
+
+class LazyOAuth:
+    """
+    Stand-in for Authlib's OAuth registry that imports Authlib and registers a
+    provider's client the first time it is used (``oauth.google``), instead of
+    at import time. Importing Authlib and its HTTP stack is a noticeable share
+    of app start-up, and most workers never serve an OAuth login.
+
+    Every client sends its requests through the shared keep-alive pool in
+    ``app.core.http``, tagged with the provider name for latency stats.
+    """
+
+    def __init__(self):
+        self._registry = None
+        self._lock = threading.Lock()
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            from authlib.integrations.starlette_client import OAuth
+            self._registry = OAuth()
+        return self._registry
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") or name not in PROVIDERS:
+            raise AttributeError(name)
+        with self._lock:
+            client = self.__dict__.get(name)
+            if client is None:
+                config = PROVIDERS[name]()
+                config["client_kwargs"]["transport"] = outbound_http.for_provider(name)
+                client = self.registry.register(name=name, **config)
+                if config.get("server_metadata_url"):
+                    oidc_metadata.attach(config["server_metadata_url"], client)
+                # Cache on the instance so later lookups skip __getattr__
+                setattr(self, name, client)
+        return client
+
+
+def discovery_urls() -> List[str]:
+    """
+    OpenID discovery URLs of the providers that have a client id configured.
+    """
+    urls = []
+    for factory in PROVIDERS.values():
+        config = factory()
+        if config.get("client_id") and config.get("server_metadata_url"):
+            urls.append(config["server_metadata_url"])
+    return urls
+
+
+oauth = LazyOAuth()
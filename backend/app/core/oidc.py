@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.http import outbound_http
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+Entry = Dict[str, Any]  # {"url", "metadata", "jwks", "fetched_at"}
+
+
+class ProviderMetadataCache:
+    """
+    TTL cache of OpenID Connect discovery documents and their JWKS.
+
+    Authlib fetches a provider's ``.well-known/openid-configuration`` and
+    signing keys the first time a client needs them, i.e. in the middle of a
+    login callback, and then keeps them for the life of the process. This cache
+    fills Authlib's clients up front instead: entries are persisted to disk so
+    a new worker starts with them, and a background task refetches them before
+    they expire. A failed refresh keeps serving the last good copy.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str],
+        ttl_seconds: float,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.cache_dir = cache_dir or None
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        # Tests point this at a local stand-in provider
+        self.transport = transport or outbound_http.for_provider("oidc_metadata")
+        self._entries: Dict[str, Entry] = {}
+        self._clients: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    # --- Storage -------------------------------------------------------
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, url: str) -> Optional[Entry]:
+        """
+        Return the cached entry for a discovery URL (fresh or not), or None.
+        """
+        entry = self._entries.get(url)
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._path(url)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None and entry.get("url") == url:
+                self._entries[url] = entry
+            else:
+                entry = None
+        return entry
+
+    def _store(self, entry: Entry) -> None:
+        self._entries[entry["url"]] = entry
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(entry["url"])
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not persist OIDC metadata for %s: %s", entry["url"], e)
+
+    def is_fresh(self, entry: Optional[Entry]) -> bool:
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    # --- Fetching ------------------------------------------------------
+
+    async def fetch(self, url: str) -> Entry:
+        """
+        Download a discovery document and its JWKS, store them and update the
+        client using them.
+        """
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+            metadata = response.json()
+            jwks = None
+            if metadata.get("jwks_uri"):
+                response = await client.get(metadata["jwks_uri"])
+                response.raise_for_status()
+                jwks = response.json()
+        entry = {"url": url, "metadata": metadata, "jwks": jwks, "fetched_at": time.time()}
+        self._store(entry)
+        client = self._clients.get(url)
+        if client is not None:
+            self.apply(client, entry)
+        return entry
+
+    async def get(self, url: str) -> Entry:
+        """
+        Return a fresh entry, fetching it only when the cached one expired.
+        """
+        entry = self.load(url)
+        if self.is_fresh(entry):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return await self.fetch(url)
+
+    # --- Authlib clients -----------------------------------------------
+
+    @staticmethod
+    def apply(client: Any, entry: Entry) -> None:
+        metadata = dict(entry["metadata"])
+        if entry.get("jwks") is not None:
+            metadata["jwks"] = entry["jwks"]
+        # Authlib skips its own fetch once _loaded_at is set
+        metadata["_loaded_at"] = entry["fetched_at"]
+        client.server_metadata.update(metadata)
+
+    def attach(self, url: str, client: Any) -> None:
+        """
+        Keep an Authlib client's metadata filled from this cache.
+        """
+        self._clients[url] = client
+        entry = self.load(url)
+        if entry is not None:
+            self.apply(client, entry)
+
+    # --- Background refresh --------------------------------------------
+
+    async def refresh(self, url: str) -> None:
+        entry = self.load(url)
+        # Refresh once most of the TTL has passed, so entries never expire in use
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds * 0.75:
+            return
+        try:
+            await self.fetch(url)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Could not refresh OIDC metadata from %s: %s", url, e)
+
+    async def _run(self, urls) -> None:
+        interval = max(self.ttl_seconds / 4, 1.0)
+        while True:
+            await asyncio.gather(*(self.refresh(url) for url in urls))
+            await asyncio.sleep(interval)
+
+    def start(self, urls) -> None:
+        """
+        Refresh the given discovery URLs in the background, starting now.
+        """
+        urls = list(urls)
+        if urls and self._task is None:
+            self._task = asyncio.create_task(self._run(urls))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+oidc_metadata = ProviderMetadataCache(
+    cache_dir=settings.OIDC_METADATA_CACHE_DIR,
+    ttl_seconds=settings.OIDC_METADATA_TTL_SECONDS,
+)
@@ -1,5 +1,13 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
 from passlib.context import CryptContext
 
+from app.core.config import get_settings
+
+settings = get_settings()
+
 # Setup password context
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
@@ -14,3 +22,77 @@ def hash_password(password: str) -> str:
     Hash a password for storage.
     """
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when too many password hashes are already running or queued.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs Argon2 hashing and verification on a dedicated executor so that a burst
+    of logins does not block the event loop (and every other request on the
+    worker) for tens of milliseconds per call.
+
+    At most ``workers`` calls run at once and at most ``max_queue`` more wait;
+    beyond that calls fail fast with PasswordHasherBusy instead of piling up.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 2, max_queue: int = 32):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported password hash executor {kind!r}; expected 'thread' or 'process'")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.workers + self.max_queue:
+            raise PasswordHasherBusy("Too many password hashing requests, try again shortly")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password for storage without blocking the event loop.
+    """
+    return await password_hasher.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password without blocking the event loop.
+    """
+    return await password_hasher.verify(plain_password, hashed_password)
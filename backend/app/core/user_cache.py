@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import get_settings
+from app.models.user import User
+
+settings = get_settings()
+
+
+class UserCache:
+    """
+    Bounded LRU cache of verified access tokens and the user they belong to.
+
+    Entries hold a plain snapshot of the user's columns and expire after
+    ``ttl_seconds`` or when the token does, whichever comes first. The cache is
+    per process: writes to a user through the ORM invalidate its entries here,
+    other workers pick the change up when their entries expire.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the user snapshot cached for ``token``, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._discard(token)
+            self.misses += 1
+            return None
+
+    def set(self, token: str, snapshot: Dict[str, Any], token_expires_at: Optional[float] = None) -> None:
+        """
+        Cache a user snapshot for a verified token.
+
+        ``token_expires_at`` is the token's ``exp`` claim (a Unix timestamp).
+        """
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (time.monotonic() + ttl, snapshot)
+            self._tokens_by_user.setdefault(snapshot["id"], set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[1]["id"]
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Drop every cached token of a user.
+        """
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._discard(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_cache = UserCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_written(mapper, connection, target: User) -> None:
+    if target.id is not None:
+        user_cache.invalidate_user(target.id)
@@ -1,21 +1,73 @@
+import asyncio
 from sqlmodel import create_engine
 from sqlalchemy.ext.asyncio import AsyncEngine
 from app.core.config import get_settings
+from app.db.pool import PRE_PING_STRATEGIES, InstrumentedPool, install_idle_pre_ping
+from app.db.profiling import install_query_profiling
+from app.db.replicas import ReplicaSet
 
 settings = get_settings()
 
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
 # Ensure we are using the async driver
 if not settings.DATABASE_URL.startswith("postgresql+asyncpg"):
     raise ValueError("DATABASE_URL must be set to use postgresql+asyncpg scheme")
+if any(not url.startswith("postgresql+asyncpg") for url in REPLICA_URLS):
+    raise ValueError("DATABASE_REPLICA_URLS must use the postgresql+asyncpg scheme")
+
+if settings.DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+    raise ValueError("DB_POOL_PRE_PING must be one of: " + ", ".join(PRE_PING_STRATEGIES))
 
-# Create the Async Engine
-# echo=False: Disable SQL query logging (enable for debugging)
-# pool_pre_ping=True: Check connection health before usage
-engine = AsyncEngine(
-    create_engine(
-        settings.DATABASE_URL,
-        echo=False,
-        future=True,
-        pool_pre_ping=True,
+def _create_engine(url: str) -> AsyncEngine:
+    # echo=False: Disable SQL query logging (enable for debugging)
+    # Pool sizing and connection health checks come from settings; see DB_POOL_*
+    async_engine = AsyncEngine(
+        create_engine(
+            url,
+            echo=False,
+            future=True,
+            poolclass=InstrumentedPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING == "always",
+        )
     )
+    if settings.DB_POOL_PRE_PING == "idle":
+        install_idle_pre_ping(async_engine.sync_engine, settings.DB_POOL_PING_IDLE_SECONDS)
+    if settings.SQL_PROFILING:
+        install_query_profiling(async_engine.sync_engine, settings.SQL_SLOW_QUERY_MS / 1000)
+    return async_engine
+
+# Create the Async Engine (the primary: all writes go here)
+engine = _create_engine(settings.DATABASE_URL)
+
+# Read replicas; with none configured every read goes to the primary
+replicas = ReplicaSet(
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS,
 )
+for url in REPLICA_URLS:
+    replicas.add(url, _create_engine(url))
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open ``connections`` pooled connections up front so the first requests
+    after startup do not pay for connection setup.
+    """
+    connections = min(connections, engine.pool.size())
+    if connections <= 0:
+        return
+
+    async def connect():
+        conn = await engine.connect()
+        await conn.exec_driver_sql("SELECT 1")
+        return conn
+
+    # Open them concurrently so each one is a separate connection
+    opened = await asyncio.gather(*(connect() for _ in range(connections)))
+    for conn in opened:
+        await conn.close()
@@ -0,0 +1,71 @@
+import re
+from sqlalchemy import Column, Float, Index, Integer, JSON, LargeBinary, MetaData, PrimaryKeyConstraint, Table
+
+# Layer data tables are created at runtime, one per Layer, so they live in their
+# own MetaData instead of SQLModel.metadata (create_all must not touch them).
+layer_metadata = MetaData()
+
+_TABLE_NAME = re.compile(r"^[a-z_][a-z0-9_]{0,49}$")
+
+
+def validate_table_name(name: str) -> str:
+    """
+    Ensure a data table name is a plain lowercase SQL identifier.
+    """
+    if not _TABLE_NAME.match(name):
+        raise ValueError(f"Invalid layer data table name: {name!r}")
+    return name
+
+
+def get_data_table(name: str) -> Table:
+    """
+    Returns the Table definition for a layer data table.
+
+    Every data table has the same layout: an integer primary key, the geometry
+    (WKB, or TWKB when GEOMETRY_ENCODING says so), a JSON properties object and
+    the geometry bounding box, which lets spatial queries prefilter rows with
+    plain column comparisons.
+    """
+    validate_table_name(name)
+    if name in layer_metadata.tables:
+        return layer_metadata.tables[name]
+    return Table(
+        name,
+        layer_metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("geom", LargeBinary, nullable=True),
+        Column("properties", JSON, nullable=True),
+        Column("minx", Float, nullable=True),
+        Column("miny", Float, nullable=True),
+        Column("maxx", Float, nullable=True),
+        Column("maxy", Float, nullable=True),
+        Index(f"ix_{name}_bbox", "minx", "maxx", "miny", "maxy"),
+    )
+
+
+def pyramid_table_name(data_table: str) -> str:
+    return f"{validate_table_name(data_table)}_lod"
+
+
+def get_pyramid_table(data_table: str, building: bool = False) -> Table:
+    """
+    Returns the Table definition holding a layer's simplified geometries.
+
+    There is one row per feature and pyramid level (the zoom it was simplified
+    for), and only for features that simplification actually changed; any
+    other feature is read from the data table as is.
+
+    With ``building``, the table a rebuild writes to before it is renamed
+    into place (see app.services.pyramid).
+    """
+    name = pyramid_table_name(data_table) + ("_build" if building else "")
+    if name in layer_metadata.tables:
+        return layer_metadata.tables[name]
+    return Table(
+        name,
+        layer_metadata,
+        Column("level", Integer, nullable=False),
+        Column("id", Integer, nullable=False),
+        Column("geom", LargeBinary, nullable=False),
+        PrimaryKeyConstraint("level", "id", name=f"pk_{name}"),
+    )
@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    The default async queue pool, plus counters for how long checkouts wait
+    for a free connection.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """
+    Current pool occupancy and, for an InstrumentedPool, checkout wait times.
+    """
+    stats: Dict[str, Any] = {"status": pool.status()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, InstrumentedPool):
+        stats.update(
+            checkouts=pool.checkouts,
+            wait_seconds_total=round(pool.wait_seconds_total, 6),
+            wait_seconds_max=round(pool.wait_seconds_max, 6),
+            wait_seconds_mean=round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+            pings=pool.pings,
+            ping_failures=pool.ping_failures,
+        )
+    return stats
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float) -> None:
+    """
+    Ping connections on checkout only when they sat idle in the pool for longer
+    than ``idle_seconds``.
+
+    pool_pre_ping pings on every checkout, which adds a round trip to every
+    request. Connections that were in use moments ago are almost always still
+    alive, so only the idle ones are worth checking. A failed ping makes the
+    pool discard the connection and hand out another one.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record) -> None:
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        pool = engine.pool
+        try:
+            alive = engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        if isinstance(pool, InstrumentedPool):
+            pool.pings += 1
+            if not alive:
+                pool.ping_failures += 1
+        if not alive:
+            raise exc.DisconnectionError("Connection failed its idle pre-ping")
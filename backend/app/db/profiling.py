@@ -0,0 +1,143 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryProfile:
+    """
+    Queries run on behalf of one request, and the time spent in them.
+    """
+    scope: Optional[Scope] = None
+    queries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def route(self) -> str:
+        if self.scope is None:
+            return "-"
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Describe bound parameters by type only, e.g. ``{id: int, name: str}`` or
+    ``3 x (int, str)``, so slow-query logs show the statement's shape without
+    leaking values.
+    """
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {parameter_shape(rows[0]) if rows else '()'}"
+    if parameters is None:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def install_query_profiling(engine: Engine, slow_query_seconds: float) -> None:
+    """
+    Time every statement on ``engine``: add it to the current request's
+    profile and log it when it takes longer than ``slow_query_seconds``.
+    """
+
+    def record(statement, parameters, executemany, elapsed, failed=False):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.seconds += elapsed
+        if elapsed >= slow_query_seconds:
+            logger.warning(
+                "Slow %squery (%.1f ms) in %s: %s -- parameters %s",
+                "failed " if failed else "",
+                elapsed * 1000,
+                profile.route if profile is not None else "-",
+                " ".join(statement.split()),
+                parameter_shape(parameters, executemany),
+            )
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        record(statement, parameters, executemany, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A statement that failed on the cursor has no after_cursor_execute;
+        # its start time is popped here so later ones are timed correctly
+        conn = exception_context.connection
+        context = exception_context.execution_context
+        if conn is None or context is None or not conn.info.get("query_start"):
+            return
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        record(exception_context.statement or "", exception_context.parameters, context.executemany, elapsed, failed=True)
+
+
+class QueryProfilingMiddleware:
+    """
+    ASGI middleware that collects a QueryProfile per request.
+
+    Requests running more than ``max_queries`` statements are logged, which is
+    how N+1 patterns (one query per related row) show up. With
+    ``server_timing`` the query count and DB time are returned in a
+    ``Server-Timing`` header; queries made after the response started, e.g.
+    while streaming a body, are not included in it.
+    """
+
+    def __init__(self, app: ASGIApp, max_queries: int, server_timing: bool = False):
+        self.app = app
+        self.max_queries = max_queries
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope=scope)
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.server_timing and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.seconds * 1000:.1f};desc="{profile.queries} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            if profile.queries > self.max_queries:
+                logger.warning(
+                    "%s ran %d queries (%.1f ms); look for per-row lazy loads",
+                    profile.route,
+                    profile.queries,
+                    profile.seconds * 1000,
+                )
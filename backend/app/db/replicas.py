@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary. A replica with nothing left to
+# replay is not lagging, however old its last replayed transaction is.
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: AsyncEngine
+    healthy: bool = False
+    # Exponentially weighted round trip time of the health check, in seconds
+    latency: Optional[float] = None
+    lag: Optional[float] = None
+    checked_at: Optional[float] = None
+    failures: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+@dataclass
+class ReplicaSet:
+    """
+    Read replicas with their last known health, latency and replication lag.
+
+    A background task checks every replica every ``check_interval`` seconds.
+    choose() returns one of the fastest healthy replicas whose lag is under
+    ``max_lag``, or None, in which case reads go to the primary.
+    """
+
+    replicas: List[Replica] = field(default_factory=list)
+    max_lag: float = 5.0
+    check_interval: float = 10.0
+    latency_smoothing: float = 0.3
+    # Replicas within this factor of the fastest one share the load
+    latency_tolerance: float = 2.0
+    _task: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    def add(self, url: str, engine: AsyncEngine) -> Replica:
+        replica = Replica(url=url, engine=engine)
+        self.replicas.append(replica)
+
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _on_error(context) -> None:
+            # A dropped connection takes the replica out until the next good check
+            if context.is_disconnect:
+                self.mark_unhealthy(replica)
+
+        return replica
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s marked unhealthy", replica.name)
+        replica.healthy = False
+        replica.failures += 1
+
+    async def check(self, replica: Replica) -> None:
+        """
+        Measure one replica's round trip time and replication lag.
+        """
+        started = time.perf_counter()
+        try:
+            async with replica.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                elapsed = time.perf_counter() - started
+                lag = 0.0
+                if conn.dialect.name == "postgresql":
+                    lag = float((await conn.execute(_LAG_QUERY)).scalar() or 0.0)
+        except Exception as e:
+            logger.warning("Read replica %s failed its health check: %s", replica.name, e)
+            self.mark_unhealthy(replica)
+            replica.checked_at = time.monotonic()
+            return
+        if replica.latency is None:
+            replica.latency = elapsed
+        else:
+            replica.latency += self.latency_smoothing * (elapsed - replica.latency)
+        replica.lag = lag
+        replica.healthy = True
+        replica.checked_at = time.monotonic()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    def caught_up(self, replica: Replica) -> bool:
+        """
+        Whether the replica had nothing left to replay at a check made within
+        the last two check intervals.
+        """
+        return (
+            replica.healthy
+            and replica.lag == 0
+            and replica.checked_at is not None
+            and time.monotonic() - replica.checked_at <= 2 * self.check_interval
+        )
+
+    def choose(self) -> Optional[Replica]:
+        candidates = [
+            r for r in self.replicas
+            if r.healthy and r.latency is not None and (r.lag or 0.0) <= self.max_lag
+        ]
+        if not candidates:
+            return None
+        fastest = min(r.latency for r in candidates)
+        candidates = [r for r in candidates if r.latency <= fastest * self.latency_tolerance]
+        return random.choice(candidates)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_all()
+
+    async def start(self) -> None:
+        """
+        Check every replica once, then keep checking in the background.
+        """
+        if not self.replicas:
+            return
+        await self.check_all()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
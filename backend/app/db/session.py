@@ -1,15 +1,35 @@
 from typing import AsyncGenerator
+from fastapi import Depends
 from sqlalchemy.orm import sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.db.engine import engine
+from app.db.engine import engine, replicas
+
+# One factory for the whole process; building a sessionmaker is not free
+async_session_factory = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency to provide an async database session.
     Yields an AsyncSession and ensures it is closed after use.
     """
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
+        yield session
+
+async def get_read_session(
+    session: AsyncSession = Depends(get_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to provide a session for read-only work.
+    Yields a session on a read replica when a healthy, caught-up one is
+    available, and otherwise the request's primary session itself.
+    Never write through it.
+    """
+    replica = replicas.choose()
+    if replica is None:
         yield session
+        return
+    async with async_session_factory(bind=replica.engine) as read_session:
+        read_session.info["replica"] = replica
+        yield read_session
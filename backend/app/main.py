@@ -1,24 +1,38 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
-from sqlmodel import SQLModel, text
+from sqlmodel import text
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import get_settings
 from app.core.logging import configure_logging
-from app.db.engine import engine
+from app.db.engine import engine, replicas, warm_pool
+from app.db.profiling import QueryProfilingMiddleware
+from app.db.schema import check_schema
 from app.db.session import get_session
 from app.api import get_v1_router
 from app.api.v1.routes_health import router as health_router
+from app.api.v1.routes_metrics import router as metrics_router
 from app.api.v1.routes_auth import router as auth_router
 from app.api.v1.routes_oauth import router as oauth_router
 from app.api.v1.routes_users import router as users_router
+from app.api.v1.routes_layers import router as layers_router
+from app.api.v1.routes_projects import router as projects_router
+from app.api.v1.routes_jobs import router as jobs_router
 from app.models.user import User
 from app.models.company import Company
 from app.models.user_company import UserCompany
 from app.models.project import Project
 from app.models.layer import Layer
+from app.models.export import LayerExport
+from app.models.job import Job
 from app.models.example_model import ExampleModel
 from app.core import security
+from app.core.compression import CompressionMiddleware
+from app.core.http import outbound_http
+from app.core.metrics import MetricsMiddleware
+from app.core.oauth import discovery_urls
+from app.core.oidc import oidc_metadata
+from app.services.jobs import job_dispatcher
 
 # Configure logging early
 configure_logging()
@@ -27,46 +41,85 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize Database
-    async with engine.begin() as conn:
-        # Create all tables defined in SQLModel metadata
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # Startup: Check the database schema (migrations are applied by `alembic upgrade head`)
+    await check_schema(engine, mode=settings.DB_SCHEMA_CHECK)
+    await warm_pool(engine, settings.DB_POOL_WARM_CONNECTIONS)
+    await replicas.start()
+    oidc_metadata.start(discovery_urls())
+    if settings.JOBS_IN_PROCESS:
+        job_dispatcher.start()
     yield
     # Shutdown: Add cleanup code here if needed
+    await job_dispatcher.stop()
+    security.password_hasher.shutdown()
+    await oidc_metadata.stop()
+    await outbound_http.aclose()
+    await replicas.stop()
     await engine.dispose()
 
-app = FastAPI(
-    title="Layer Flow Backend",
-    debug=True, # Should be from settings
-    lifespan=lifespan
-)
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application: middleware, routers and lifespan.
+    """
+    app = FastAPI(
+        title="Layer Flow Backend",
+        debug=True, # Should be from settings
+        lifespan=lifespan
+    )
+
+    # CORS Middleware
+    from fastapi.middleware.cors import CORSMiddleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allows all origins
+        allow_credentials=True,
+        allow_methods=["*"],  # Allows all methods
+        allow_headers=["*"],  # Allows all headers
+    )
+
+    # Session Middleware (Required for OAuth state)
+    from starlette.middleware.sessions import SessionMiddleware
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.SESSION_SECRET_KEY,
+        same_site="lax",
+        https_only=False # Set to True in production
+    )
 
-# CORS Middleware
-from fastapi.middleware.cors import CORSMiddleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
-)
+    # Per-request SQL profiling (opt-in, see SQL_PROFILING)
+    if settings.SQL_PROFILING:
+        app.add_middleware(
+            QueryProfilingMiddleware,
+            max_queries=settings.SQL_PROFILING_MAX_QUERIES,
+            server_timing=settings.DEBUG,
+        )
 
-# Session Middleware (Required for OAuth state)
-from starlette.middleware.sessions import SessionMiddleware
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.SESSION_SECRET_KEY,
-    same_site="lax",
-    https_only=False # Set to True in production
-)
+    # Response compression, negotiated per request (see COMPRESSION_TYPES)
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=settings.COMPRESSION_ENCODINGS.split(","),
+            rules=settings.COMPRESSION_TYPES,
+        )
 
-# Register Routers
-app.include_router(health_router, prefix=f"{settings.API_V1_PREFIX}/health", tags=["health"])
-app.include_router(auth_router, prefix=settings.API_V1_PREFIX, tags=["auth"])
-app.include_router(oauth_router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["oauth"])
-app.include_router(users_router, prefix=f"{settings.API_V1_PREFIX}/users", tags=["users"])
+    # Request metrics (added last so it times the whole middleware stack)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # Register Routers
+    app.include_router(health_router, prefix=f"{settings.API_V1_PREFIX}/health", tags=["health"])
+    app.include_router(auth_router, prefix=settings.API_V1_PREFIX, tags=["auth"])
+    app.include_router(oauth_router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["oauth"])
+    app.include_router(users_router, prefix=f"{settings.API_V1_PREFIX}/users", tags=["users"])
+    app.include_router(projects_router, prefix=f"{settings.API_V1_PREFIX}/projects", tags=["projects"])
+    app.include_router(layers_router, prefix=f"{settings.API_V1_PREFIX}/layers", tags=["layers"])
+    app.include_router(jobs_router, prefix=f"{settings.API_V1_PREFIX}/jobs", tags=["jobs"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router, tags=["monitoring"])
+
+    app.add_api_route("/test-db", test_db, methods=["GET"])
+    return app
 
-@app.get("/test-db")
 async def test_db(session: AsyncSession = Depends(get_session)):
     """
     Test endpoint to verify database connection.
@@ -77,3 +130,5 @@ async def test_db(session: AsyncSession = Depends(get_session)):
         return {"connected": True}
     except Exception as e:
         return {"connected": False, "error": str(e)}
+
+app = create_app()
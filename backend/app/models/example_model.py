@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Column, LargeBinary
 from sqlmodel import SQLModel, Field
 
 class ExampleModel(SQLModel, table=True):
@@ -7,7 +8,7 @@ class ExampleModel(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     
-    # Geometry field: Stored as WKT string initially.
+    # Geometry field: Stored as WKB (see app.services.wkb).
     # In a production PostGIS setup with GeoAlchemy2, this would be:
     # geom: Any = Field(sa_column=Column(Geometry("POINT")))
-    geom: Optional[str] = None
+    geom: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary, nullable=True))
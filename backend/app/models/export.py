@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field, Column, DateTime, func
+
+class LayerExport(SQLModel, table=True):
+    __tablename__ = "layer_exports"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    layer_id: int = Field(foreign_key="layers.id", index=True)
+    # "parquet" (GeoParquet) or "fgb" (FlatGeobuf)
+    format: str
+    # pending, running, completed or failed
+    status: str = Field(default="pending")
+    features: Optional[int] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+    completed_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
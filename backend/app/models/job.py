@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlmodel import SQLModel, Field, Column, DateTime, JSON, func
+
+class Job(SQLModel, table=True):
+    __tablename__ = "jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Handler name, see app.services.job_handlers
+    kind: str
+    # pending, running, completed or failed
+    status: str = Field(default="pending", index=True)
+    project_id: int = Field(foreign_key="projects.id", index=True)
+    layer_id: Optional[int] = Field(default=None, foreign_key="layers.id", index=True)
+    params: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    result: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: Optional[str] = None
+    # Items (features, rows) processed so far, out of progress_total when known
+    progress_done: int = Field(default=0)
+    progress_total: Optional[int] = None
+    attempts: int = Field(default=0)
+    # host:pid of the process running the job
+    worker: Optional[str] = None
+    created_at: Optional[datetime] = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+    heartbeat_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+    completed_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Column, DateTime, func
 
 class Layer(SQLModel, table=True):
     __tablename__ = "layers"
@@ -10,3 +11,11 @@ class Layer(SQLModel, table=True):
     data_table: str
     srid: Optional[int] = None
     geometry_type: Optional[str] = None
+    # Comma-separated zooms the geometry pyramid was built for, if any
+    pyramid_zooms: Optional[str] = None
+    # Bumped with updated_at on every change to the layer's data (see
+    # app.services.layer_data.touch_layer); HTTP validators and caches derive from it
+    version: int = Field(default=1)
+    updated_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: str
+    project_id: int
+    layer_id: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress_done: int
+    progress_total: Optional[int] = None
+    attempts: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel
 
@@ -10,6 +11,8 @@ class LayerBase(BaseModel):
 
 class LayerRead(LayerBase):
     id: int
+    version: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
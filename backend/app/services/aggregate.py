@@ -0,0 +1,260 @@
+"""
+Grid aggregation of layer features into square or hexagonal cells.
+
+Features are binned by the centre of their bounding box, a batch of rows at a
+time: each batch becomes NumPy columns and is binned and reduced per cell,
+and the partial results are merged a few batches' worth at a time, so memory
+use follows the number of cells rather than the size of the layer.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import null
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.geometry import BBox
+from app.services.tiles import bbox_filter
+
+settings = get_settings()
+
+SHAPES = ("square", "hex")
+SQRT3 = math.sqrt(3.0)
+
+
+class AggregationError(ValueError):
+    pass
+
+
+@dataclass
+class CellStats:
+    """
+    Per-cell aggregates as parallel arrays; ``cells`` holds the (i, j) grid
+    index of each cell. ``values`` counts the features with a numeric value.
+    """
+    cells: np.ndarray
+    count: np.ndarray
+    values: np.ndarray
+    total: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "CellStats":
+        return cls(
+            cells=np.zeros((0, 2), dtype=np.int64),
+            count=np.zeros(0, dtype=np.int64),
+            values=np.zeros(0, dtype=np.int64),
+            total=np.zeros(0),
+            minimum=np.zeros(0),
+            maximum=np.zeros(0),
+        )
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+
+def square_cells(x: np.ndarray, y: np.ndarray, size: float) -> np.ndarray:
+    """
+    (i, j) of the ``size`` wide squares, aligned on the origin, holding each point.
+    """
+    return np.column_stack([np.floor(x / size), np.floor(y / size)]).astype(np.int64)
+
+
+def hex_cells(x: np.ndarray, y: np.ndarray, size: float) -> np.ndarray:
+    """
+    Axial (q, r) of the pointy-top hexagons of circumradius ``size`` holding
+    each point, by rounding fractional cube coordinates.
+    """
+    q = (SQRT3 / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    # The component that rounded furthest is recomputed from the other two
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return np.column_stack([rq, rr]).astype(np.int64)
+
+
+def cell_polygon(shape: str, i: int, j: int, size: float) -> List[List[float]]:
+    """
+    Closed exterior ring of a grid cell.
+    """
+    if shape == "square":
+        x0, y0, x1, y1 = i * size, j * size, (i + 1) * size, (j + 1) * size
+        return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+    cx = size * SQRT3 * (i + j / 2)
+    cy = size * 1.5 * j
+    ring = [
+        [cx + size * math.cos(math.radians(60 * k - 30)), cy + size * math.sin(math.radians(60 * k - 30))]
+        for k in range(6)
+    ]
+    return ring + [ring[0]]
+
+
+def _reduce(cells: np.ndarray, count, values, total, minimum, maximum) -> CellStats:
+    """
+    Combine the entries sharing a cell.
+    """
+    if not len(cells):
+        return CellStats.empty()
+    unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n = len(unique)
+    merged_min = np.full(n, np.inf)
+    merged_max = np.full(n, -np.inf)
+    np.minimum.at(merged_min, inverse, minimum)
+    np.maximum.at(merged_max, inverse, maximum)
+    return CellStats(
+        cells=unique,
+        count=np.bincount(inverse, weights=count, minlength=n).astype(np.int64),
+        values=np.bincount(inverse, weights=values, minlength=n).astype(np.int64),
+        total=np.bincount(inverse, weights=total, minlength=n),
+        minimum=merged_min,
+        maximum=merged_max,
+    )
+
+
+def bin_rows(rows: Sequence[Sequence[Any]], shape: str, size: float) -> CellStats:
+    """
+    Bin a batch of (minx, miny, maxx, maxy, value) rows into per-cell statistics.
+    Values that are not numbers only count towards ``count``.
+    """
+    if not rows:
+        return CellStats.empty()
+    minx, miny, maxx, maxy, raw = zip(*rows)
+    x = (np.asarray(minx, dtype=np.float64) + np.asarray(maxx, dtype=np.float64)) / 2
+    y = (np.asarray(miny, dtype=np.float64) + np.asarray(maxy, dtype=np.float64)) / 2
+    values = np.array(
+        [v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in raw],
+        dtype=np.float64,
+    )
+    numeric = ~np.isnan(values)
+    cells = square_cells(x, y, size) if shape == "square" else hex_cells(x, y, size)
+    return _reduce(
+        cells,
+        np.ones(len(x)),
+        numeric.astype(np.float64),
+        np.where(numeric, values, 0.0),
+        np.where(numeric, values, np.inf),
+        np.where(numeric, values, -np.inf),
+    )
+
+
+def merge_stats(parts: Sequence[CellStats]) -> CellStats:
+    """
+    Merge partial statistics (e.g. of separate batches) into one entry per cell.
+    """
+    parts = [part for part in parts if len(part)]
+    if len(parts) <= 1:
+        return parts[0] if parts else CellStats.empty()
+    return _reduce(
+        np.concatenate([part.cells for part in parts]),
+        np.concatenate([part.count for part in parts]),
+        np.concatenate([part.values for part in parts]),
+        np.concatenate([part.total for part in parts]),
+        np.concatenate([part.minimum for part in parts]),
+        np.concatenate([part.maximum for part in parts]),
+    )
+
+
+async def aggregate_layer(
+    session: AsyncSession,
+    layer: Layer,
+    shape: str,
+    size: float,
+    attribute: Optional[str] = None,
+    bbox: Optional[BBox] = None,
+    chunk_size: Optional[int] = None,
+) -> CellStats:
+    """
+    Aggregate a layer's features into ``shape`` cells of ``size`` layer units
+    (square width or hexagon circumradius), optionally restricted to features
+    whose bbox overlaps ``bbox``, with statistics of the numeric ``attribute``.
+
+    Raises AggregationError for an unknown shape or when the grid would have
+    more than AGGREGATE_MAX_CELLS non-empty cells.
+    """
+    if shape not in SHAPES:
+        raise AggregationError(f"Unknown cell shape {shape!r}; expected one of: " + ", ".join(SHAPES))
+    chunk_size = chunk_size or settings.FEATURE_STREAM_CHUNK_SIZE
+    table = get_data_table(layer.data_table)
+    value = table.c.properties[attribute] if attribute else null()
+    statement = select(table.c.minx, table.c.miny, table.c.maxx, table.c.maxy, value).where(
+        table.c.minx.is_not(None)
+    )
+    if bbox is not None:
+        statement = statement.where(bbox_filter(table, bbox))
+
+    def check(stats: CellStats) -> CellStats:
+        if len(stats) > settings.AGGREGATE_MAX_CELLS:
+            raise AggregationError(
+                f"More than {settings.AGGREGATE_MAX_CELLS} cells; use a larger cell size or a smaller bbox"
+            )
+        return stats
+
+    # Batch results are merged once they add up to AGGREGATE_MAX_CELLS entries,
+    # which bounds the grid, so a merge costs about as much as the batches it
+    # folds in instead of the whole grid per batch
+    stats = CellStats.empty()
+    pending: List[CellStats] = []
+    pending_size = 0
+    result = await session.stream(statement, execution_options={"yield_per": chunk_size})
+    try:
+        async for rows in result.partitions(chunk_size):
+            batch = await run_in_threadpool(bin_rows, rows, shape, size)
+            pending.append(check(batch))
+            pending_size += len(batch)
+            if pending_size >= settings.AGGREGATE_MAX_CELLS:
+                stats = check(await run_in_threadpool(merge_stats, [stats, *pending]))
+                pending, pending_size = [], 0
+    finally:
+        await result.close()
+    if pending:
+        stats = check(await run_in_threadpool(merge_stats, [stats, *pending]))
+    return stats
+
+
+def cell_collection(stats: CellStats, shape: str, size: float, with_values: bool = True) -> Dict[str, Any]:
+    """
+    Aggregated cells as a GeoJSON FeatureCollection of polygons. ``sum``,
+    ``mean``, ``min`` and ``max`` are null for cells without numeric values.
+    """
+    features = []
+    columns = zip(
+        stats.cells.tolist(),
+        stats.count.tolist(),
+        stats.values.tolist(),
+        stats.total.tolist(),
+        stats.minimum.tolist(),
+        stats.maximum.tolist(),
+    )
+    for (i, j), count, values, total, minimum, maximum in columns:
+        properties: Dict[str, Any] = {"count": count}
+        if with_values:
+            properties.update(
+                {
+                    "sum": total if values else None,
+                    "mean": total / values if values else None,
+                    "min": minimum if values else None,
+                    "max": maximum if values else None,
+                }
+            )
+        features.append(
+            {
+                "type": "Feature",
+                "id": f"{i}:{j}",
+                "geometry": {"type": "Polygon", "coordinates": [cell_polygon(shape, i, j, size)]},
+                "properties": properties,
+            }
+        )
+    return {"type": "FeatureCollection", "features": features}
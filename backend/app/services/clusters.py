@@ -0,0 +1,245 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.geometry import BBox
+from app.services.mvt import EARTH_RADIUS, MAX_LATITUDE, ORIGIN_SHIFT
+
+settings = get_settings()
+
+CLUSTER_SRIDS = (4326, 3857)
+POINT_TYPES = ("POINT", "MULTIPOINT")
+# Cells are sized in pixels of 256 pixel tiles, like web map zoom levels
+TILE_PIXELS = 256
+
+
+@dataclass
+class ZoomClusters:
+    """
+    The non-empty grid cells of one zoom level, as parallel arrays.
+    """
+    ix: np.ndarray
+    iy: np.ndarray
+    count: np.ndarray
+    sum_x: np.ndarray
+    sum_y: np.ndarray
+    minx: np.ndarray
+    miny: np.ndarray
+    maxx: np.ndarray
+    maxy: np.ndarray
+    # Feature id of single-point cells, -1 otherwise
+    feature_id: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+
+def _group(keys: np.ndarray):
+    """
+    Sort order of ``keys``, the distinct keys and where each group starts.
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return order, sorted_keys[starts], starts
+
+
+def _aggregate(keys, count, sum_x, sum_y, minx, miny, maxx, maxy, feature_id) -> ZoomClusters:
+    """
+    Merge the entries sharing a cell key (``ix << 32 | iy``) into one cell.
+    """
+    if not len(keys):
+        empty = np.zeros(0)
+        return ZoomClusters(
+            ix=keys, iy=keys, count=keys, sum_x=empty, sum_y=empty,
+            minx=empty, miny=empty, maxx=empty, maxy=empty, feature_id=keys,
+        )
+    order, cells, starts = _group(keys)
+    count = np.add.reduceat(count[order], starts)
+    return ZoomClusters(
+        ix=cells >> 32,
+        iy=cells & 0xFFFFFFFF,
+        count=count,
+        sum_x=np.add.reduceat(sum_x[order], starts),
+        sum_y=np.add.reduceat(sum_y[order], starts),
+        minx=np.minimum.reduceat(minx[order], starts),
+        miny=np.minimum.reduceat(miny[order], starts),
+        maxx=np.maximum.reduceat(maxx[order], starts),
+        maxy=np.maximum.reduceat(maxy[order], starts),
+        feature_id=np.where(count == 1, feature_id[order][starts], -1),
+    )
+
+
+class ClusterIndex:
+    """
+    Grid clusters of a point layer for every zoom from 0 to ``max_zoom``.
+
+    Points are binned into square Web Mercator cells ``cell_pixels`` wide at
+    ``max_zoom``; every coarser zoom merges 2x2 cells of the zoom below, so the
+    whole hierarchy costs one pass over the points plus one over the cells.
+    Counts, centroids and bounding boxes are in the layer's own units.
+    """
+
+    def __init__(self, ids: np.ndarray, x: np.ndarray, y: np.ndarray, srid: int, max_zoom: int, cell_pixels: int):
+        self.max_zoom = max_zoom
+        self.size = len(ids)
+        if srid == 4326:
+            mx = np.radians(x) * EARTH_RADIUS
+            lat = np.radians(np.clip(y, -MAX_LATITUDE, MAX_LATITUDE))
+            my = np.log(np.tan(np.pi / 4 + lat / 2)) * EARTH_RADIUS
+        else:
+            mx, my = x, y
+        cell = 2 * ORIGIN_SHIFT / (1 << max_zoom) / TILE_PIXELS * cell_pixels
+        ix = np.clip(np.floor((mx + ORIGIN_SHIFT) / cell), 0, None).astype(np.int64)
+        iy = np.clip(np.floor((ORIGIN_SHIFT - my) / cell), 0, None).astype(np.int64)
+
+        finest = _aggregate((ix << 32) | iy, np.ones(len(ids), dtype=np.int64), x, y, x, y, x, y, ids)
+        self.zooms: List[ZoomClusters] = [finest]
+        for _ in range(max_zoom):
+            child = self.zooms[0]
+            self.zooms.insert(0, _aggregate(
+                ((child.ix >> 1) << 32) | (child.iy >> 1),
+                child.count, child.sum_x, child.sum_y,
+                child.minx, child.miny, child.maxx, child.maxy, child.feature_id,
+            ))
+
+    def query(self, zoom: int, bbox: Optional[BBox] = None) -> List[Dict[str, Any]]:
+        """
+        Clusters at ``zoom`` (capped at max_zoom) whose centroid lies in ``bbox``.
+        """
+        level = self.zooms[max(0, min(zoom, self.max_zoom))]
+        cx = level.sum_x / np.maximum(level.count, 1)
+        cy = level.sum_y / np.maximum(level.count, 1)
+        selected = np.arange(len(level))
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            selected = np.flatnonzero((cx >= minx) & (cx <= maxx) & (cy >= miny) & (cy <= maxy))
+        columns = zip(
+            level.count[selected].tolist(),
+            cx[selected].tolist(),
+            cy[selected].tolist(),
+            level.minx[selected].tolist(),
+            level.miny[selected].tolist(),
+            level.maxx[selected].tolist(),
+            level.maxy[selected].tolist(),
+            level.feature_id[selected].tolist(),
+        )
+        return [
+            {
+                "count": count,
+                "centroid": [x, y],
+                "bbox": [minx, miny, maxx, maxy],
+                "feature_id": feature_id if feature_id >= 0 else None,
+            }
+            for count, x, y, minx, miny, maxx, maxy, feature_id in columns
+        ]
+
+
+class ClusterIndexCache:
+    """
+    Cluster indexes of the most recently queried layers, keyed by data table
+    and only returned for the layer version they were built from.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[str, Tuple[Optional[int], ClusterIndex]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def get(self, key: str, version: Optional[int] = None) -> Optional[ClusterIndex]:
+        entry = self._indexes.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._indexes.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, index: ClusterIndex, version: Optional[int] = None) -> None:
+        self._indexes[key] = (version, index)
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_entries:
+            evicted, _ = self._indexes.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def invalidate(self, key: str) -> None:
+        self._indexes.pop(key, None)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+
+
+cluster_indexes = ClusterIndexCache(max_entries=settings.CLUSTER_INDEX_MAX_LAYERS)
+
+
+async def _load_points(session: AsyncSession, layer: Layer) -> ClusterIndex:
+    table = get_data_table(layer.data_table)
+    statement = select(table.c.id, table.c.minx, table.c.miny, table.c.maxx, table.c.maxy).where(
+        table.c.minx.is_not(None)
+    )
+    rows = (await session.exec(statement)).all()
+
+    def build() -> ClusterIndex:
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        # Multipoints cluster at the centre of their bbox
+        return ClusterIndex(
+            ids=data[:, 0].astype(np.int64),
+            x=(data[:, 1] + data[:, 3]) / 2,
+            y=(data[:, 2] + data[:, 4]) / 2,
+            srid=layer.srid or 4326,
+            max_zoom=settings.CLUSTER_MAX_ZOOM,
+            cell_pixels=settings.CLUSTER_CELL_PIXELS,
+        )
+
+    return await run_in_threadpool(build)
+
+
+async def get_cluster_index(session: AsyncSession, layer: Layer) -> ClusterIndex:
+    """
+    Return the cluster index of a point layer, building it if needed.
+    """
+    srid = layer.srid or 4326
+    if srid not in CLUSTER_SRIDS:
+        raise ValueError(f"Clusters are not available for layers stored in EPSG:{srid}")
+    if layer.geometry_type and layer.geometry_type.upper() not in POINT_TYPES:
+        raise ValueError("Clusters are only available for point layers")
+
+    key = layer.data_table
+    index = cluster_indexes.get(key, layer.version)
+    if index is not None:
+        return index
+    async with cluster_indexes.lock(key):
+        index = cluster_indexes.get(key, layer.version)
+        if index is None:
+            index = await _load_points(session, layer)
+            cluster_indexes.set(key, index, layer.version)
+    return index
+
+
+def cluster_collection(clusters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Clusters as a GeoJSON FeatureCollection of centroid points. Single-point
+    clusters carry the feature's id.
+    """
+    features = []
+    for cluster in clusters:
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": cluster["centroid"]},
+            "bbox": cluster["bbox"],
+            "properties": {"count": cluster["count"]},
+        }
+        if cluster["feature_id"] is not None:
+            feature["id"] = cluster["feature_id"]
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
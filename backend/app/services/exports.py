@@ -0,0 +1,415 @@
+"""
+Layer exports to GeoParquet and FlatGeobuf files.
+
+An export makes two passes over the layer's data table. The first reads ids,
+bounding boxes and properties to find the property columns and to sort the
+features along a Hilbert curve; the second fetches the features in that order,
+a fixed-size chunk of ids at a time, and appends each chunk to the file. The
+sort keeps nearby features together, so GeoParquet row groups have tight bbox
+statistics and the FlatGeobuf R-tree is compact.
+"""
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.compression import SUFFIXES, compress_file
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.db.session import async_session_factory
+from app.models.export import LayerExport
+from app.models.layer import Layer
+from app.services import flatgeobuf
+from app.services.geometry import GEOMETRY_TYPES, GeometryError
+from app.services.wkb import TWKB_MAGIC, decode_geometry, to_wkb
+
+settings = get_settings()
+
+EXPORT_FORMATS = {"parquet": ".parquet", "fgb": ".fgb"}
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "fgb": "application/flatgeobuf"}
+
+# Feature columns of a GeoParquet export; properties with these names are left out
+RESERVED_COLUMNS = ("id", "geometry", "bbox")
+_ARROW_TYPES = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "string": pa.string(), "json": pa.string()}
+
+Columns = List[Tuple[str, str]]
+# Awaited with (features written, features in the layer) after every chunk
+Progress = Optional[Callable[[int, int], Awaitable[None]]]
+# Awaited before every write another run must not repeat; raises to abandon the export
+Ownership = Optional[Callable[[], Awaitable[None]]]
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int" if -(1 << 63) <= value < (1 << 63) else "float"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "string"
+    return "json"
+
+
+def update_columns(columns: Dict[str, str], properties: Optional[Dict[str, Any]]) -> None:
+    """
+    Widen the inferred column kinds with one feature's properties: ints and
+    floats make floats, any other mix (or nested values) makes JSON text.
+    """
+    for name, value in (properties or {}).items():
+        if value is None:
+            continue
+        kind = _kind(value)
+        current = columns.get(name)
+        if current is None or current == kind:
+            columns[name] = kind
+        elif {current, kind} == {"int", "float"}:
+            columns[name] = "float"
+        else:
+            columns[name] = "json"
+
+
+def column_value(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == "json":
+        return json.dumps(value, separators=(",", ":"))
+    if kind == "float":
+        return float(value)
+    return value
+
+
+@dataclass
+class LayerScan:
+    ids: np.ndarray
+    # (n, 4) minx, miny, maxx, maxy; NaN for features without geometry
+    boxes: np.ndarray
+    columns: Columns
+
+    def envelope(self) -> Optional[List[float]]:
+        present = self.boxes[~np.isnan(self.boxes).any(axis=1)]
+        if not len(present):
+            return None
+        return [present[:, 0].min(), present[:, 1].min(), present[:, 2].max(), present[:, 3].max()]
+
+
+def _scan_rows(rows: Sequence, columns: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+    for row in rows:
+        update_columns(columns, row[5])
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    boxes = np.array([row[1:5] for row in rows], dtype=np.float64).reshape(-1, 4)
+    return ids, boxes
+
+
+async def scan_layer(session: AsyncSession, layer: Layer, chunk_size: int) -> LayerScan:
+    """
+    First pass: every feature's id and bbox, and the property columns.
+    """
+    table = get_data_table(layer.data_table)
+    statement = select(
+        table.c.id, table.c.minx, table.c.miny, table.c.maxx, table.c.maxy, table.c.properties
+    ).order_by(table.c.id)
+    columns: Dict[str, str] = {}
+    ids, boxes = [np.zeros(0, dtype=np.int64)], [np.zeros((0, 4))]
+    result = await session.stream(statement, execution_options={"yield_per": chunk_size})
+    try:
+        async for rows in result.partitions(chunk_size):
+            chunk_ids, chunk_boxes = await run_in_threadpool(_scan_rows, rows, columns)
+            ids.append(chunk_ids)
+            boxes.append(chunk_boxes)
+    finally:
+        await result.close()
+    return LayerScan(ids=np.concatenate(ids), boxes=np.concatenate(boxes), columns=list(columns.items()))
+
+
+async def _ordered_rows(
+    session: AsyncSession, layer: Layer, ids: np.ndarray, chunk_size: int
+) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """
+    Second pass: (position in ``ids``, (id, geom, properties)) for every
+    feature, in the order of ``ids``, a chunk at a time. Features deleted
+    since the scan are skipped.
+    """
+    table = get_data_table(layer.data_table)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size].tolist()
+        statement = select(table.c.id, table.c.geom, table.c.properties).where(table.c.id.in_(chunk))
+        by_id = {row[0]: row for row in (await session.exec(statement)).all()}
+        yield [(start + i, by_id[feature_id]) for i, feature_id in enumerate(chunk) if feature_id in by_id]
+
+
+def _decode(geom: Optional[bytes]):
+    if not geom:
+        return None
+    try:
+        return decode_geometry(geom)
+    except GeometryError:
+        return None
+
+
+def _as_wkb(geom: Optional[bytes]) -> Optional[bytes]:
+    if not geom:
+        return None
+    if geom[:1] == TWKB_MAGIC:
+        geometry = _decode(geom)
+        return to_wkb(geometry) if geometry is not None else None
+    return bytes(geom)
+
+
+# --- GeoParquet ----------------------------------------------------------------
+
+
+def geoparquet_schema(layer: Layer, columns: Columns, envelope: Optional[List[float]]) -> pa.Schema:
+    """
+    Arrow schema with GeoParquet 1.1 metadata: WKB geometries and a bbox
+    struct column declared as their covering, which lets readers skip row
+    groups by the bbox column statistics.
+    """
+    geometry_type = GEOMETRY_TYPES.get((layer.geometry_type or "").upper())
+    column: Dict[str, Any] = {
+        "encoding": "WKB",
+        "geometry_types": [geometry_type] if geometry_type else [],
+        "covering": {"bbox": {key: ["bbox", key] for key in ("xmin", "ymin", "xmax", "ymax")}},
+    }
+    if envelope is not None:
+        column["bbox"] = envelope
+    srid = layer.srid or 4326
+    if srid != 4326:
+        # Without "crs" readers assume OGC:CRS84, which is EPSG:4326 in lon/lat order
+        column["crs"] = {"id": {"authority": "EPSG", "code": srid}}
+    geo = {"version": "1.1.0", "primary_column": "geometry", "columns": {"geometry": column}}
+
+    bbox = pa.struct([(key, pa.float64()) for key in ("xmin", "ymin", "xmax", "ymax")])
+    fields = [pa.field("id", pa.int64(), nullable=False), pa.field("geometry", pa.binary()), pa.field("bbox", bbox)]
+    fields += [pa.field(name, _ARROW_TYPES[kind]) for name, kind in columns]
+    return pa.schema(fields, metadata={b"geo": json.dumps(geo).encode("utf-8")})
+
+
+def _parquet_table(schema: pa.Schema, columns: Columns, boxes: np.ndarray, rows: List[Tuple[int, Any]]) -> pa.Table:
+    chunk_boxes = boxes[[position for position, _ in rows]]
+    bbox = pa.StructArray.from_arrays(
+        [pa.array(chunk_boxes[:, i], from_pandas=True) for i in range(4)],
+        names=["xmin", "ymin", "xmax", "ymax"],
+    )
+    arrays = [
+        pa.array([row[0] for _, row in rows], type=pa.int64()),
+        pa.array([_as_wkb(row[1]) for _, row in rows], type=pa.binary()),
+        bbox,
+    ]
+    for name, kind in columns:
+        values = [column_value(kind, (row[2] or {}).get(name)) for _, row in rows]
+        arrays.append(pa.array(values, type=_ARROW_TYPES[kind]))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+async def write_geoparquet(
+    session: AsyncSession, layer: Layer, path: str, chunk_size: int, progress: Progress = None
+) -> int:
+    """
+    Write a layer to a GeoParquet file, one row group per chunk. Returns the
+    number of features written.
+    """
+    scan = await scan_layer(session, layer, chunk_size)
+    columns = [(name, kind) for name, kind in scan.columns if name not in RESERVED_COLUMNS]
+    order = flatgeobuf.hilbert_order(scan.boxes)
+    ids, boxes = scan.ids[order], scan.boxes[order]
+    schema = geoparquet_schema(layer, columns, scan.envelope())
+
+    written = 0
+    writer = pq.ParquetWriter(path, schema)
+    try:
+        async for rows in _ordered_rows(session, layer, ids, chunk_size):
+            if rows:
+                table = await run_in_threadpool(_parquet_table, schema, columns, boxes, rows)
+                await run_in_threadpool(writer.write_table, table, row_group_size=len(rows))
+                written += len(rows)
+            if progress is not None:
+                await progress(written, len(ids))
+    finally:
+        await run_in_threadpool(writer.close)
+    return written
+
+
+# --- FlatGeobuf ----------------------------------------------------------------
+
+
+def _fgb_features(columns: Columns, rows: List[Tuple[int, Any]]) -> List[bytes]:
+    return [
+        flatgeobuf.encode_feature(_decode(row[1]), flatgeobuf.encode_properties(columns, row[2]))
+        for _, row in rows
+    ]
+
+
+def _assemble_fgb(path: str, features_path: str, header: bytes, index: bytes) -> None:
+    with open(path, "wb") as out:
+        out.write(header)
+        out.write(index)
+        with open(features_path, "rb") as features:
+            shutil.copyfileobj(features, out)
+
+
+async def write_flatgeobuf(
+    session: AsyncSession, layer: Layer, path: str, chunk_size: int, progress: Progress = None
+) -> int:
+    """
+    Write a layer to a FlatGeobuf file with a packed Hilbert R-tree. Returns
+    the number of features written.
+
+    Leaves of the index hold feature byte offsets, so features are encoded to
+    a side file first and copied in after the header and index. A layer with
+    features without geometry gets no index.
+    """
+    scan = await scan_layer(session, layer, chunk_size)
+    order = flatgeobuf.hilbert_order(scan.boxes)
+    ids, boxes = scan.ids[order], scan.boxes[order]
+
+    positions: List[int] = []
+    offsets: List[int] = []
+    offset = 0
+    features_path = path + ".features"
+    try:
+        with open(features_path, "wb") as out:
+            async for rows in _ordered_rows(session, layer, ids, chunk_size):
+                encoded = await run_in_threadpool(_fgb_features, scan.columns, rows)
+                for (position, _), feature in zip(rows, encoded):
+                    positions.append(position)
+                    offsets.append(offset)
+                    offset += len(feature)
+                await run_in_threadpool(out.write, b"".join(encoded))
+                if progress is not None:
+                    await progress(len(positions), len(ids))
+
+        written_boxes = boxes[positions]
+        indexed = bool(positions) and not np.isnan(written_boxes).any()
+        node_size = flatgeobuf.DEFAULT_NODE_SIZE if indexed else 0
+        header = flatgeobuf.encode_header(
+            layer.name,
+            flatgeobuf.header_type(layer.geometry_type),
+            scan.columns,
+            len(positions),
+            envelope=scan.envelope(),
+            srid=layer.srid or 4326,
+            index_node_size=node_size,
+        )
+        index = flatgeobuf.packed_rtree(written_boxes, np.array(offsets, dtype=np.uint64), node_size) if indexed else b""
+        await run_in_threadpool(_assemble_fgb, path, features_path, header, index)
+    finally:
+        if os.path.exists(features_path):
+            os.remove(features_path)
+    return len(positions)
+
+
+WRITERS = {"parquet": write_geoparquet, "fgb": write_flatgeobuf}
+
+
+def export_path(export: LayerExport) -> str:
+    return os.path.join(settings.EXPORT_DIR, f"layer_{export.layer_id}_export_{export.id}{EXPORT_FORMATS[export.format]}")
+
+
+def precompressed_path(export: LayerExport, encoding: str) -> str:
+    return export_path(export) + SUFFIXES[encoding]
+
+
+def precompress_encodings(export_format: str) -> List[str]:
+    """
+    Encodings an export format is also stored in (EXPORT_PRECOMPRESS_FORMATS).
+    """
+    if export_format not in settings.EXPORT_PRECOMPRESS_FORMATS.split(","):
+        return []
+    return [encoding for encoding in settings.COMPRESSION_ENCODINGS.split(",") if encoding in SUFFIXES]
+
+
+def _partial_path(path: str) -> str:
+    # Unique per run, so a run that lost its job cannot write into the file of
+    # the run that took it over
+    return f"{path}.{uuid.uuid4().hex}.partial"
+
+
+def _precompress(export: LayerExport) -> None:
+    path = export_path(export)
+    levels = settings.COMPRESSION_TYPES.get(MEDIA_TYPES[export.format], {})
+    for encoding in precompress_encodings(export.format):
+        target = precompressed_path(export, encoding)
+        partial = _partial_path(target)
+        compress_file(path, partial, encoding, levels.get(encoding))
+        os.replace(partial, target)
+
+
+def export_filename(layer: Layer, export: LayerExport) -> str:
+    """
+    Download name: the layer name reduced to safe characters.
+    """
+    stem = "".join(c if c.isalnum() or c in "-_" else "_" for c in layer.name).strip("_") or f"layer_{layer.id}"
+    return stem + EXPORT_FORMATS[export.format]
+
+
+async def run_export(
+    export_id: int, session_factory=None, progress: Progress = None, ensure_owned: Ownership = None
+) -> int:
+    """
+    Write an export's file and record the outcome on it; errors are recorded
+    and re-raised. Returns the number of features written.
+
+    ``ensure_owned`` is awaited before the file is put in place and before the
+    outcome is committed, so a run whose job was taken over leaves both alone.
+
+    The file is written under a temporary name and renamed when complete, so
+    a download never sees a partial file. Formats in EXPORT_PRECOMPRESS_FORMATS
+    are then also stored compressed, before the export is marked completed.
+    """
+    async with (session_factory or async_session_factory)() as session:
+        export = await session.get(LayerExport, export_id)
+        layer = await session.get(Layer, export.layer_id) if export is not None else None
+        if layer is None:
+            raise LookupError(f"Export {export_id} or its layer no longer exists")
+        export.status = "running"
+        session.add(export)
+        await session.commit()
+
+        path = export_path(export)
+        partial = _partial_path(path)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            writer = WRITERS[export.format]
+            features = await writer(session, layer, partial, settings.EXPORT_CHUNK_SIZE, progress)
+            if ensure_owned is not None:
+                await ensure_owned()
+            os.replace(partial, path)
+            await run_in_threadpool(_precompress, export)
+        except asyncio.CancelledError:
+            # Shutting down, or the job was taken over: the export is left as it is
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        except Exception as e:
+            await session.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+            if ensure_owned is not None:
+                await ensure_owned()
+            export.status = "failed"
+            export.error = str(e) or type(e).__name__
+            export.completed_at = datetime.now(timezone.utc)
+            session.add(export)
+            await session.commit()
+            raise
+        if ensure_owned is not None:
+            await ensure_owned()
+        export.status = "completed"
+        export.features = features
+        export.size_bytes = os.path.getsize(path)
+        export.completed_at = datetime.now(timezone.utc)
+        session.add(export)
+        await session.commit()
+        return features
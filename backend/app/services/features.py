@@ -0,0 +1,165 @@
+import json
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.geometry import BBox, Geometry, GeometryError, geometries_intersect, geometry_bbox
+from app.services.pagination import encode_cursor
+from app.services.pyramid import feature_statement
+from app.services.reproject import reproject_geometries
+from app.services.spatial_index import get_layer_index, use_memory_index
+from app.services.tiles import bbox_filter
+from app.services.wkb import decode_geometry
+
+settings = get_settings()
+
+
+def _decode_rows(rows, intersects: Optional[Geometry] = None) -> List[Tuple[int, Optional[Geometry], Optional[dict]]]:
+    """
+    Decode the geometries of (id, geom, properties) rows, dropping the rows
+    that do not intersect ``intersects``.
+    """
+    out = []
+    for feature_id, geom, properties in rows:
+        geometry = None
+        if geom:
+            try:
+                geometry = decode_geometry(geom)
+            except GeometryError:
+                geometry = None
+        if intersects is not None and (geometry is None or not geometries_intersect(geometry, intersects)):
+            continue
+        out.append((feature_id, geometry, properties))
+    return out
+
+
+def _reproject_features(rows, source: int, target: int) -> List[Tuple[int, Optional[Geometry], Optional[dict]]]:
+    geometries = reproject_geometries([geometry for _, geometry, _ in rows], source, target)
+    return [(feature_id, geometry, properties) for (feature_id, _, properties), geometry in zip(rows, geometries)]
+
+
+def _feature_json(feature_id: int, geometry: Optional[Geometry], properties: Optional[dict]) -> str:
+    return json.dumps(
+        {"type": "Feature", "id": feature_id, "geometry": geometry, "properties": properties or {}},
+        separators=(",", ":"),
+    )
+
+
+async def _row_partitions(
+    session: AsyncSession,
+    layer: Layer,
+    query_box: Optional[BBox],
+    chunk_size: int,
+    after: Optional[int] = None,
+    row_limit: Optional[int] = None,
+    level: Optional[int] = None,
+) -> AsyncIterator[List]:
+    table = get_data_table(layer.data_table)
+    statement = feature_statement(layer, level).order_by(table.c.id)
+    if after is not None:
+        statement = statement.where(table.c.id > after)
+
+    if query_box is not None and use_memory_index(session):
+        # Candidates come from the in-process R-tree, rows are fetched by id
+        index = await get_layer_index(session, layer)
+        ids = sorted(i for i in index.search(query_box) if after is None or i > after)
+        if row_limit is not None:
+            ids = ids[:row_limit]
+        batch = min(chunk_size, settings.SPATIAL_INDEX_ID_BATCH)
+        for start in range(0, len(ids), batch):
+            result = await session.exec(statement.where(table.c.id.in_(ids[start:start + batch])))
+            yield result.all()
+        return
+
+    if query_box is not None:
+        statement = statement.where(bbox_filter(table, query_box))
+    if row_limit is not None:
+        statement = statement.limit(row_limit)
+    result = await session.stream(statement, execution_options={"yield_per": chunk_size})
+    try:
+        async for rows in result.partitions(chunk_size):
+            yield rows
+    finally:
+        await result.close()
+
+
+async def stream_feature_collection(
+    session: AsyncSession,
+    layer: Layer,
+    bbox: Optional[BBox] = None,
+    intersects: Optional[Geometry] = None,
+    chunk_size: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    level: Optional[int] = None,
+    srid: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Stream a layer as a GeoJSON FeatureCollection, optionally filtered to
+    features whose bbox overlaps ``bbox`` or whose geometry intersects ``intersects``.
+
+    Rows are read through a server-side cursor (or by id batches when the
+    in-process spatial index answers the filter) and written out one chunk at a
+    time, so memory use does not grow with the size of the layer.
+
+    With ``limit``, only features with an id greater than ``after`` are returned,
+    at most ``limit`` of them, and the collection ends with a ``next_cursor``
+    member when there are more.
+
+    ``level`` reads geometries simplified for that pyramid zoom instead of the
+    full-resolution ones (see app.services.pyramid). An intersects filter is
+    always tested against full-resolution geometries.
+
+    ``srid`` reprojects the geometries from the layer's SRID, a chunk at a
+    time; filters are still given in the layer's SRID.
+    """
+    chunk_size = chunk_size or settings.FEATURE_STREAM_CHUNK_SIZE
+    source = layer.srid or 4326
+    query_box = bbox
+    if intersects is not None:
+        query_box = geometry_bbox(intersects)
+        level = None
+    # Reading one row past the page tells whether there is a next page. An
+    # intersects filter drops rows after they are read, so it cannot be limited in SQL.
+    row_limit = limit + 1 if limit is not None and intersects is None else None
+    if limit is not None:
+        chunk_size = min(chunk_size, limit + 1)
+
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    emitted = 0
+    last_id = None
+    has_more = False
+    if intersects is None or query_box is not None:
+        partitions = _row_partitions(
+            session, layer, query_box, chunk_size, after=after, row_limit=row_limit, level=level
+        )
+        async with aclosing(partitions):
+            async for rows in partitions:
+                decoded = _decode_rows(rows, intersects)
+                if limit is not None and emitted + len(decoded) > limit:
+                    has_more = True
+                    decoded = decoded[:limit - emitted]
+                if srid is not None and srid != source and decoded:
+                    decoded = await run_in_threadpool(_reproject_features, decoded, source, srid)
+                features = [_feature_json(*row) for row in decoded]
+                emitted += len(decoded)
+                if decoded:
+                    last_id = decoded[-1][0]
+                if features:
+                    chunk = ",".join(features)
+                    if not first:
+                        chunk = "," + chunk
+                    first = False
+                    yield chunk.encode("utf-8")
+                if has_more:
+                    break
+    if has_more:
+        yield b'],"next_cursor":' + json.dumps(encode_cursor({"id": last_id})).encode("utf-8") + b"}"
+    else:
+        yield b"]}"
@@ -0,0 +1,345 @@
+"""
+FlatGeobuf encoding.
+
+A FlatGeobuf file is the magic bytes, a size-prefixed FlatBuffers header, a
+packed Hilbert R-tree over the feature bounding boxes and the size-prefixed
+features, in the order of the tree's leaves. The few FlatBuffers tables
+involved are encoded here directly, the way mvt.py encodes protobuf, instead
+of through generated code.
+
+Geometries are written in 2D; Z and M values are dropped.
+"""
+import json
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.geometry import GEOMETRY_TYPES, Geometry
+
+MAGIC = b"fgb\x03fgb\x00"
+DEFAULT_NODE_SIZE = 16
+
+# GeometryType and ColumnType enums of the FlatGeobuf schema
+_GEOMETRY_CODES = {
+    "Point": 1,
+    "LineString": 2,
+    "Polygon": 3,
+    "MultiPoint": 4,
+    "MultiLineString": 5,
+    "MultiPolygon": 6,
+    "GeometryCollection": 7,
+}
+COLUMN_TYPES = {"bool": 2, "int": 7, "float": 10, "string": 11, "json": 12}
+
+_NODE_DTYPE = np.dtype(
+    [("minx", "<f8"), ("miny", "<f8"), ("maxx", "<f8"), ("maxy", "<f8"), ("offset", "<u8")]
+)
+
+# --- FlatBuffers -------------------------------------------------------------
+#
+# Tables are given as {slot: field}, where a field is one of
+#   ("scalar", format, value)   inline value, struct format without byte order
+#   ("string", text)
+#   ("vector", format, values)  vector of scalars
+#   ("table", fields)
+#   ("tables", [fields, ...])
+# The buffer is written front to back: a table's vtable comes right before
+# it and its strings, vectors and sub-tables right after it, so every uoffset
+# points forward as the format requires.
+
+
+def _pad(buf: bytearray, alignment: int, extra: int = 0) -> None:
+    buf.extend(b"\0" * (-(len(buf) + extra) % alignment))
+
+
+def _write_vector(buf: bytearray, fmt: str, values: Any) -> int:
+    data = np.asarray(values, dtype="<" + fmt).tobytes()
+    size = struct.calcsize(fmt)
+    # The length is a uint32 and the elements follow it aligned to their size
+    _pad(buf, max(4, size), extra=4 if size > 4 else 0)
+    position = len(buf)
+    buf += struct.pack("<I", len(data) // size) + data
+    return position
+
+
+def _write_child(buf: bytearray, field: Tuple) -> int:
+    kind = field[0]
+    if kind == "string":
+        data = field[1].encode("utf-8")
+        _pad(buf, 4)
+        position = len(buf)
+        buf += struct.pack("<I", len(data)) + data + b"\0"
+        return position
+    if kind == "vector":
+        return _write_vector(buf, field[1], field[2])
+    if kind == "table":
+        return _write_table(buf, field[1])
+    # Vector of tables: uoffsets first, tables after
+    tables = field[1]
+    _pad(buf, 4)
+    position = len(buf)
+    buf += struct.pack("<I", len(tables)) + bytes(4 * len(tables))
+    for i, fields in enumerate(tables):
+        slot = position + 4 + 4 * i
+        struct.pack_into("<I", buf, slot, _write_table(buf, fields) - slot)
+    return position
+
+
+def _write_table(buf: bytearray, fields: Dict[int, Tuple]) -> int:
+    sizes = {
+        slot: struct.calcsize(field[1]) if field[0] == "scalar" else 4
+        for slot, field in fields.items()
+    }
+    # Largest fields first keeps them aligned without padding
+    offsets = {}
+    end = 4
+    for slot in sorted(sizes, key=lambda s: -sizes[s]):
+        end += -end % sizes[slot]
+        offsets[slot] = end
+        end += sizes[slot]
+    slots = max(fields) + 1 if fields else 0
+
+    _pad(buf, 2)
+    vtable = len(buf)
+    buf += struct.pack(f"<HH{slots}H", 4 + 2 * slots, end, *(offsets.get(s, 0) for s in range(slots)))
+    _pad(buf, max([4] + list(sizes.values())))
+    table = len(buf)
+    buf += bytes(end)
+    struct.pack_into("<i", buf, table, table - vtable)
+    for slot, field in fields.items():
+        if field[0] == "scalar":
+            struct.pack_into("<" + field[1], buf, table + offsets[slot], field[2])
+    for slot, field in fields.items():
+        if field[0] != "scalar":
+            position = table + offsets[slot]
+            struct.pack_into("<I", buf, position, _write_child(buf, field) - position)
+    return table
+
+
+def _finish(fields: Dict[int, Tuple]) -> bytes:
+    """
+    A complete FlatBuffer with the given root table, prefixed with its size.
+    """
+    buf = bytearray(4)
+    struct.pack_into("<I", buf, 0, _write_table(buf, fields))
+    return struct.pack("<I", len(buf)) + bytes(buf)
+
+
+# --- Header and features -----------------------------------------------------
+
+
+def header_type(geometry_type: Optional[str]) -> int:
+    """
+    Header geometry type for a layer's geometry_type, 0 (Unknown) if mixed.
+    """
+    return _GEOMETRY_CODES.get(GEOMETRY_TYPES.get((geometry_type or "").upper(), ""), 0)
+
+
+def encode_header(
+    name: str,
+    geometry_type: int,
+    columns: Sequence[Tuple[str, str]],
+    features_count: int,
+    envelope: Optional[Sequence[float]] = None,
+    srid: Optional[int] = None,
+    index_node_size: int = DEFAULT_NODE_SIZE,
+) -> bytes:
+    """
+    The magic bytes and size-prefixed header. ``columns`` are (name, kind)
+    pairs with kinds from COLUMN_TYPES; an index_node_size of 0 means the file
+    has no spatial index.
+    """
+    fields: Dict[int, Tuple] = {
+        0: ("string", name),
+        2: ("scalar", "B", geometry_type),
+        8: ("scalar", "Q", features_count),
+        9: ("scalar", "H", index_node_size),
+    }
+    if envelope is not None:
+        fields[1] = ("vector", "d", list(envelope))
+    if columns:
+        fields[7] = (
+            "tables",
+            [{0: ("string", column), 1: ("scalar", "B", COLUMN_TYPES[kind])} for column, kind in columns],
+        )
+    if srid:
+        fields[10] = ("table", {0: ("string", "EPSG"), 1: ("scalar", "i", srid)})
+    return MAGIC + _finish(fields)
+
+
+def _flat(positions: Sequence[Sequence[float]]) -> List[float]:
+    return [value for position in positions for value in position[:2]]
+
+
+def _geometry_fields(geometry: Geometry) -> Dict[int, Tuple]:
+    geom_type = geometry["type"]
+    fields: Dict[int, Tuple] = {6: ("scalar", "B", _GEOMETRY_CODES[geom_type])}
+    coords = geometry.get("coordinates")
+    if geom_type == "GeometryCollection":
+        fields[7] = ("tables", [_geometry_fields(member) for member in geometry["geometries"]])
+    elif geom_type == "MultiPolygon":
+        fields[7] = ("tables", [_geometry_fields({"type": "Polygon", "coordinates": p}) for p in coords])
+    elif geom_type == "Point":
+        if coords:
+            fields[1] = ("vector", "d", coords[:2])
+    elif geom_type in ("LineString", "MultiPoint"):
+        fields[1] = ("vector", "d", _flat(coords))
+    else:
+        # Polygon rings or MultiLineString lines, one after the other
+        fields[1] = ("vector", "d", _flat([p for part in coords for p in part]))
+        if len(coords) > 1:
+            ends = np.cumsum([len(part) for part in coords])
+            fields[0] = ("vector", "I", ends)
+    return fields
+
+
+def _encode_value(kind: str, value: Any) -> bytes:
+    if kind == "bool":
+        return struct.pack("<B", bool(value))
+    if kind == "int":
+        return struct.pack("<q", value)
+    if kind == "float":
+        return struct.pack("<d", value)
+    text = value if kind == "string" else json.dumps(value, separators=(",", ":"))
+    data = text.encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+def encode_properties(columns: Sequence[Tuple[str, str]], properties: Optional[Dict[str, Any]]) -> bytes:
+    """
+    FlatGeobuf property bytes: (uint16 column index, value) for every
+    non-null property that has a column.
+    """
+    if not properties:
+        return b""
+    out = []
+    for index, (column, kind) in enumerate(columns):
+        value = properties.get(column)
+        if value is not None:
+            out.append(struct.pack("<H", index) + _encode_value(kind, value))
+    return b"".join(out)
+
+
+def encode_feature(geometry: Optional[Geometry], properties: bytes) -> bytes:
+    """
+    A size-prefixed Feature.
+    """
+    fields: Dict[int, Tuple] = {}
+    if geometry is not None:
+        fields[0] = ("table", _geometry_fields(geometry))
+    if properties:
+        fields[1] = ("vector", "B", np.frombuffer(properties, dtype=np.uint8))
+    return _finish(fields)
+
+
+# --- Spatial index -----------------------------------------------------------
+
+
+def hilbert(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Position of each (x, y) on a 16-bit Hilbert curve (x and y in 0..65535),
+    the same curve FlatGeobuf uses.
+    """
+    x = x.astype(np.uint32)
+    y = y.astype(np.uint32)
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C = C ^ ((a & (c >> 2)) ^ (b & (d >> 2)))
+    D = D ^ ((b & (c >> 2)) ^ ((a ^ b) & (d >> 2)))
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C = C ^ ((a & (c >> 4)) ^ (b & (d >> 4)))
+    D = D ^ ((b & (c >> 4)) ^ ((a ^ b) & (d >> 4)))
+
+    a, b, c, d = A, B, C, D
+    C = C ^ ((a & (c >> 8)) ^ (b & (d >> 8)))
+    D = D ^ ((b & (c >> 8)) ^ ((a ^ b) & (d >> 8)))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    def interleave(v):
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        return (v | (v << 1)) & 0x55555555
+
+    return (interleave(i1) << 1) | interleave(i0)
+
+
+def hilbert_order(boxes: np.ndarray) -> np.ndarray:
+    """
+    Indices that sort (n, 4) bounding boxes along the Hilbert curve of their
+    centres; rows without a box (NaN) go last.
+    """
+    valid = ~np.isnan(boxes).any(axis=1)
+    values = np.full(len(boxes), np.iinfo(np.uint32).max, dtype=np.uint64)
+    if valid.any():
+        present = boxes[valid]
+        minx, miny = present[:, 0].min(), present[:, 1].min()
+        width = max(present[:, 2].max() - minx, 1e-12)
+        height = max(present[:, 3].max() - miny, 1e-12)
+        cx = ((present[:, 0] + present[:, 2]) / 2 - minx) / width * 0xFFFF
+        cy = ((present[:, 1] + present[:, 3]) / 2 - miny) / height * 0xFFFF
+        values[valid] = hilbert(np.floor(cx), np.floor(cy))
+    return np.argsort(values, kind="stable")
+
+
+def _level_bounds(count: int, node_size: int) -> List[Tuple[int, int]]:
+    """
+    (start, end) node slots of each tree level, leaves first; the root is slot 0.
+    """
+    level_sizes = [count]
+    n = count
+    while True:
+        n = -(-n // node_size)
+        level_sizes.append(n)
+        if n == 1:
+            break
+    end = sum(level_sizes)
+    bounds = []
+    for size in level_sizes:
+        bounds.append((end - size, end))
+        end -= size
+    return bounds
+
+
+def packed_rtree(boxes: np.ndarray, offsets: np.ndarray, node_size: int = DEFAULT_NODE_SIZE) -> bytes:
+    """
+    The packed R-tree section for features with the given (n, 4) boxes and
+    byte offsets, in file order. Each node is a box and, for leaves, the
+    feature's offset or, for parents, the slot of its first child.
+    """
+    bounds = _level_bounds(len(boxes), node_size)
+    nodes = np.zeros(bounds[0][1], dtype=_NODE_DTYPE)
+    leaves = nodes[bounds[0][0]:]
+    for i, name in enumerate(("minx", "miny", "maxx", "maxy")):
+        leaves[name] = boxes[:, i]
+    leaves["offset"] = offsets
+
+    for (start, end), (parent_start, _) in zip(bounds, bounds[1:]):
+        children = nodes[start:end]
+        groups = np.arange(0, end - start, node_size)
+        parents = nodes[parent_start:parent_start + len(groups)]
+        parents["minx"] = np.minimum.reduceat(children["minx"], groups)
+        parents["miny"] = np.minimum.reduceat(children["miny"], groups)
+        parents["maxx"] = np.maximum.reduceat(children["maxx"], groups)
+        parents["maxy"] = np.maximum.reduceat(children["maxy"], groups)
+        parents["offset"] = groups + start
+    return nodes.tobytes()
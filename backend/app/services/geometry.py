@@ -0,0 +1,392 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Geometries are handled internally as GeoJSON-style dicts:
+# {"type": "Polygon", "coordinates": [[[x, y], ...], ...]}
+
+Geometry = Dict[str, Any]
+BBox = Tuple[float, float, float, float]
+
+GEOMETRY_TYPES = {
+    "POINT": "Point",
+    "LINESTRING": "LineString",
+    "POLYGON": "Polygon",
+    "MULTIPOINT": "MultiPoint",
+    "MULTILINESTRING": "MultiLineString",
+    "MULTIPOLYGON": "MultiPolygon",
+    "GEOMETRYCOLLECTION": "GeometryCollection",
+}
+
+# Nesting depth of the "coordinates" member for each GeoJSON type
+COORDINATE_DEPTH = {
+    "Point": 0,
+    "LineString": 1,
+    "MultiPoint": 1,
+    "Polygon": 2,
+    "MultiLineString": 2,
+    "MultiPolygon": 3,
+}
+
+_WKT_TOKEN = re.compile(r"\s*([A-Za-z]+|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[(),])")
+
+
+class GeometryError(ValueError):
+    """
+    Raised when a geometry cannot be parsed or encoded.
+    """
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _WKT_TOKEN.match(text, pos)
+        if not match:
+            raise GeometryError(f"Invalid WKT near: {text[pos:pos + 20]!r}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class _WKTParser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None:
+            raise GeometryError("Unexpected end of WKT")
+        if expected is not None and token.upper() != expected:
+            raise GeometryError(f"Expected {expected!r} in WKT, got {token!r}")
+        self.pos += 1
+        return token
+
+    def is_empty(self) -> bool:
+        if self.peek() and self.peek().upper() == "EMPTY":
+            self.pos += 1
+            return True
+        return False
+
+    def geometry(self) -> Geometry:
+        keyword = self.take().upper()
+        if keyword not in GEOMETRY_TYPES:
+            raise GeometryError(f"Unsupported WKT geometry type: {keyword}")
+        # Skip dimension markers such as "POINT Z" or "LINESTRING ZM"
+        while self.peek() and self.peek().upper() in ("Z", "M", "ZM"):
+            self.pos += 1
+        geom_type = GEOMETRY_TYPES[keyword]
+
+        if geom_type == "GeometryCollection":
+            geometries = []
+            if not self.is_empty():
+                geometries = self.sequence(self.geometry)
+            return {"type": geom_type, "geometries": geometries}
+
+        if self.is_empty():
+            return {"type": geom_type, "coordinates": []}
+
+        if geom_type == "Point":
+            return {"type": geom_type, "coordinates": self.sequence(self.coordinate)[0]}
+        if geom_type == "LineString":
+            return {"type": geom_type, "coordinates": self.sequence(self.coordinate)}
+        if geom_type == "MultiPoint":
+            return {"type": geom_type, "coordinates": self.sequence(self.multipoint_member)}
+        if geom_type in ("Polygon", "MultiLineString"):
+            return {"type": geom_type, "coordinates": self.sequence(self.ring)}
+        return {"type": geom_type, "coordinates": self.sequence(self.polygon)}
+
+    def sequence(self, item) -> List[Any]:
+        self.take("(")
+        items = [item()]
+        while self.peek() == ",":
+            self.take(",")
+            items.append(item())
+        self.take(")")
+        return items
+
+    def coordinate(self) -> List[float]:
+        values = []
+        while self.peek() not in (",", ")", None):
+            try:
+                values.append(float(self.take()))
+            except ValueError:
+                raise GeometryError("Invalid coordinate in WKT")
+        if len(values) < 2:
+            raise GeometryError("Coordinates need at least two dimensions")
+        return values
+
+    def multipoint_member(self) -> List[float]:
+        # Both "MULTIPOINT (1 2, 3 4)" and "MULTIPOINT ((1 2), (3 4))" are valid
+        if self.peek() == "(":
+            return self.sequence(self.coordinate)[0]
+        return self.coordinate()
+
+    def ring(self) -> List[List[float]]:
+        return self.sequence(self.coordinate)
+
+    def polygon(self) -> List[List[List[float]]]:
+        return self.sequence(self.ring)
+
+
+def parse_wkt(text: str) -> Geometry:
+    """
+    Parse a WKT (or EWKT) string into a GeoJSON-style geometry dict.
+    """
+    if text.upper().startswith("SRID="):
+        if ";" not in text:
+            raise GeometryError("EWKT SRID prefix must end with ';'")
+        text = text.split(";", 1)[1]
+    parser = _WKTParser(text)
+    geometry = parser.geometry()
+    if parser.peek() is not None:
+        raise GeometryError("Unexpected trailing content in WKT")
+    return geometry
+
+
+def _format_number(value: float) -> str:
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+def _format_coordinate(coordinate: List[float]) -> str:
+    return " ".join(_format_number(v) for v in coordinate)
+
+
+def _format_coordinates(coordinates: Any, depth: int) -> str:
+    if depth == 0:
+        return _format_coordinate(coordinates)
+    return "(" + ", ".join(_format_coordinates(c, depth - 1) for c in coordinates) + ")"
+
+
+def to_wkt(geometry: Geometry) -> str:
+    """
+    Format a GeoJSON-style geometry dict as WKT.
+    """
+    geom_type = geometry["type"]
+    keyword = geom_type.upper()
+    if geom_type == "GeometryCollection":
+        members = geometry.get("geometries") or []
+        if not members:
+            return f"{keyword} EMPTY"
+        return f"{keyword} (" + ", ".join(to_wkt(g) for g in members) + ")"
+    if geom_type not in COORDINATE_DEPTH:
+        raise GeometryError(f"Unsupported geometry type: {geom_type}")
+    coordinates = geometry.get("coordinates")
+    if not coordinates:
+        return f"{keyword} EMPTY"
+    if geom_type == "Point":
+        return f"{keyword} ({_format_coordinate(coordinates)})"
+    return f"{keyword} {_format_coordinates(coordinates, COORDINATE_DEPTH[geom_type])}"
+
+
+def iter_positions(geometry: Geometry) -> Iterator[List[float]]:
+    """
+    Yield every coordinate position in a geometry.
+    """
+    if geometry["type"] == "GeometryCollection":
+        for member in geometry.get("geometries") or []:
+            yield from iter_positions(member)
+        return
+
+    def walk(coordinates: Any, depth: int) -> Iterator[List[float]]:
+        if depth == 0:
+            yield coordinates
+            return
+        for child in coordinates:
+            yield from walk(child, depth - 1)
+
+    coordinates = geometry.get("coordinates")
+    if coordinates:
+        yield from walk(coordinates, COORDINATE_DEPTH[geometry["type"]])
+
+
+def geometry_bbox(geometry: Geometry) -> Optional[BBox]:
+    """
+    Return the (minx, miny, maxx, maxy) bounding box of a geometry, or None if empty.
+    """
+    minx = miny = float("inf")
+    maxx = maxy = float("-inf")
+    for position in iter_positions(geometry):
+        x, y = position[0], position[1]
+        if x < minx:
+            minx = x
+        if x > maxx:
+            maxx = x
+        if y < miny:
+            miny = y
+        if y > maxy:
+            maxy = y
+    if minx == float("inf"):
+        return None
+    return (minx, miny, maxx, maxy)
+
+
+def map_positions(geometry: Geometry, func) -> Geometry:
+    """
+    Return a copy of the geometry with ``func`` applied to every position.
+    """
+    if geometry["type"] == "GeometryCollection":
+        return {
+            "type": "GeometryCollection",
+            "geometries": [map_positions(g, func) for g in geometry.get("geometries") or []],
+        }
+
+    def walk(coordinates: Any, depth: int) -> Any:
+        if depth == 0:
+            return func(coordinates)
+        return [walk(child, depth - 1) for child in coordinates]
+
+    coordinates = geometry.get("coordinates")
+    if not coordinates:
+        return {"type": geometry["type"], "coordinates": []}
+    return {"type": geometry["type"], "coordinates": walk(coordinates, COORDINATE_DEPTH[geometry["type"]])}
+
+
+def parse_bbox(text: str) -> BBox:
+    """
+    Parse a "minx,miny,maxx,maxy" string into a bbox tuple.
+    """
+    try:
+        minx, miny, maxx, maxy = (float(v) for v in text.split(","))
+    except ValueError:
+        raise GeometryError("bbox must be four comma separated numbers: minx,miny,maxx,maxy")
+    if minx > maxx or miny > maxy:
+        raise GeometryError("bbox minimums must not exceed maximums")
+    return (minx, miny, maxx, maxy)
+
+
+# --- Predicates --------------------------------------------------------------
+
+def bboxes_intersect(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _components(geometry: Geometry, points: list, lines: list, polygons: list) -> None:
+    """
+    Split a geometry into points, line strings and polygons (lists of rings).
+    """
+    geom_type = geometry["type"]
+    coordinates = geometry.get("coordinates")
+    if geom_type == "GeometryCollection":
+        for member in geometry.get("geometries") or []:
+            _components(member, points, lines, polygons)
+    elif not coordinates:
+        return
+    elif geom_type == "Point":
+        points.append(coordinates)
+    elif geom_type == "MultiPoint":
+        points.extend(coordinates)
+    elif geom_type == "LineString":
+        lines.append(coordinates)
+    elif geom_type == "MultiLineString":
+        lines.extend(coordinates)
+    elif geom_type == "Polygon":
+        polygons.append(coordinates)
+    elif geom_type == "MultiPolygon":
+        polygons.extend(coordinates)
+
+
+def _orientation(a, b, c) -> float:
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _on_segment(p, a, b) -> bool:
+    return (
+        _orientation(a, b, p) == 0
+        and min(a[0], b[0]) <= p[0] <= max(a[0], b[0])
+        and min(a[1], b[1]) <= p[1] <= max(a[1], b[1])
+    )
+
+
+def _segments_intersect(a, b, c, d) -> bool:
+    o1, o2 = _orientation(a, b, c), _orientation(a, b, d)
+    o3, o4 = _orientation(c, d, a), _orientation(c, d, b)
+    if ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)) and ((o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0)):
+        return True
+    return _on_segment(c, a, b) or _on_segment(d, a, b) or _on_segment(a, c, d) or _on_segment(b, c, d)
+
+
+def _point_in_ring(point, ring) -> bool:
+    x, y = point[0], point[1]
+    inside = False
+    for (x0, y0), (x1, y1) in zip((p[:2] for p in ring), (p[:2] for p in ring[1:] + ring[:1])):
+        if (y0 > y) != (y1 > y) and x < (x1 - x0) * (y - y0) / (y1 - y0) + x0:
+            inside = not inside
+    return inside
+
+
+def _point_in_polygon(point, polygon) -> bool:
+    if not polygon or not _point_in_ring(point, polygon[0]):
+        return False
+    return not any(_point_in_ring(point, hole) for hole in polygon[1:])
+
+
+def _segments(lines: list, polygons: list) -> List[Tuple[Any, Any]]:
+    segments = []
+    for line in lines:
+        segments.extend(zip(line, line[1:]))
+    for polygon in polygons:
+        for ring in polygon:
+            segments.extend(zip(ring, ring[1:]))
+    return segments
+
+
+def geometries_intersect(a: Geometry, b: Geometry) -> bool:
+    """
+    Exact planar intersects test between two geometries (boundaries included).
+    """
+    box_a, box_b = geometry_bbox(a), geometry_bbox(b)
+    if box_a is None or box_b is None or not bboxes_intersect(box_a, box_b):
+        return False
+
+    points_a, lines_a, polygons_a = [], [], []
+    points_b, lines_b, polygons_b = [], [], []
+    _components(a, points_a, lines_a, polygons_a)
+    _components(b, points_b, lines_b, polygons_b)
+    segments_a = _segments(lines_a, polygons_a)
+    segments_b = _segments(lines_b, polygons_b)
+
+    # Points touching points or edges
+    for p in points_a:
+        if any(p[0] == q[0] and p[1] == q[1] for q in points_b):
+            return True
+        if any(_on_segment(p, s, e) for s, e in segments_b):
+            return True
+    for p in points_b:
+        if any(_on_segment(p, s, e) for s, e in segments_a):
+            return True
+
+    # Crossing or touching edges
+    for s, e in segments_a:
+        sminx, smaxx = min(s[0], e[0]), max(s[0], e[0])
+        sminy, smaxy = min(s[1], e[1]), max(s[1], e[1])
+        for c, d in segments_b:
+            if max(c[0], d[0]) < sminx or min(c[0], d[0]) > smaxx:
+                continue
+            if max(c[1], d[1]) < sminy or min(c[1], d[1]) > smaxy:
+                continue
+            if _segments_intersect(s, e, c, d):
+                return True
+
+    # No edges cross, so a component is either fully inside a polygon or fully
+    # outside it: testing one vertex per component settles containment.
+    def representatives(points, lines, polygons):
+        yield from points
+        for line in lines:
+            yield line[0]
+        for polygon in polygons:
+            if polygon and polygon[0]:
+                yield polygon[0][0]
+
+    for polygon in polygons_b:
+        if any(_point_in_polygon(p, polygon) for p in representatives(points_a, lines_a, polygons_a)):
+            return True
+    for polygon in polygons_a:
+        if any(_point_in_polygon(p, polygon) for p in representatives(points_b, lines_b, polygons_b)):
+            return True
+    return False
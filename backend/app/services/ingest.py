@@ -0,0 +1,304 @@
+import csv
+import io
+import json
+import re
+import sys
+import uuid
+from dataclasses import dataclass, field
+from typing import IO, Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.clusters import cluster_indexes
+from app.services.geometry import GEOMETRY_TYPES, Geometry, GeometryError, parse_wkt
+from app.services.layer_data import create_data_table, feature_row, touch_layer
+from app.services.pyramid import build_pyramid
+from app.services.spatial_index import spatial_indexes
+from app.services.tile_cache import tile_cache
+
+settings = get_settings()
+
+FORMATS = ("geojson", "ndjson", "csv")
+
+_CRS_CODE = re.compile(r"(?:EPSG::?|EPSG:)(\d+)$", re.IGNORECASE)
+_EWKT_SRID = re.compile(r"SRID=(\d+);", re.IGNORECASE)
+_WKT_COLUMNS = ("wkt", "geom", "geometry", "the_geom", "wkb_geometry")
+
+_COPY_COLUMNS = ("geom", "properties", "minx", "miny", "maxx", "maxy")
+
+Feature = Tuple[Optional[Geometry], Dict[str, Any]]
+
+
+class IngestError(ValueError):
+    """
+    Raised when an input file cannot be ingested.
+    """
+
+
+@dataclass
+class IngestResult:
+    features: int = 0
+    # SRID declared by the input itself (GeoJSON "crs" member or EWKT prefix)
+    srid: Optional[int] = None
+    geometry_types: Set[str] = field(default_factory=set)
+
+    @property
+    def geometry_type(self) -> Optional[str]:
+        """
+        Summarise parsed geometry types the way PostGIS names them.
+        """
+        types = {t.upper() for t in self.geometry_types}
+        if not types:
+            return None
+        if len(types) == 1:
+            return types.pop()
+        # Single and multi parts of one kind are stored as the multi type
+        bases = {t[5:] if t.startswith("MULTI") else t for t in types}
+        if len(bases) == 1 and bases != {"GEOMETRYCOLLECTION"}:
+            return "MULTI" + bases.pop()
+        return "GEOMETRY"
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """
+    Guess the input format from a file name.
+    """
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".geojsonl", ".geojsonseq", ".jsonl")):
+        return "ndjson"
+    if name.endswith((".geojson", ".json")):
+        return "geojson"
+    if name.endswith((".csv", ".tsv", ".txt")):
+        return "csv"
+    raise IngestError("Unable to detect the input format; pass one of: " + ", ".join(FORMATS))
+
+
+def parse_crs(crs: Optional[Dict[str, Any]]) -> Optional[int]:
+    """
+    Extract an EPSG code from a (legacy) GeoJSON "crs" member.
+    """
+    if not isinstance(crs, dict) or not isinstance(crs.get("properties"), dict):
+        return None
+    name = str(crs["properties"].get("name", ""))
+    if name.endswith("CRS84"):
+        return 4326
+    match = _CRS_CODE.search(name)
+    return int(match.group(1)) if match else None
+
+
+def _geojson_feature(obj: Dict[str, Any]) -> Feature:
+    if not isinstance(obj, dict):
+        raise IngestError(f"Unsupported GeoJSON value: expected an object, got {type(obj).__name__}")
+    if obj.get("type") == "Feature":
+        geometry = obj.get("geometry")
+        properties = obj.get("properties") or {}
+    elif obj.get("type") in GEOMETRY_TYPES.values():
+        geometry, properties = obj, {}
+    else:
+        raise IngestError(f"Unsupported GeoJSON object: {obj.get('type')!r}")
+    if geometry is not None and geometry.get("type") not in GEOMETRY_TYPES.values():
+        raise IngestError(f"Unsupported geometry type: {geometry.get('type')!r}")
+    return geometry, properties
+
+
+def read_geojson(stream: IO[bytes], result: IngestResult) -> Iterator[Feature]:
+    """
+    Read a GeoJSON FeatureCollection, Feature or Geometry document.
+    """
+    try:
+        document = json.load(stream)
+    except ValueError as e:
+        raise IngestError(f"Invalid GeoJSON: {e}")
+    if not isinstance(document, dict):
+        raise IngestError(f"Invalid GeoJSON: expected an object, got {type(document).__name__}")
+    result.srid = parse_crs(document.get("crs"))
+    if document.get("type") == "FeatureCollection":
+        for obj in document.get("features") or []:
+            yield _geojson_feature(obj)
+    else:
+        yield _geojson_feature(document)
+
+
+def read_ndjson(stream: IO[bytes], result: IngestResult) -> Iterator[Feature]:
+    """
+    Read newline-delimited GeoJSON features, one per line.
+    """
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        # RFC 8142 GeoJSON text sequences prefix records with a record separator
+        if line.startswith(b"\x1e"):
+            line = line[1:]
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise IngestError(f"Invalid JSON on line {number}: {e}")
+        yield _geojson_feature(obj)
+
+
+def _csv_value(value: Optional[str]) -> Any:
+    if value is None or value == "":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_csv(stream: IO[bytes], result: IngestResult, geometry_column: Optional[str] = None) -> Iterator[Feature]:
+    """
+    Read a CSV file with a WKT (or EWKT) geometry column; other columns become properties.
+    """
+    csv.field_size_limit(sys.maxsize)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    columns = reader.fieldnames or []
+    if geometry_column is None:
+        lowered = {c.lower(): c for c in columns}
+        geometry_column = next((lowered[c] for c in _WKT_COLUMNS if c in lowered), None)
+    if geometry_column not in columns:
+        raise IngestError("CSV input needs a WKT geometry column, e.g. 'wkt' or 'geom'")
+
+    srid_seen = False
+    for number, row in enumerate(reader, start=2):
+        wkt = (row.pop(geometry_column) or "").strip()
+        geometry = None
+        if wkt:
+            if not srid_seen and wkt.upper().startswith("SRID="):
+                match = _EWKT_SRID.match(wkt)
+                if match is None:
+                    raise IngestError(f"Invalid SRID on line {number}")
+                result.srid = int(match.group(1))
+            srid_seen = True
+            try:
+                geometry = parse_wkt(wkt)
+            except GeometryError as e:
+                raise IngestError(f"Invalid WKT on line {number}: {e}")
+        yield geometry, {key: _csv_value(value) for key, value in row.items() if key is not None}
+
+
+def read_features(stream: IO[bytes], input_format: str, result: IngestResult) -> Iterator[Feature]:
+    if input_format == "geojson":
+        return read_geojson(stream, result)
+    if input_format == "ndjson":
+        return read_ndjson(stream, result)
+    if input_format == "csv":
+        return read_csv(stream, result)
+    raise IngestError(f"Unsupported format {input_format!r}; expected one of: " + ", ".join(FORMATS))
+
+
+def _next_batch(features: Iterator[Feature], result: IngestResult, size: int) -> List[Dict[str, Any]]:
+    rows = []
+    for geometry, properties in features:
+        if geometry is not None:
+            result.geometry_types.add(geometry["type"])
+        rows.append(feature_row(geometry, properties))
+        if len(rows) >= size:
+            break
+    return rows
+
+
+async def copy_rows(conn: AsyncConnection, table_name: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    Bulk load rows into a data table.
+
+    On PostgreSQL the rows go through asyncpg's binary COPY protocol; other
+    backends (SQLite in tests and development) fall back to a batched executemany.
+    """
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        records = [
+            (row["geom"], json.dumps(row["properties"]), row["minx"], row["miny"], row["maxx"], row["maxy"])
+            for row in rows
+        ]
+        await raw.driver_connection.copy_records_to_table(
+            table_name, records=records, columns=list(_COPY_COLUMNS)
+        )
+    else:
+        await conn.execute(get_data_table(table_name).insert(), rows)
+
+
+async def ingest_features(
+    session: AsyncSession,
+    layer: Layer,
+    features: Iterable[Feature],
+    result: IngestResult,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> IngestResult:
+    """
+    Create the layer's data table and load features into it in batches.
+
+    Parsing runs in a worker thread one batch at a time so large uploads do not
+    block the event loop; each batch is then bulk loaded. The layer's srid and
+    geometry_type are set from what was parsed, and lines and polygons get a
+    geometry pyramid. ``progress`` is awaited with the feature count after
+    every batch.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    features = iter(features)
+    conn = await session.connection()
+    await create_data_table(conn, layer.data_table)
+
+    while True:
+        rows = await run_in_threadpool(_next_batch, features, result, batch_size)
+        if not rows:
+            break
+        await copy_rows(conn, layer.data_table, rows)
+        result.features += len(rows)
+        if progress is not None:
+            await progress(result.features)
+
+    layer.srid = layer.srid or result.srid or 4326
+    layer.geometry_type = result.geometry_type
+    touch_layer(layer)
+    await build_pyramid(session, layer, chunk_size=batch_size)
+    session.add(layer)
+    await session.commit()
+    await session.refresh(layer)
+    tile_cache.invalidate_layer(layer.id)
+    spatial_indexes.invalidate(layer.data_table)
+    cluster_indexes.invalidate(layer.data_table)
+    return result
+
+
+def new_data_table_name() -> str:
+    return f"layer_{uuid.uuid4().hex}"
+
+
+async def ingest_file(
+    session: AsyncSession,
+    project_id: int,
+    name: str,
+    stream: IO[bytes],
+    input_format: str,
+    srid: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> Tuple[Layer, IngestResult]:
+    """
+    Create a layer in a project and load an input file into it.
+    """
+    if input_format not in FORMATS:
+        raise IngestError(f"Unsupported format {input_format!r}; expected one of: " + ", ".join(FORMATS))
+    # An explicit srid wins over whatever the file declares
+    layer = Layer(project_id=project_id, name=name, data_table=new_data_table_name(), srid=srid)
+    session.add(layer)
+    await session.flush()
+
+    result = IngestResult()
+    features = read_features(stream, input_format, result)
+    try:
+        await ingest_features(session, layer, features, result, batch_size=batch_size, progress=progress)
+    except Exception:
+        await session.rollback()
+        raise
+    return layer, result
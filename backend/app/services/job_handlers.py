@@ -0,0 +1,138 @@
+"""
+Handlers of the background job kinds, by name.
+
+A handler is awaited with a JobContext, opens its own sessions and returns
+a JSON-serialisable result stored on the job. Raising fails the job, except
+for JobOwnershipLost: the run is cancelled and the job left to its new owner.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.exports import run_export
+from app.services.ingest import ingest_file
+from app.services.jobs import JobContext
+from app.services.layer_data import drop_data_table
+from app.services.clusters import cluster_indexes
+from app.services.pyramid import build_pyramid, parse_zooms
+from app.services.reproject import reproject_layer
+from app.services.spatial_index import spatial_indexes
+from app.services.tile_cache import tile_cache
+
+
+async def ingest_job(context: JobContext) -> Dict[str, Any]:
+    """
+    Load an uploaded file (saved under JOB_UPLOAD_DIR) into a new layer of
+    the job's project. The file is removed once the job is over.
+
+    A layer counts as the job's once it is attached to it: a retry finds it
+    there instead of loading the file again, and a run that lost the job to
+    another one drops the layer it made and leaves the file to that run.
+    """
+    params = context.params
+    path = params["path"]
+    if context.job.layer_id is not None:
+        async with context.session_factory() as session:
+            layer = await session.get(Layer, context.job.layer_id)
+            if layer is not None:
+                table = get_data_table(layer.data_table)
+                features = (await session.exec(select(func.count()).select_from(table))).one()
+        if layer is not None:
+            _remove_upload(path)
+            return {"layer_id": layer.id, "features": features}
+    layer = None
+    try:
+        async with context.session_factory() as session:
+            with open(path, "rb") as stream:
+                layer, result = await ingest_file(
+                    session,
+                    context.job.project_id,
+                    params["name"],
+                    stream,
+                    params["format"],
+                    srid=params.get("srid"),
+                    progress=context.progress,
+                )
+        await context.set_layer(layer.id)
+    except asyncio.CancelledError:
+        # The job was taken over, or the worker is stopping: whichever run
+        # goes on loads the file again, so the layer made here is dropped
+        if layer is not None:
+            await _drop_layer(context, layer.id)
+        raise
+    except Exception:
+        if await context.is_owned():
+            _remove_upload(path)
+        raise
+    _remove_upload(path)
+    return {"layer_id": layer.id, "features": result.features}
+
+
+async def _drop_layer(context: JobContext, layer_id: int) -> None:
+    async with context.session_factory() as session:
+        layer = await session.get(Layer, layer_id)
+        await drop_data_table(await session.connection(), layer.data_table)
+        await session.delete(layer)
+        await session.commit()
+
+
+def _remove_upload(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def export_job(context: JobContext) -> Dict[str, Any]:
+    export_id = context.params["export_id"]
+    features = await run_export(
+        export_id, context.session_factory, progress=context.progress, ensure_owned=context.ensure_owned
+    )
+    return {"export_id": export_id, "features": features}
+
+
+async def pyramid_job(context: JobContext) -> Dict[str, Any]:
+    """
+    Rebuild a layer's geometry pyramid for the given zooms (PYRAMID_ZOOMS by default).
+    """
+    async with context.session_factory() as session:
+        layer = await session.get(Layer, context.job.layer_id)
+        if layer is None:
+            raise LookupError(f"Layer {context.job.layer_id} no longer exists")
+        written = await build_pyramid(session, layer, zooms=context.params.get("zooms"), progress=context.progress)
+        await context.ensure_owned()
+        await session.commit()
+        tile_cache.invalidate_layer(layer.id)
+        return {"zooms": layer.pyramid_zooms, "simplified": written}
+
+
+async def reproject_job(context: JobContext) -> Dict[str, Any]:
+    """
+    Reproject a layer's geometries to params["srid"] and rebuild its pyramid
+    for the same zooms (PYRAMID_ZOOMS if it had none).
+    """
+    async with context.session_factory() as session:
+        layer = await session.get(Layer, context.job.layer_id)
+        if layer is None:
+            raise LookupError(f"Layer {context.job.layer_id} no longer exists")
+        source = layer.srid or 4326
+        zooms = parse_zooms(layer.pyramid_zooms) if layer.pyramid_zooms else None
+        features = await reproject_layer(session, layer, context.params["srid"], progress=context.progress)
+        await build_pyramid(session, layer, zooms=zooms)
+        await context.ensure_owned()
+        await session.commit()
+        tile_cache.invalidate_layer(layer.id)
+        spatial_indexes.invalidate(layer.data_table)
+        cluster_indexes.invalidate(layer.data_table)
+        return {"source_srid": source, "srid": layer.srid, "features": features}
+
+
+HANDLERS: Dict[str, Callable[[JobContext], Awaitable[Optional[Dict[str, Any]]]]] = {
+    "ingest": ingest_job,
+    "export": export_job,
+    "pyramid": pyramid_job,
+    "reproject": reproject_job,
+}
@@ -0,0 +1,335 @@
+"""
+Durable background jobs.
+
+Heavy layer operations (ingestion, exports, pyramid builds, reprojection) are
+recorded as rows of the ``jobs`` table and run by a JobDispatcher, either
+inside the API process (JOBS_IN_PROCESS) or in separate worker processes
+(``python -m app.cli.worker``). Any number of dispatchers can share the table:
+a job is claimed with a conditional UPDATE, so exactly one of them runs it.
+
+Workers record a heartbeat on the jobs they run; a job whose worker stops
+responding for JOB_STALE_SECONDS is put back in the queue, up to
+JOB_MAX_ATTEMPTS runs in total. Every write a run makes to its job row is
+conditional on still owning that attempt, so a run whose job was requeued and
+claimed again is cancelled instead of racing the new one.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.db import session as db_session
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+JOB_STATUSES = ("pending", "running", "completed", "failed")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_job(
+    session: AsyncSession,
+    kind: str,
+    project_id: int,
+    layer_id: Optional[int] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Job:
+    """
+    Record a pending job and wake the in-process dispatcher.
+    """
+    job = Job(kind=kind, project_id=project_id, layer_id=layer_id, params=params or {})
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    job_dispatcher.notify()
+    return job
+
+
+class JobOwnershipLost(asyncio.CancelledError):
+    """
+    Raised in a run whose job was requeued and claimed again. It is a
+    cancellation, so handlers' error handling does not record it as a failure.
+    """
+
+
+class JobContext:
+    """
+    What a job handler gets: the job, a session factory for its own sessions
+    and ``progress`` to report how far it is.
+    """
+
+    def __init__(self, job: Job, session_factory, progress_interval: float, worker_id: Optional[str] = None):
+        self.job = job
+        self.params: Dict[str, Any] = dict(job.params or {})
+        self.session_factory = session_factory
+        self.progress_interval = progress_interval
+        self._reported_at = 0.0
+        # The job row as claimed for this run
+        self.owned: Tuple[Any, ...] = (
+            Job.id == job.id,
+            Job.status == "running",
+            Job.worker == (worker_id or job.worker),
+            Job.attempts == job.attempts,
+        )
+        self.lost = False
+
+    async def is_owned(self) -> bool:
+        """
+        Whether this run still holds the job.
+        """
+        async with self.session_factory() as session:
+            owned = (await session.exec(select(Job.id).where(*self.owned))).first() is not None
+        if not owned:
+            self.lost = True
+        return owned
+
+    async def ensure_owned(self) -> None:
+        """
+        Raise JobOwnershipLost unless this run still holds the job; handlers
+        call it before effects another run must not repeat.
+        """
+        if not await self.is_owned():
+            raise JobOwnershipLost(f"Job {self.job.id} was taken over by another run")
+
+    async def set_layer(self, layer_id: int) -> None:
+        """
+        Attach the job to the layer it created.
+        """
+        self.job.layer_id = layer_id
+        await self._update(layer_id=layer_id)
+
+    async def progress(self, done: int, total: Optional[int] = None) -> None:
+        """
+        Record progress, at most once per progress interval unless complete.
+        """
+        now = time.monotonic()
+        if now - self._reported_at < self.progress_interval and (total is None or done < total):
+            return
+        self._reported_at = now
+        await self._update(progress_done=done, progress_total=total)
+
+    async def _update(self, **values: Any) -> None:
+        async with self.session_factory() as session:
+            result = await session.execute(update(Job).where(*self.owned).values(**values))
+            await session.commit()
+        if result.rowcount == 0:
+            self.lost = True
+            raise JobOwnershipLost(f"Job {self.job.id} was taken over by another run")
+
+
+class JobDispatcher:
+    """
+    Claims pending jobs and runs up to ``concurrency`` of them at a time as
+    asyncio tasks of the current event loop.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        concurrency: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self._session_factory = session_factory
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.JOB_POLL_SECONDS
+        self.stale_seconds = stale_seconds if stale_seconds is not None else settings.JOB_STALE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def session_factory(self):
+        # Looked up late so tests and workers can swap the app's factory
+        return self._session_factory or db_session.async_session_factory
+
+    def notify(self) -> None:
+        """
+        Check for new jobs now instead of at the next poll.
+        """
+        self._wake.set()
+
+    async def claim(self) -> Optional[int]:
+        """
+        Mark the oldest pending job as running by this worker and return its
+        id, or None when the queue is empty.
+        """
+        async with self.session_factory() as session:
+            while True:
+                statement = select(Job.id).where(Job.status == "pending").order_by(Job.id).limit(1)
+                job_id = (await session.exec(statement)).first()
+                if job_id is None:
+                    return None
+                now = _now()
+                result = await session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "pending")
+                    .values(status="running", worker=self.worker_id, started_at=now, heartbeat_at=now,
+                            attempts=Job.attempts + 1)
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    return job_id
+                # Another worker got there first
+
+    async def run_job(self, job_id: int) -> None:
+        """
+        Run a claimed job and record its result or error, as long as this run
+        still owns it.
+        """
+        async with self.session_factory() as session:
+            job = await session.get(Job, job_id)
+        if job is None or job.status != "running" or job.worker != self.worker_id:
+            return
+        context = JobContext(job, self.session_factory, settings.JOB_PROGRESS_SECONDS, self.worker_id)
+        work = asyncio.create_task(self._handle(context))
+        heartbeat = asyncio.create_task(self._heartbeat(context, work))
+        try:
+            values = await work
+        except asyncio.CancelledError:
+            if not context.lost:
+                # Shutting down: let another worker pick the job up again
+                await self._release(context)
+                raise
+            values = None
+        finally:
+            heartbeat.cancel()
+        if values is not None:
+            async with self.session_factory() as session:
+                result = await session.execute(update(Job).where(*context.owned).values(completed_at=_now(), **values))
+                await session.commit()
+            if result.rowcount == 0:
+                context.lost = True
+        if context.lost:
+            logger.warning("Job %s (%s) was taken over by another run; dropped this run's outcome", job_id, job.kind)
+
+    async def _handle(self, context: JobContext) -> Dict[str, Any]:
+        from app.services.job_handlers import HANDLERS
+
+        job = context.job
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind {job.kind!r}")
+            result = await handler(context)
+            return {"status": "completed", "result": result, "error": None}
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            return {"status": "failed", "error": str(e) or type(e).__name__}
+
+    async def _heartbeat(self, context: JobContext, work: asyncio.Task) -> None:
+        # Handlers may go quiet for long steps; the job stays claimed as long
+        # as its worker is alive. A run that lost its job is cancelled.
+        while True:
+            await asyncio.sleep(self.stale_seconds / 3)
+            try:
+                async with self.session_factory() as session:
+                    result = await session.execute(update(Job).where(*context.owned).values(heartbeat_at=_now()))
+                    await session.commit()
+            except Exception:
+                logger.warning("Could not record the heartbeat of job %s", context.job.id, exc_info=True)
+                continue
+            if result.rowcount == 0:
+                context.lost = True
+                work.cancel()
+                return
+
+    async def _release(self, context: JobContext) -> None:
+        async with self.session_factory() as session:
+            await session.execute(update(Job).where(*context.owned).values(status="pending", worker=None))
+            await session.commit()
+
+    async def recover_stale(self) -> int:
+        """
+        Requeue running jobs whose worker has not reported for stale_seconds,
+        or fail them once they used up their attempts. Returns how many.
+        """
+        cutoff = _now() - timedelta(seconds=self.stale_seconds)
+        stale = (Job.status == "running", Job.heartbeat_at < cutoff)
+        async with self.session_factory() as session:
+            requeued = await session.execute(
+                update(Job).where(*stale, Job.attempts < self.max_attempts).values(status="pending", worker=None)
+            )
+            failed = await session.execute(
+                update(Job).where(*stale).values(
+                    status="failed", error="The worker running the job stopped responding", completed_at=_now()
+                )
+            )
+            await session.commit()
+        return requeued.rowcount + failed.rowcount
+
+    async def drain(self) -> int:
+        """
+        Run pending jobs one after another until there are none left.
+        Returns the number of jobs run.
+        """
+        count = 0
+        while True:
+            job_id = await self.claim()
+            if job_id is None:
+                return count
+            await self.run_job(job_id)
+            count += 1
+
+    async def run_forever(self) -> None:
+        last_recovery = 0.0
+        while True:
+            self._wake.clear()
+            try:
+                if time.monotonic() - last_recovery >= self.stale_seconds / 2:
+                    last_recovery = time.monotonic()
+                    await self.recover_stale()
+                while len(self._running) < self.concurrency:
+                    job_id = await self.claim()
+                    if job_id is None:
+                        break
+                    task = asyncio.create_task(self.run_job(job_id))
+                    self._running.add(task)
+                    task.add_done_callback(self._job_done)
+            except Exception:
+                logger.exception("Job dispatcher could not poll the queue")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        # A slot is free again
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """
+        Stop polling and cancel running jobs, which go back to the queue.
+        """
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+
+
+job_dispatcher = JobDispatcher()
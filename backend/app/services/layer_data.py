@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.layer_tables import get_data_table, get_pyramid_table
+from app.models.layer import Layer
+from app.services.geometry import Geometry, geometry_bbox
+from app.services.wkb import encode_geometry
+
+
+def feature_row(geometry: Optional[Geometry], properties: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build a data table row (geometry, properties and bbox) for a feature.
+    """
+    bbox = geometry_bbox(geometry) if geometry else None
+    minx, miny, maxx, maxy = bbox if bbox else (None, None, None, None)
+    return {
+        "geom": encode_geometry(geometry) if geometry else None,
+        "properties": properties or {},
+        "minx": minx,
+        "miny": miny,
+        "maxx": maxx,
+        "maxy": maxy,
+    }
+
+
+# Latest version of each layer this process has written or read on the primary
+_known_versions: Dict[int, int] = {}
+
+
+def known_version(layer_id: int) -> int:
+    """
+    The latest version of a layer this process knows of, or 0. A replica with
+    an older version has not caught up with the layer yet.
+    """
+    return _known_versions.get(layer_id, 0)
+
+
+def note_version(layer_id: int, version: int) -> None:
+    """
+    Remember a layer's version as read on the primary.
+    """
+    _known_versions[layer_id] = version
+
+
+def touch_layer(layer: Layer) -> None:
+    """
+    Record a change to the layer's data: bump its version and updated_at. The
+    version is part of the layer's ETag and of its cache keys, so every process
+    stops serving what it cached for the previous version.
+    """
+    layer.version = (layer.version or 0) + 1
+    layer.updated_at = datetime.now(timezone.utc)
+    if layer.id is not None:
+        _known_versions[layer.id] = layer.version
+
+
+async def create_data_table(conn: AsyncConnection, name: str) -> None:
+    """
+    Create a layer data table (and its bbox index) if it does not exist yet.
+    """
+    table = get_data_table(name)
+    await conn.run_sync(lambda sync_conn: table.create(sync_conn, checkfirst=True))
+
+
+async def drop_data_table(conn: AsyncConnection, name: str) -> None:
+    """
+    Drop a layer data table, and its geometry pyramid, if they exist.
+    """
+    table = get_data_table(name)
+    for lod in (get_pyramid_table(name), get_pyramid_table(name, building=True)):
+        await conn.run_sync(lambda sync_conn, lod=lod: lod.drop(sync_conn, checkfirst=True))
+    await conn.run_sync(lambda sync_conn: table.drop(sync_conn, checkfirst=True))
@@ -0,0 +1,402 @@
+import json
+import math
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.geometry import BBox, Geometry
+
+# Mapbox Vector Tile encoding (spec v2.1), written against the protobuf wire
+# format directly so tiles can be produced from any backend, with or without PostGIS.
+
+EARTH_RADIUS = 6378137.0
+ORIGIN_SHIFT = math.pi * EARTH_RADIUS
+MAX_LATITUDE = 85.0511287798066
+
+DEFAULT_EXTENT = 4096
+DEFAULT_BUFFER = 64
+
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+
+_POINT = 1
+_LINESTRING = 2
+_POLYGON = 3
+
+
+def lonlat_to_mercator(lon: float, lat: float) -> Tuple[float, float]:
+    """
+    Project a WGS84 longitude/latitude to EPSG:3857 metres.
+    """
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = math.radians(lon) * EARTH_RADIUS
+    y = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def mercator_to_lonlat(x: float, y: float) -> Tuple[float, float]:
+    """
+    Unproject EPSG:3857 metres to WGS84 longitude/latitude.
+    """
+    lon = math.degrees(x / EARTH_RADIUS)
+    lat = math.degrees(2 * math.atan(math.exp(y / EARTH_RADIUS)) - math.pi / 2)
+    return lon, lat
+
+
+def tile_bounds(z: int, x: int, y: int) -> BBox:
+    """
+    Return the EPSG:3857 bounds (minx, miny, maxx, maxy) of an XYZ tile.
+    """
+    size = 2 * ORIGIN_SHIFT / (1 << z)
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+    return (minx, maxy - size, minx + size, maxy)
+
+
+def tile_bounds_lonlat(z: int, x: int, y: int, buffer_ratio: float = 0.0) -> BBox:
+    """
+    Return the WGS84 bounds of an XYZ tile, optionally grown by a fraction of the tile size.
+    """
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * buffer_ratio
+    west, south = mercator_to_lonlat(minx - pad, miny - pad)
+    east, north = mercator_to_lonlat(maxx + pad, maxy + pad)
+    return (max(west, -180.0), max(south, -90.0), min(east, 180.0), min(north, 90.0))
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 30 and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+# --- Clipping ---------------------------------------------------------------
+
+def _clip_line(points: List[Tuple[float, float]], lo: float, hi: float) -> List[List[Tuple[float, float]]]:
+    """
+    Clip a line to the square [lo, hi] (Liang-Barsky), returning the visible parts.
+    """
+    parts: List[List[Tuple[float, float]]] = []
+    current: List[Tuple[float, float]] = []
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        t0, t1 = 0.0, 1.0
+        visible = True
+        for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - lo), (dy, hi - y0)):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+                continue
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    visible = False
+                    break
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    visible = False
+                    break
+                t1 = min(t1, t)
+        if not visible:
+            if current:
+                parts.append(current)
+                current = []
+            continue
+        start = (x0 + t0 * dx, y0 + t0 * dy)
+        end = (x0 + t1 * dx, y0 + t1 * dy)
+        if not current:
+            current = [start]
+        elif current[-1] != start:
+            parts.append(current)
+            current = [start]
+        current.append(end)
+        if t1 < 1.0:
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _clip_ring(ring: List[Tuple[float, float]], lo: float, hi: float) -> List[Tuple[float, float]]:
+    """
+    Clip a closed ring to the square [lo, hi] (Sutherland-Hodgman).
+    """
+    edges = (
+        (lambda p: p[0] >= lo, lambda a, b: _intersect_x(a, b, lo)),
+        (lambda p: p[0] <= hi, lambda a, b: _intersect_x(a, b, hi)),
+        (lambda p: p[1] >= lo, lambda a, b: _intersect_y(a, b, lo)),
+        (lambda p: p[1] <= hi, lambda a, b: _intersect_y(a, b, hi)),
+    )
+    output = ring[:-1] if ring and ring[0] == ring[-1] else list(ring)
+    for inside, intersect in edges:
+        if not output:
+            break
+        points, output = output, []
+        previous = points[-1]
+        for point in points:
+            if inside(point):
+                if not inside(previous):
+                    output.append(intersect(previous, point))
+                output.append(point)
+            elif inside(previous):
+                output.append(intersect(previous, point))
+            previous = point
+    return output
+
+
+def _intersect_x(a, b, x):
+    t = (x - a[0]) / (b[0] - a[0])
+    return (x, a[1] + t * (b[1] - a[1]))
+
+
+def _intersect_y(a, b, y):
+    t = (y - a[1]) / (b[1] - a[1])
+    return (a[0] + t * (b[0] - a[0]), y)
+
+
+# --- Quantization -----------------------------------------------------------
+
+def _quantize(points: Iterable[Tuple[float, float]]) -> List[Tuple[int, int]]:
+    result: List[Tuple[int, int]] = []
+    for x, y in points:
+        q = (int(round(x)), int(round(y)))
+        if not result or result[-1] != q:
+            result.append(q)
+    return result
+
+
+def _ring_area(ring: List[Tuple[int, int]]) -> int:
+    area = 0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        area += x0 * y1 - x1 * y0
+    return area
+
+
+class TileTransform:
+    """
+    Maps source coordinates (EPSG:4326 or EPSG:3857) into tile pixel space.
+    """
+
+    def __init__(self, z: int, x: int, y: int, srid: int = 4326, extent: int = DEFAULT_EXTENT):
+        self.extent = extent
+        self.srid = srid
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        self.minx = minx
+        self.maxy = maxy
+        self.scale = extent / (maxx - minx)
+
+    def __call__(self, position) -> Tuple[float, float]:
+        if self.srid == 3857:
+            mx, my = position[0], position[1]
+        else:
+            mx, my = lonlat_to_mercator(position[0], position[1])
+        return ((mx - self.minx) * self.scale, (self.maxy - my) * self.scale)
+
+
+def _prepare(geometry: Geometry, transform: TileTransform, buffer: int) -> List[Tuple[int, List[Any]]]:
+    """
+    Project, clip and quantize a geometry into (mvt type, parts) tuples.
+    """
+    lo, hi = -buffer, transform.extent + buffer
+    geom_type = geometry["type"]
+    coordinates = geometry.get("coordinates")
+
+    if geom_type == "GeometryCollection":
+        prepared = []
+        for member in geometry.get("geometries") or []:
+            prepared.extend(_prepare(member, transform, buffer))
+        return prepared
+    if not coordinates:
+        return []
+
+    if geom_type in ("Point", "MultiPoint"):
+        positions = [coordinates] if geom_type == "Point" else coordinates
+        points = []
+        for position in positions:
+            px, py = transform(position)
+            if lo <= px <= hi and lo <= py <= hi:
+                points.append((int(round(px)), int(round(py))))
+        return [(_POINT, points)] if points else []
+
+    if geom_type in ("LineString", "MultiLineString"):
+        lines = [coordinates] if geom_type == "LineString" else coordinates
+        parts = []
+        for line in lines:
+            projected = [transform(p) for p in line]
+            for clipped in _clip_line(projected, lo, hi):
+                quantized = _quantize(clipped)
+                if len(quantized) >= 2:
+                    parts.append(quantized)
+        return [(_LINESTRING, parts)] if parts else []
+
+    if geom_type in ("Polygon", "MultiPolygon"):
+        polygons = [coordinates] if geom_type == "Polygon" else coordinates
+        rings = []
+        for polygon in polygons:
+            for index, ring in enumerate(polygon):
+                clipped = _clip_ring([transform(p) for p in ring], lo, hi)
+                quantized = _quantize(clipped)
+                if len(quantized) > 1 and quantized[0] == quantized[-1]:
+                    quantized.pop()
+                if len(quantized) < 3:
+                    if index == 0:
+                        break  # exterior vanished, so do its holes
+                    continue
+                area = _ring_area(quantized)
+                if area == 0:
+                    if index == 0:
+                        break
+                    continue
+                # Exterior rings must have positive area in tile space, holes negative
+                if (index == 0) != (area > 0):
+                    quantized.reverse()
+                rings.append(quantized)
+        return [(_POLYGON, rings)] if rings else []
+
+    return []
+
+
+def _command(command_id: int, count: int) -> int:
+    return (command_id & 0x7) | (count << 3)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _encode_geometry(geom_type: int, parts: List[Any]) -> List[int]:
+    commands: List[int] = []
+    cx = cy = 0
+
+    def move(point):
+        nonlocal cx, cy
+        commands.append(_zigzag(point[0] - cx))
+        commands.append(_zigzag(point[1] - cy))
+        cx, cy = point
+
+    if geom_type == _POINT:
+        commands.append(_command(_MOVE_TO, len(parts)))
+        for point in parts:
+            move(point)
+        return commands
+
+    for line in parts:
+        commands.append(_command(_MOVE_TO, 1))
+        move(line[0])
+        commands.append(_command(_LINE_TO, len(line) - 1))
+        for point in line[1:]:
+            move(point)
+        if geom_type == _POLYGON:
+            commands.append(_command(_CLOSE_PATH, 1))
+    return commands
+
+
+# --- Protobuf writer --------------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: List[int]) -> bytes:
+    return _length_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _key(5, 0) + _varint(value)
+        return _key(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"))
+    return _length_delimited(1, value.encode("utf-8"))
+
+
+class TileLayerEncoder:
+    """
+    Accumulates features for one MVT layer.
+    """
+
+    def __init__(self, name: str, extent: int = DEFAULT_EXTENT):
+        self.name = name
+        self.extent = extent
+        self.keys: Dict[str, int] = {}
+        self.values: Dict[Tuple[type, Any], int] = {}
+        self.encoded_values: List[bytes] = []
+        self.features: List[bytes] = []
+
+    def _tags(self, properties: Optional[Dict[str, Any]]) -> List[int]:
+        tags: List[int] = []
+        for key, value in (properties or {}).items():
+            if value is None:
+                continue
+            key_index = self.keys.setdefault(key, len(self.keys))
+            value_key = (type(value), value if isinstance(value, (str, int, float, bool)) else json.dumps(value, sort_keys=True))
+            value_index = self.values.get(value_key)
+            if value_index is None:
+                value_index = len(self.encoded_values)
+                self.values[value_key] = value_index
+                self.encoded_values.append(_encode_value(value))
+            tags.extend((key_index, value_index))
+        return tags
+
+    def add_feature(
+        self,
+        geometry: Geometry,
+        transform: TileTransform,
+        properties: Optional[Dict[str, Any]] = None,
+        feature_id: Optional[int] = None,
+        buffer: int = DEFAULT_BUFFER,
+    ) -> bool:
+        """
+        Clip and add a feature; returns False if nothing of it falls inside the tile.
+        """
+        prepared = _prepare(geometry, transform, buffer)
+        if not prepared:
+            return False
+        tags = self._tags(properties)
+        for geom_type, parts in prepared:
+            feature = []
+            if feature_id is not None and feature_id >= 0:
+                feature.append(_key(1, 0) + _varint(feature_id))
+            if tags:
+                feature.append(_packed(2, tags))
+            feature.append(_key(3, 0) + _varint(geom_type))
+            feature.append(_packed(4, _encode_geometry(geom_type, parts)))
+            self.features.append(b"".join(feature))
+        return True
+
+    def encode(self) -> bytes:
+        parts = [_key(15, 0) + _varint(2), _length_delimited(1, self.name.encode("utf-8"))]
+        parts.extend(_length_delimited(2, feature) for feature in self.features)
+        parts.extend(_length_delimited(3, key.encode("utf-8")) for key in self.keys)
+        parts.extend(_length_delimited(4, value) for value in self.encoded_values)
+        parts.append(_key(5, 0) + _varint(self.extent))
+        return b"".join(parts)
+
+
+def encode_tile(layers: List[TileLayerEncoder]) -> bytes:
+    """
+    Encode layers into a vector tile; layers without features are omitted.
+    """
+    return b"".join(_length_delimited(3, layer.encode()) for layer in layers if layer.features)
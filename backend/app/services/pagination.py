@@ -0,0 +1,84 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import tuple_
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Sort orders available to keyset listings, as the columns of the cursor key.
+# Every key ends with the primary key so it is unique.
+ORDERINGS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "name": ("name", "id"),
+}
+
+
+class CursorError(ValueError):
+    """
+    Raised when a pagination cursor is malformed or does not match the ordering.
+    """
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+    """
+    raw = json.dumps(values, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor into the values of ``keys``, in order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise CursorError("Invalid cursor")
+    if not isinstance(values, dict) or set(values) != set(keys):
+        raise CursorError("Cursor does not match the requested ordering")
+    # Only scalars can be compared with the sort columns; anything else is forged
+    for key, value in values.items():
+        allowed = (int,) if key == "id" else (str, int, float)
+        if isinstance(value, bool) or not isinstance(value, allowed):
+            raise CursorError("Invalid cursor")
+    return tuple(values[key] for key in keys)
+
+
+async def keyset_page(
+    session: AsyncSession,
+    model: Type[SQLModel],
+    *where: Any,
+    order: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Return one page of ``model`` rows after ``cursor`` and the cursor of the next page.
+
+    Pages are selected with a row comparison on the sort key (``WHERE (name, id) >
+    (:name, :id) ORDER BY name, id LIMIT n``) rather than OFFSET, so deep pages
+    cost the same as the first one as long as the key is indexed.
+    """
+    keys = ORDERINGS.get(order)
+    if keys is None:
+        raise CursorError(f"Unsupported ordering {order!r}; expected one of: " + ", ".join(ORDERINGS))
+    columns = [getattr(model, key) for key in keys]
+
+    statement = select(model).where(*where).order_by(*columns).limit(limit + 1)
+    if cursor is not None:
+        after = decode_cursor(cursor, keys)
+        if len(columns) == 1:
+            statement = statement.where(columns[0] > after[0])
+        else:
+            statement = statement.where(tuple_(*columns) > tuple_(*after))
+
+    rows = list((await session.exec(statement)).all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({key: getattr(last, key) for key in keys})
+    return rows, next_cursor
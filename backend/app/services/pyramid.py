@@ -0,0 +1,168 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table, get_pyramid_table
+from app.models.layer import Layer
+from app.services.geometry import GeometryError
+from app.services.layer_data import touch_layer
+from app.services.mvt import ORIGIN_SHIFT
+from app.services.simplify import simplify_geometry, vertex_count
+from app.services.wkb import decode_geometry, encode_geometry
+
+settings = get_settings()
+
+# Width of the world in layer units, for the SRIDs tiles are rendered from
+WORLD_WIDTH = {4326: 360.0, 3857: 2 * ORIGIN_SHIFT}
+POINT_TYPES = ("POINT", "MULTIPOINT")
+
+
+def parse_zooms(value: Optional[str]) -> List[int]:
+    return sorted({int(z) for z in (value or "").split(",") if z.strip()})
+
+
+def level_tolerance(srid: Optional[int], zoom: int) -> Optional[float]:
+    """
+    Simplification tolerance for a pyramid level, in layer units: half a tile
+    pixel at ``zoom``, so the error stays below a pixel where degrees of
+    latitude are shorter than degrees of longitude on screen (up to 60°).
+    """
+    width = WORLD_WIDTH.get(srid or 4326)
+    if width is None:
+        return None
+    return width / (1 << zoom) / settings.TILE_EXTENT / 2
+
+
+def level_for_zoom(layer: Layer, z: int) -> Optional[int]:
+    """
+    The coarsest pyramid level still detailed enough for tiles at zoom ``z``,
+    or None to read full-resolution geometries.
+    """
+    return next((zoom for zoom in parse_zooms(layer.pyramid_zooms) if zoom >= z), None)
+
+
+def level_for_resolution(layer: Layer, resolution: Optional[float]) -> Optional[int]:
+    """
+    The coarsest pyramid level whose tolerance is within ``resolution`` (layer
+    units per pixel), or None to read full-resolution geometries.
+    """
+    if resolution is None:
+        return None
+    srid = layer.srid or 4326
+    for zoom in parse_zooms(layer.pyramid_zooms):
+        if level_tolerance(srid, zoom) <= resolution:
+            return zoom
+    return None
+
+
+def feature_statement(layer: Layer, level: Optional[int] = None):
+    """
+    SELECT of (id, geom, properties) over a layer's data table, with geom read
+    from the given pyramid level where that level has a simplified version.
+    Filters can keep using the data table's columns.
+    """
+    table = get_data_table(layer.data_table)
+    if level is None:
+        return select(table.c.id, table.c.geom, table.c.properties)
+    lod = get_pyramid_table(layer.data_table)
+    joined = table.outerjoin(lod, (lod.c.id == table.c.id) & (lod.c.level == level))
+    return select(table.c.id, func.coalesce(lod.c.geom, table.c.geom).label("geom"), table.c.properties).select_from(joined)
+
+
+def _simplify_rows(rows: Sequence[Tuple[int, Optional[bytes]]], levels: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+    out = []
+    for feature_id, geom in rows:
+        if not geom:
+            continue
+        try:
+            geometry = decode_geometry(geom)
+        except GeometryError:
+            continue
+        original = vertex_count(geometry)
+        # Finest level first; each coarser level simplifies the previous result
+        for zoom, tolerance in levels:
+            geometry = simplify_geometry(geometry, tolerance)
+            if vertex_count(geometry) < original:
+                out.append({"level": zoom, "id": feature_id, "geom": encode_geometry(geometry)})
+    return out
+
+
+async def build_pyramid(
+    session: AsyncSession,
+    layer: Layer,
+    zooms: Optional[Sequence[int]] = None,
+    chunk_size: Optional[int] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> int:
+    """
+    (Re)build a layer's simplified geometries for ``zooms`` (PYRAMID_ZOOMS by
+    default) and record them on the layer; the caller commits. Point layers and
+    SRIDs tiles are not rendered from get no pyramid. Returns the number of
+    simplified geometries stored; ``progress`` is awaited with the number of
+    features read after every chunk.
+
+    Levels are written to a separate table that replaces the current one at
+    the end, so reads of the old pyramid are not blocked while it is built;
+    the swap locks the table, so callers should commit right after.
+    """
+    zooms = sorted(set(parse_zooms(settings.PYRAMID_ZOOMS) if zooms is None else zooms))
+    srid = layer.srid or 4326
+    levels = [(zoom, level_tolerance(srid, zoom)) for zoom in reversed(zooms)]
+    conn = await session.connection()
+    if not levels or srid not in WORLD_WIDTH or (layer.geometry_type or "").upper() in POINT_TYPES:
+        lod = get_pyramid_table(layer.data_table)
+        await conn.run_sync(lambda sync_conn: lod.drop(sync_conn, checkfirst=True))
+        layer.pyramid_zooms = None
+        touch_layer(layer)
+        session.add(layer)
+        return 0
+
+    build = get_pyramid_table(layer.data_table, building=True)
+    await conn.run_sync(lambda sync_conn: build.drop(sync_conn, checkfirst=True))
+    await conn.run_sync(lambda sync_conn: build.create(sync_conn))
+    table = get_data_table(layer.data_table)
+    chunk_size = chunk_size or settings.INGEST_BATCH_SIZE
+    written = 0
+    read = 0
+    last_id = None
+    while True:
+        # Keyset batches, so reads and inserts can share the connection
+        statement = select(table.c.id, table.c.geom).order_by(table.c.id).limit(chunk_size)
+        if last_id is not None:
+            statement = statement.where(table.c.id > last_id)
+        rows = (await conn.execute(statement)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        simplified = await run_in_threadpool(_simplify_rows, rows, levels)
+        if simplified:
+            await conn.execute(build.insert(), simplified)
+            written += len(simplified)
+        read += len(rows)
+        if progress is not None:
+            await progress(read)
+
+    await _swap_pyramid_table(conn, layer.data_table)
+    layer.pyramid_zooms = ",".join(str(zoom) for zoom in zooms)
+    touch_layer(layer)
+    session.add(layer)
+    return written
+
+
+async def _swap_pyramid_table(conn: AsyncConnection, data_table: str) -> None:
+    """
+    Replace a layer's pyramid table with the one just built.
+    """
+    lod = get_pyramid_table(data_table)
+    build = get_pyramid_table(data_table, building=True)
+    quote = conn.dialect.identifier_preparer.quote
+    await conn.run_sync(lambda sync_conn: lod.drop(sync_conn, checkfirst=True))
+    await conn.execute(text(f"ALTER TABLE {quote(build.name)} RENAME TO {quote(lod.name)}"))
+    if conn.dialect.name == "postgresql":
+        # Constraint (and index) names are schema-wide there; the next build reuses this one
+        await conn.execute(text(f"ALTER INDEX {quote('pk_' + build.name)} RENAME TO {quote('pk_' + lod.name)}"))
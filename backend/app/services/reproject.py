@@ -0,0 +1,161 @@
+"""
+Coordinate reprojection between SRIDs.
+
+Geometries are reprojected a batch at a time: the positions of every geometry
+in the batch are gathered into NumPy arrays and transformed in one pyproj call,
+then written back in the same order. Transformers are built once per SRID pair.
+"""
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pyproj import Transformer
+from pyproj.exceptions import CRSError
+from sqlalchemy import bindparam, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.geometry import Geometry, GeometryError, iter_positions, map_positions
+from app.services.layer_data import feature_row, touch_layer
+from app.services.wkb import decode_geometry
+
+settings = get_settings()
+
+# Distinct SRID pairs whose transformers are kept
+TRANSFORMER_CACHE_SIZE = 64
+
+
+class ReprojectionError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def get_transformer(source: int, target: int) -> Transformer:
+    """
+    The transformer from EPSG:``source`` to EPSG:``target``, in x/y (lon/lat)
+    axis order whatever the CRS definitions say. Raises ReprojectionError for
+    unknown codes.
+    """
+    try:
+        return Transformer.from_crs(f"EPSG:{source}", f"EPSG:{target}", always_xy=True)
+    except CRSError as e:
+        raise ReprojectionError(f"Cannot reproject from EPSG:{source} to EPSG:{target}: {e}")
+
+
+def transform_xy(source: int, target: int, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform coordinate arrays; positions outside the target CRS come back as inf.
+    """
+    if source == target:
+        return x, y
+    return get_transformer(source, target).transform(x, y)
+
+
+def reproject_geometries(
+    geometries: Sequence[Optional[Geometry]],
+    source: int,
+    target: int,
+) -> List[Optional[Geometry]]:
+    """
+    Reproject a batch of GeoJSON geometries. Z values are kept as they are;
+    geometries with a position that has no valid target coordinates become None.
+    """
+    if source == target:
+        return list(geometries)
+    counts = []
+    xs: List[float] = []
+    ys: List[float] = []
+    for geometry in geometries:
+        count = 0
+        if geometry:
+            for position in iter_positions(geometry):
+                xs.append(position[0])
+                ys.append(position[1])
+                count += 1
+        counts.append(count)
+    if not xs:
+        return list(geometries)
+
+    x, y = transform_xy(source, target, np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+    finite = (np.isfinite(x) & np.isfinite(y)).tolist()
+    positions = iter(zip(x.tolist(), y.tolist()))
+
+    def move(position: List[float]) -> List[float]:
+        return [*next(positions), *position[2:]]
+
+    out: List[Optional[Geometry]] = []
+    start = 0
+    for geometry, count in zip(geometries, counts):
+        if not count:
+            out.append(geometry)
+            continue
+        if all(finite[start:start + count]):
+            out.append(map_positions(geometry, move))
+        else:
+            out.append(None)
+            for _ in range(count):
+                next(positions)
+        start += count
+    return out
+
+
+def _reproject_rows(rows: Sequence[Tuple[int, Optional[bytes]]], source: int, target: int) -> List[dict]:
+    geometries = []
+    for _, geom in rows:
+        try:
+            geometries.append(decode_geometry(geom) if geom else None)
+        except GeometryError:
+            geometries.append(None)
+    out = []
+    for (feature_id, _), geometry in zip(rows, reproject_geometries(geometries, source, target)):
+        row = feature_row(geometry)
+        del row["properties"]
+        row["row_id"] = feature_id
+        out.append(row)
+    return out
+
+
+async def reproject_layer(
+    session: AsyncSession,
+    layer: Layer,
+    srid: int,
+    chunk_size: Optional[int] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> int:
+    """
+    Rewrite a layer's geometries (and their bboxes) in EPSG:``srid`` and set
+    its srid; the caller commits, and rebuilds the layer's pyramid since
+    simplified geometries are still in the old SRID. Geometries that cannot be
+    represented in the target SRID are cleared. Returns the number of features
+    read; ``progress`` is awaited with it after every chunk.
+    """
+    source = layer.srid or 4326
+    get_transformer(source, srid)
+    table = get_data_table(layer.data_table)
+    chunk_size = chunk_size or settings.INGEST_BATCH_SIZE
+    statement = update(table).where(table.c.id == bindparam("row_id"))
+    conn = await session.connection()
+    read = 0
+    last_id = None
+    while True:
+        # Keyset batches, so reads and updates can share the connection
+        query = select(table.c.id, table.c.geom).order_by(table.c.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows = (await conn.execute(query)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        await conn.execute(statement, await run_in_threadpool(_reproject_rows, rows, source, srid))
+        read += len(rows)
+        if progress is not None:
+            await progress(read)
+
+    layer.srid = srid
+    touch_layer(layer)
+    session.add(layer)
+    return read
@@ -0,0 +1,187 @@
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.services.geometry import BBox
+
+Item = Tuple[int, BBox]
+
+DEFAULT_NODE_SIZE = 16
+
+
+def _str_order(entries: List[Tuple[BBox, int]], node_size: int) -> List[Tuple[BBox, int]]:
+    """
+    Sort-Tile-Recursive ordering: sort by center x into vertical slices, then
+    by center y within each slice, so consecutive runs of ``node_size``
+    entries form compact nodes.
+    """
+    count = len(entries)
+    if count <= node_size:
+        return entries
+    node_count = math.ceil(count / node_size)
+    slice_count = math.ceil(math.sqrt(node_count))
+    slice_size = slice_count * node_size
+
+    entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    ordered = []
+    for start in range(0, count, slice_size):
+        ordered.extend(sorted(entries[start:start + slice_size], key=lambda e: e[0][1] + e[0][3]))
+    return ordered
+
+
+class PackedRTree:
+    """
+    Static, bulk-loaded R-tree stored in flat arrays.
+
+    All nodes live in two arrays: ``boxes`` (four doubles per node) and
+    ``refs``. The first ``size`` slots are the leaf items, whose ref is the
+    item id; every following slot is an internal node, whose ref is the slot of
+    its first child. Children of a node are contiguous, so the whole tree costs
+    a few dozen bytes per item and no Python objects per node.
+    """
+
+    def __init__(self, items: Iterable[Item] = (), node_size: int = DEFAULT_NODE_SIZE):
+        self.node_size = max(2, node_size)
+        self.boxes = array("d")
+        self.refs = array("q")
+        # Slot index where each level ends, leaves first
+        self.level_ends: List[int] = []
+
+        entries = [(tuple(box), item_id) for item_id, box in items]
+        self.size = len(entries)
+        if not entries:
+            return
+
+        while True:
+            entries = _str_order(entries, self.node_size)
+            level_start = len(self.refs)
+            for box, ref in entries:
+                self.boxes.extend(box)
+                self.refs.append(ref)
+            self.level_ends.append(len(self.refs))
+            if len(entries) == 1:
+                break
+
+            parents = []
+            for start in range(0, len(entries), self.node_size):
+                group = entries[start:start + self.node_size]
+                box = (
+                    min(b[0][0] for b in group),
+                    min(b[0][1] for b in group),
+                    max(b[0][2] for b in group),
+                    max(b[0][3] for b in group),
+                )
+                parents.append((box, level_start + start))
+            entries = parents
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _level_end(self, slot: int) -> int:
+        for end in self.level_ends:
+            if slot < end:
+                return end
+        return len(self.refs)
+
+    def search(self, bbox: BBox) -> List[int]:
+        """
+        Return the ids of items whose box intersects ``bbox``.
+        """
+        if not self.size:
+            return []
+        minx, miny, maxx, maxy = bbox
+        boxes, refs, size = self.boxes, self.refs, self.size
+        results = []
+        stack = [len(refs) - 1]
+        while stack:
+            slot = stack.pop()
+            if slot < size:
+                results.append(refs[slot])
+                continue
+            first = refs[slot]
+            last = min(first + self.node_size, self._level_end(first))
+            for child in range(first, last):
+                offset = child * 4
+                if (
+                    boxes[offset] <= maxx
+                    and boxes[offset + 1] <= maxy
+                    and boxes[offset + 2] >= minx
+                    and boxes[offset + 3] >= miny
+                ):
+                    stack.append(child)
+        return results
+
+    def items(self) -> Iterator[Item]:
+        boxes = self.boxes
+        for slot in range(self.size):
+            offset = slot * 4
+            yield self.refs[slot], (boxes[offset], boxes[offset + 1], boxes[offset + 2], boxes[offset + 3])
+
+
+class SpatialIndex:
+    """
+    A packed R-tree plus a small write buffer.
+
+    Inserts and updates go to ``pending`` (scanned linearly) and hide any older
+    entry in the tree; removals only hide. Once the buffer grows past
+    ``rebuild_ratio`` of the tree the whole index is bulk loaded again, so
+    writes stay cheap and queries stay close to packed-tree speed.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Item] = (),
+        node_size: int = DEFAULT_NODE_SIZE,
+        rebuild_ratio: float = 0.1,
+        min_rebuild: int = 256,
+    ):
+        self.node_size = node_size
+        self.rebuild_ratio = rebuild_ratio
+        self.min_rebuild = min_rebuild
+        self.tree = PackedRTree(items, node_size)
+        self.pending: Dict[int, BBox] = {}
+        self.hidden: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.tree) - len(self.hidden) + len(self.pending)
+
+    def insert(self, item_id: int, bbox: Optional[BBox]) -> None:
+        """
+        Insert or replace an item; a None bbox removes it.
+        """
+        if bbox is None:
+            self.remove(item_id)
+            return
+        self.hidden.add(item_id)
+        self.pending[item_id] = tuple(bbox)
+        self._maybe_rebuild()
+
+    def remove(self, item_id: int) -> None:
+        self.pending.pop(item_id, None)
+        self.hidden.add(item_id)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self) -> None:
+        threshold = max(self.min_rebuild, int(len(self.tree) * self.rebuild_ratio))
+        if len(self.pending) + len(self.hidden) > threshold:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        items = [(i, box) for i, box in self.tree.items() if i not in self.hidden]
+        items.extend(self.pending.items())
+        self.tree = PackedRTree(items, self.node_size)
+        self.pending = {}
+        self.hidden = set()
+
+    def search(self, bbox: BBox) -> List[int]:
+        """
+        Return the ids of items whose bbox intersects ``bbox``.
+        """
+        results = self.tree.search(bbox)
+        if self.hidden:
+            results = [i for i in results if i not in self.hidden]
+        minx, miny, maxx, maxy = bbox
+        for item_id, box in self.pending.items():
+            if box[0] <= maxx and box[1] <= maxy and box[2] >= minx and box[3] >= miny:
+                results.append(item_id)
+        return results
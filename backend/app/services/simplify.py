@@ -0,0 +1,119 @@
+from typing import List, Optional, Sequence
+
+from app.services.geometry import Geometry, iter_positions
+
+Position = Sequence[float]
+
+
+def _segment_distance_sq(p: Position, a: Position, b: Position) -> float:
+    """
+    Squared distance from p to the segment a-b.
+    """
+    ax, ay = a[0], a[1]
+    dx, dy = b[0] - ax, b[1] - ay
+    px, py = p[0] - ax, p[1] - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq > 0:
+        t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+        px -= t * dx
+        py -= t * dy
+    return px * px + py * py
+
+
+def _keep_mask(points: Sequence[Position], tolerance_sq: float, first: int, last: int, keep: List[bool]) -> None:
+    # Iterative Douglas-Peucker: long lines would exhaust the recursion limit
+    stack = [(first, last)]
+    while stack:
+        first, last = stack.pop()
+        farthest, max_distance = -1, tolerance_sq
+        a, b = points[first], points[last]
+        for i in range(first + 1, last):
+            distance = _segment_distance_sq(points[i], a, b)
+            if distance > max_distance:
+                farthest, max_distance = i, distance
+        if farthest >= 0:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+
+def simplify_line(points: Sequence[Position], tolerance: float) -> List[Position]:
+    """
+    Douglas-Peucker simplification of an open line; the ends are always kept.
+    """
+    if len(points) <= 2 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    _keep_mask(points, tolerance * tolerance, 0, len(points) - 1, keep)
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_ring(ring: Sequence[Position], tolerance: float) -> Optional[List[Position]]:
+    """
+    Simplify a closed ring, or return None if it collapses below a triangle.
+
+    The ring is split at the vertex farthest from its start, so both halves are
+    open lines with distinct ends.
+    """
+    if len(ring) <= 4 or tolerance <= 0:
+        return list(ring)
+    start = ring[0]
+    split = max(range(1, len(ring) - 1), key=lambda i: _segment_distance_sq(ring[i], start, start))
+    keep = [False] * len(ring)
+    keep[0] = keep[split] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    _keep_mask(ring, tolerance_sq, 0, split, keep)
+    _keep_mask(ring, tolerance_sq, split, len(ring) - 1, keep)
+    simplified = [p for p, k in zip(ring, keep) if k]
+    return simplified if len(simplified) >= 4 else None
+
+
+def _minimal_ring(ring: Sequence[Position]) -> List[Position]:
+    """
+    The triangle of a ring's most significant vertices, for rings that would
+    otherwise collapse: the start, the vertex farthest from it and the vertex
+    farthest from the line between those two.
+    """
+    start = ring[0]
+    far = max(ring, key=lambda p: _segment_distance_sq(p, start, start))
+    third = max(ring, key=lambda p: _segment_distance_sq(p, start, far))
+    return [start, far, third, start]
+
+
+def _simplify_polygon(rings: Sequence[Sequence[Position]], tolerance: float) -> List[List[Position]]:
+    exterior = simplify_ring(rings[0], tolerance) or _minimal_ring(rings[0])
+    # Holes smaller than the tolerance are dropped
+    holes = [hole for hole in (simplify_ring(ring, tolerance) for ring in rings[1:]) if hole]
+    return [exterior] + holes
+
+
+def simplify_geometry(geometry: Geometry, tolerance: float) -> Geometry:
+    """
+    Simplify a geometry so no removed vertex lies further than ``tolerance``
+    from the result. Points are returned unchanged, and polygons never
+    disappear: an exterior ring is kept as at least a triangle.
+    """
+    geom_type = geometry["type"]
+    coords = geometry.get("coordinates")
+    if geom_type == "LineString":
+        return {"type": geom_type, "coordinates": simplify_line(coords, tolerance)}
+    if geom_type == "MultiLineString":
+        return {"type": geom_type, "coordinates": [simplify_line(line, tolerance) for line in coords]}
+    if geom_type == "Polygon" and coords:
+        return {"type": geom_type, "coordinates": _simplify_polygon(coords, tolerance)}
+    if geom_type == "MultiPolygon":
+        return {
+            "type": geom_type,
+            "coordinates": [_simplify_polygon(polygon, tolerance) for polygon in coords if polygon],
+        }
+    if geom_type == "GeometryCollection":
+        return {
+            "type": geom_type,
+            "geometries": [simplify_geometry(member, tolerance) for member in geometry["geometries"]],
+        }
+    return geometry
+
+
+def vertex_count(geometry: Geometry) -> int:
+    return sum(1 for _ in iter_positions(geometry))
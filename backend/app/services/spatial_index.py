@@ -0,0 +1,191 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.example_model import ExampleModel
+from app.models.layer import Layer
+from app.services.geometry import (
+    BBox,
+    Geometry,
+    GeometryError,
+    geometries_intersect,
+    geometry_bbox,
+)
+from app.services.rtree import SpatialIndex
+from app.services.wkb import decode_geometry
+
+settings = get_settings()
+
+EXAMPLE_INDEX_KEY = ExampleModel.__tablename__
+
+
+class SpatialIndexRegistry:
+    """
+    In-process spatial indexes keyed by table name, built lazily on first query.
+
+    Indexes are per worker process: bulk writes invalidate them, single-row
+    writes update them in place. Query results are always re-read from the
+    database by id, so an id left behind by a rolled back write is harmless.
+    Layer indexes are stored with the layer version they were built from and
+    are not returned for any other, so changes made by other processes are seen.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, SpatialIndex] = {}
+        self._versions: Dict[str, Optional[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def get(self, key: str, version: Optional[int] = None) -> Optional[SpatialIndex]:
+        if self._versions.get(key) != version:
+            return None
+        return self._indexes.get(key)
+
+    def set(self, key: str, index: SpatialIndex, version: Optional[int] = None) -> None:
+        self._indexes[key] = index
+        self._versions[key] = version
+
+    def lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def invalidate(self, key: str) -> None:
+        self._indexes.pop(key, None)
+        self._versions.pop(key, None)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+        self._versions.clear()
+
+
+spatial_indexes = SpatialIndexRegistry()
+
+
+def use_memory_index(session: AsyncSession) -> bool:
+    """
+    Whether spatial filters should go through the in-process R-tree.
+    """
+    backend = settings.SPATIAL_INDEX_BACKEND
+    if backend == "auto":
+        return session.get_bind().dialect.name != "postgresql"
+    return backend == "memory"
+
+
+def _build(items) -> SpatialIndex:
+    return SpatialIndex(items, node_size=settings.SPATIAL_INDEX_NODE_SIZE)
+
+
+async def get_layer_index(session: AsyncSession, layer: Layer) -> SpatialIndex:
+    """
+    Return the R-tree over a layer's feature bounding boxes, building it if needed.
+    """
+    key = layer.data_table
+    index = spatial_indexes.get(key, layer.version)
+    if index is not None:
+        return index
+    async with spatial_indexes.lock(key):
+        index = spatial_indexes.get(key, layer.version)
+        if index is None:
+            table = get_data_table(layer.data_table)
+            statement = select(table.c.id, table.c.minx, table.c.miny, table.c.maxx, table.c.maxy).where(
+                table.c.minx.is_not(None)
+            )
+            rows = (await session.exec(statement)).all()
+            items = [(row[0], (row[1], row[2], row[3], row[4])) for row in rows]
+            index = await run_in_threadpool(_build, items)
+            spatial_indexes.set(key, index, layer.version)
+    return index
+
+
+def _example_bbox(geom: Optional[bytes]) -> Optional[BBox]:
+    if not geom:
+        return None
+    try:
+        return geometry_bbox(decode_geometry(geom))
+    except GeometryError:
+        return None
+
+
+async def get_example_index(session: AsyncSession) -> SpatialIndex:
+    """
+    Return the R-tree over ExampleModel geometries, building it if needed.
+    """
+    index = spatial_indexes.get(EXAMPLE_INDEX_KEY)
+    if index is not None:
+        return index
+    async with spatial_indexes.lock(EXAMPLE_INDEX_KEY):
+        index = spatial_indexes.get(EXAMPLE_INDEX_KEY)
+        if index is None:
+            rows = (await session.exec(select(ExampleModel.id, ExampleModel.geom))).all()
+
+            def build():
+                items = []
+                for item_id, geom in rows:
+                    bbox = _example_bbox(geom)
+                    if bbox is not None:
+                        items.append((item_id, bbox))
+                return _build(items)
+
+            index = await run_in_threadpool(build)
+            spatial_indexes.set(EXAMPLE_INDEX_KEY, index)
+    return index
+
+
+@event.listens_for(ExampleModel, "after_insert")
+@event.listens_for(ExampleModel, "after_update")
+def _example_written(mapper, connection, target: ExampleModel) -> None:
+    index = spatial_indexes.get(EXAMPLE_INDEX_KEY)
+    if index is not None:
+        index.insert(target.id, _example_bbox(target.geom))
+
+
+@event.listens_for(ExampleModel, "after_delete")
+def _example_deleted(mapper, connection, target: ExampleModel) -> None:
+    index = spatial_indexes.get(EXAMPLE_INDEX_KEY)
+    if index is not None:
+        index.remove(target.id)
+
+
+async def find_examples(
+    session: AsyncSession,
+    bbox: Optional[BBox] = None,
+    intersects: Optional[Geometry] = None,
+) -> List[ExampleModel]:
+    """
+    Return ExampleModel rows whose geometry bbox overlaps ``bbox`` and, when
+    given, whose geometry intersects ``intersects``.
+    """
+    if intersects is not None:
+        query_box = geometry_bbox(intersects)
+        if query_box is None:
+            return []
+        if bbox is not None:
+            query_box = (
+                max(bbox[0], query_box[0]),
+                max(bbox[1], query_box[1]),
+                min(bbox[2], query_box[2]),
+                min(bbox[3], query_box[3]),
+            )
+            if query_box[0] > query_box[2] or query_box[1] > query_box[3]:
+                return []
+    elif bbox is not None:
+        query_box = bbox
+    else:
+        raise ValueError("find_examples needs a bbox or an intersects geometry")
+
+    index = await get_example_index(session)
+    ids = sorted(index.search(query_box))
+    if not ids:
+        return []
+    results = []
+    for start in range(0, len(ids), settings.SPATIAL_INDEX_ID_BATCH):
+        batch = ids[start:start + settings.SPATIAL_INDEX_ID_BATCH]
+        rows = await session.exec(select(ExampleModel).where(ExampleModel.id.in_(batch)).order_by(ExampleModel.id))
+        for row in rows:
+            if intersects is None or (row.geom and geometries_intersect(decode_geometry(row.geom), intersects)):
+                results.append(row)
+    return results
@@ -0,0 +1,230 @@
+"""
+Synthetic layer data for load testing and profiling.
+
+Features are generated a batch at a time with NumPy: positions are drawn
+around weighted cluster centres (a few dense "cities", many small "towns",
+plus uniform background noise), and the WKB of a whole batch is written as one
+structured array, since every feature of a batch has the same layout.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models.layer import Layer
+from app.services.ingest import copy_rows, new_data_table_name
+from app.services.layer_data import create_data_table
+from app.services.pyramid import build_pyramid
+from app.services.wkb import encode_geometry, parse_wkb
+
+settings = get_settings()
+
+KINDS = ("point", "line", "polygon")
+GEOMETRY_TYPES = {"point": "POINT", "line": "LINESTRING", "polygon": "POLYGON"}
+CATEGORIES = ("residential", "commercial", "industrial", "agricultural", "park", "water")
+CATEGORY_WEIGHTS = (0.45, 0.2, 0.1, 0.15, 0.07, 0.03)
+
+BBox = Tuple[float, float, float, float]
+DEFAULT_EXTENT: BBox = (-10.0, 35.0, 30.0, 60.0)
+
+
+@dataclass
+class Clusters:
+    centres: np.ndarray  # (k, 2)
+    spreads: np.ndarray  # (k,) standard deviation in degrees
+    weights: np.ndarray  # (k,) sums to 1
+
+
+def make_clusters(rng: np.random.Generator, extent: BBox, count: int) -> Clusters:
+    """
+    Cluster centres spread over ``extent``, with heavy-tailed sizes: a few
+    clusters take most of the features, like population across cities.
+    """
+    minx, miny, maxx, maxy = extent
+    centres = np.column_stack([rng.uniform(minx, maxx, count), rng.uniform(miny, maxy, count)])
+    weights = rng.pareto(1.2, count) + 1.0
+    weights /= weights.sum()
+    # Bigger clusters also sprawl further
+    span = min(maxx - minx, maxy - miny)
+    spreads = span * 0.002 * np.sqrt(weights * count) * rng.lognormal(0.0, 0.3, count)
+    return Clusters(centres=centres, spreads=spreads, weights=weights)
+
+
+def clustered_positions(
+    rng: np.random.Generator, clusters: Clusters, extent: BBox, count: int, noise: float = 0.1
+) -> np.ndarray:
+    """
+    ``count`` positions (an (n, 2) array), a ``noise`` share of them uniform
+    over the extent and the rest normally distributed around clusters.
+    """
+    minx, miny, maxx, maxy = extent
+    index = rng.choice(len(clusters.weights), size=count, p=clusters.weights)
+    positions = clusters.centres[index] + rng.standard_normal((count, 2)) * clusters.spreads[index, None]
+    background = rng.random(count) < noise
+    positions[background, 0] = rng.uniform(minx, maxx, background.sum())
+    positions[background, 1] = rng.uniform(miny, maxy, background.sum())
+    positions[:, 0] = np.clip(positions[:, 0], minx, maxx)
+    positions[:, 1] = np.clip(positions[:, 1], miny, maxy)
+    return positions
+
+
+def _shapes(rng: np.random.Generator, kind: str, centres: np.ndarray, vertices: int) -> np.ndarray:
+    """
+    Coordinates of every feature, an (n, m, 2) array.
+    """
+    n = len(centres)
+    if kind == "point":
+        return centres[:, None, :]
+    if kind == "line":
+        # Random walks with a preferred heading, like roads and rivers
+        heading = rng.uniform(0, 2 * np.pi, (n, 1)) + np.cumsum(rng.normal(0, 0.3, (n, vertices - 1)), axis=1)
+        step = rng.lognormal(np.log(0.0005), 0.5, (n, vertices - 1))
+        steps = np.stack([np.cos(heading) * step, np.sin(heading) * step], axis=-1)
+        return centres[:, None, :] + np.concatenate([np.zeros((n, 1, 2)), np.cumsum(steps, axis=1)], axis=1)
+    # Polygons: star-shaped rings with jittered radii, closed by repeating the first vertex
+    angles = np.sort(rng.uniform(0, 2 * np.pi, (n, vertices)), axis=1)
+    radii = rng.lognormal(np.log(0.0002), 0.6, (n, 1)) * rng.uniform(0.7, 1.0, (n, vertices))
+    ring = centres[:, None, :] + np.stack([np.cos(angles) * radii, np.sin(angles) * radii], axis=-1)
+    return np.concatenate([ring, ring[:, :1, :]], axis=1)
+
+
+def shapes_to_wkb(kind: str, coords: np.ndarray) -> List[bytes]:
+    """
+    Little-endian ISO WKB for every feature of a batch.
+
+    All features share one layout (type and vertex count), so the batch is
+    written as a single structured array and sliced into fixed-size records.
+    """
+    n, m = coords.shape[:2]
+    if kind == "point":
+        fields = [("order", "u1"), ("type", "<u4"), ("coords", "<f8", (2,))]
+        values = {"type": 1, "coords": coords[:, 0, :]}
+    elif kind == "line":
+        fields = [("order", "u1"), ("type", "<u4"), ("count", "<u4"), ("coords", "<f8", (m, 2))]
+        values = {"type": 2, "count": m, "coords": coords}
+    else:
+        fields = [("order", "u1"), ("type", "<u4"), ("rings", "<u4"), ("count", "<u4"), ("coords", "<f8", (m, 2))]
+        values = {"type": 3, "rings": 1, "count": m, "coords": coords}
+    records = np.zeros(n, dtype=np.dtype(fields))
+    records["order"] = 1
+    for name, value in values.items():
+        records[name] = value
+    data = records.tobytes()
+    size = records.dtype.itemsize
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def generate_rows(
+    rng: np.random.Generator,
+    clusters: Clusters,
+    extent: BBox,
+    kind: str,
+    count: int,
+    vertices: int = 8,
+    start_id: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    One batch of data table rows: geometry, bbox and synthetic attributes.
+    """
+    centres = clustered_positions(rng, clusters, extent, count)
+    coords = _shapes(rng, kind, centres, vertices)
+    geoms = shapes_to_wkb(kind, coords)
+    if settings.GEOMETRY_ENCODING != "wkb":
+        geoms = [encode_geometry(parse_wkb(geom)) for geom in geoms]
+    mins = coords.min(axis=1).tolist()
+    maxs = coords.max(axis=1).tolist()
+
+    categories = rng.choice(len(CATEGORIES), size=count, p=CATEGORY_WEIGHTS).tolist()
+    values = np.round(rng.lognormal(4.0, 1.0, count), 2).tolist()
+    years = rng.integers(1900, 2025, count).tolist()
+    flags = (rng.random(count) < 0.3).tolist()
+    return [
+        {
+            "geom": geoms[i],
+            "properties": {
+                "name": f"{kind}-{start_id + i}",
+                "category": CATEGORIES[categories[i]],
+                "value": values[i],
+                "year": years[i],
+                "flagged": flags[i],
+            },
+            "minx": mins[i][0],
+            "miny": mins[i][1],
+            "maxx": maxs[i][0],
+            "maxy": maxs[i][1],
+        }
+        for i in range(count)
+    ]
+
+
+def iter_batches(
+    kind: str,
+    count: int,
+    batch_size: int,
+    extent: BBox = DEFAULT_EXTENT,
+    clusters: int = 200,
+    vertices: int = 8,
+    seed: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield ``count`` rows in batches; the same seed gives the same data.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown geometry kind {kind!r}; expected one of: " + ", ".join(KINDS))
+    min_vertices = {"point": 1, "line": 2, "polygon": 3}[kind]
+    if vertices < min_vertices:
+        raise ValueError(f"A {kind} needs at least {min_vertices} vertices")
+    rng = np.random.default_rng(seed)
+    centres = make_clusters(rng, extent, clusters)
+    for start in range(0, count, batch_size):
+        yield generate_rows(rng, centres, extent, kind, min(batch_size, count - start), vertices, start)
+
+
+async def load_synthetic_layer(
+    session: AsyncSession,
+    project_id: int,
+    name: str,
+    kind: str,
+    count: int,
+    batch_size: Optional[int] = None,
+    **options: Any,
+) -> Layer:
+    """
+    Create a layer and bulk load ``count`` synthetic features into it.
+
+    The next batch is generated in a worker thread while the current one is
+    being copied into the database.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    batches = iter_batches(kind, count, batch_size, **options)
+    layer = Layer(
+        project_id=project_id,
+        name=name,
+        data_table=new_data_table_name(),
+        srid=4326,
+        geometry_type=GEOMETRY_TYPES[kind],
+    )
+    session.add(layer)
+    await session.flush()
+    conn = await session.connection()
+    await create_data_table(conn, layer.data_table)
+
+    pending = asyncio.create_task(asyncio.to_thread(next, batches, None))
+    try:
+        while True:
+            rows = await pending
+            if rows is None:
+                break
+            pending = asyncio.create_task(asyncio.to_thread(next, batches, None))
+            await copy_rows(conn, layer.data_table, rows)
+        await build_pyramid(session, layer, chunk_size=batch_size)
+        await session.commit()
+    except Exception:
+        pending.cancel()
+        await session.rollback()
+        raise
+    await session.refresh(layer)
+    return layer
@@ -0,0 +1,179 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.compression import SUFFIXES
+from app.core.config import get_settings
+
+TileKey = Tuple[int, int, int, int, int]  # (layer_id, layer version, z, x, y)
+
+
+class TileCache:
+    """
+    Two-level LRU cache for encoded tiles: a bounded in-memory map in front of a
+    bounded on-disk store. Both levels are keyed by layer, layer version and
+    tile coordinates, so a changed layer is never served from tiles cached
+    for its previous version, even by other processes sharing the disk level.
+
+    Tiles are stored as given; ``encoding`` names the content encoding callers
+    store them in (None for raw tiles) and is part of the file names, so a
+    cache directory written with another encoding is not read back.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        disk_dir: Optional[str],
+        disk_max_bytes: int,
+        encoding: Optional[str] = None,
+    ):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+        self.encoding = encoding or None
+        self.suffix = ".mvt" + (SUFFIXES[self.encoding] if self.encoding else "")
+        self._memory: "OrderedDict[TileKey, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[TileKey, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Paths ---------------------------------------------------------
+
+    def _path(self, key: TileKey) -> str:
+        layer_id, version, z, x, y = key
+        return os.path.join(self.disk_dir, str(layer_id), str(version), str(z), str(x), f"{y}{self.suffix}")
+
+    def _load_disk_index(self) -> None:
+        """
+        Index tiles already on disk (oldest first) so the size bound survives restarts.
+        """
+        self._disk_loaded = True
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        found = []
+        for root, _, files in os.walk(self.disk_dir):
+            for filename in files:
+                if not filename.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    parts = os.path.relpath(path, self.disk_dir).split(os.sep)
+                    key = (int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4][:-len(self.suffix)]))
+                    stat = os.stat(path)
+                except (ValueError, IndexError, OSError):
+                    continue
+                found.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    # --- Memory level --------------------------------------------------
+
+    def _memory_put(self, key: TileKey, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # --- Public API ----------------------------------------------------
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        """
+        Return a cached tile, promoting disk hits into memory.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            if self.disk_dir:
+                if not self._disk_loaded:
+                    self._load_disk_index()
+                if key in self._disk:
+                    path = self._path(key)
+                    try:
+                        with open(path, "rb") as f:
+                            data = f.read()
+                        os.utime(path)
+                    except OSError:
+                        self._disk_bytes -= self._disk.pop(key)
+                        data = None
+                    if data is not None:
+                        self._disk.move_to_end(key)
+                        self._memory_put(key, data)
+                        self.hits += 1
+                        return data
+            self.misses += 1
+            return None
+
+    def set(self, key: TileKey, data: bytes) -> None:
+        """
+        Store a tile in both levels, evicting least recently used entries.
+        """
+        with self._lock:
+            self._memory_put(key, data)
+            if not self.disk_dir or len(data) > self.disk_max_bytes:
+                return
+            if not self._disk_loaded:
+                self._load_disk_index()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.disk_max_bytes:
+                evicted_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._path(evicted_key))
+                except OSError:
+                    pass
+
+    def invalidate_layer(self, layer_id: int) -> None:
+        """
+        Drop every cached tile of a layer (all versions), to free space once its
+        data changed or it was deleted.
+        """
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == layer_id]:
+                self._memory_bytes -= len(self._memory.pop(key))
+            for key in [k for k in self._disk if k[0] == layer_id]:
+                self._disk_bytes -= self._disk.pop(key)
+            if self.disk_dir:
+                shutil.rmtree(os.path.join(self.disk_dir, str(layer_id)), ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self._disk_bytes = 0
+            if self.disk_dir:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+
+settings = get_settings()
+
+tile_cache = TileCache(
+    memory_max_bytes=settings.TILE_CACHE_MEMORY_MAX_BYTES,
+    disk_dir=settings.TILE_CACHE_DIR,
+    disk_max_bytes=settings.TILE_CACHE_DISK_MAX_BYTES,
+    encoding=settings.TILE_CACHE_ENCODING,
+)
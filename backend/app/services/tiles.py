@@ -0,0 +1,125 @@
+from typing import Set, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.layer_tables import get_data_table
+from app.models.layer import Layer
+from app.services.geometry import GeometryError
+from app.services.mvt import (
+    TileLayerEncoder,
+    TileTransform,
+    encode_tile,
+    tile_bounds,
+    tile_bounds_lonlat,
+)
+from app.services.pyramid import feature_statement, level_for_zoom
+from app.services.wkb import decode_geometry
+
+settings = get_settings()
+
+TILE_SRIDS = (4326, 3857)
+
+
+def bbox_filter(table, bounds):
+    """
+    Build a WHERE clause selecting rows whose bbox overlaps ``bounds``.
+    """
+    minx, miny, maxx, maxy = bounds
+    return (
+        (table.c.maxx >= minx)
+        & (table.c.minx <= maxx)
+        & (table.c.maxy >= miny)
+        & (table.c.miny <= maxy)
+    )
+
+
+class _TileBuilder:
+    """
+    Accumulates rows into a tile layer: decodes, thins points and clips
+    features a partition at a time, up to ``max_features`` features.
+    """
+
+    def __init__(self, layer: Layer, z: int, x: int, y: int, srid: int):
+        self.transform = TileTransform(z, x, y, srid=srid, extent=settings.TILE_EXTENT)
+        self.encoder = TileLayerEncoder(layer.name, extent=settings.TILE_EXTENT)
+        self.max_features = settings.TILE_MAX_FEATURES
+        self.added = 0
+        # Tile units per thinning cell, or None when points are all kept
+        thin = settings.TILE_POINT_GRID and z <= settings.TILE_POINT_THIN_MAX_ZOOM
+        self.cell = settings.TILE_EXTENT / settings.TILE_POINT_GRID if thin else None
+        self.occupied: Set[Tuple[int, int]] = set()
+
+    @property
+    def full(self) -> bool:
+        return self.added >= self.max_features
+
+    def _thinned(self, geometry) -> bool:
+        if self.cell is None or geometry.get("type") != "Point":
+            return False
+        px, py = self.transform(geometry["coordinates"])
+        key = (int(px // self.cell), int(py // self.cell))
+        if key in self.occupied:
+            return True
+        self.occupied.add(key)
+        return False
+
+    def add_rows(self, rows) -> None:
+        for feature_id, geom, properties in rows:
+            if self.full:
+                return
+            if not geom:
+                continue
+            try:
+                geometry = decode_geometry(geom)
+            except GeometryError:
+                continue
+            if self._thinned(geometry):
+                continue
+            if self.encoder.add_feature(geometry, self.transform, properties, feature_id, buffer=settings.TILE_BUFFER):
+                self.added += 1
+
+    def encode(self) -> bytes:
+        return encode_tile([self.encoder])
+
+
+async def render_tile(session: AsyncSession, layer: Layer, z: int, x: int, y: int) -> bytes:
+    """
+    Generate the MVT tile (z, x, y) for a layer from its data table.
+
+    Rows are streamed from a server-side cursor and decoded, clipped and
+    encoded in a worker thread a partition at a time, so a dense tile does not
+    hold the event loop. Low-zoom tiles keep one point per grid cell and a
+    tile holds at most TILE_MAX_FEATURES features (see the tile settings).
+    """
+    srid = layer.srid or 4326
+    if srid not in TILE_SRIDS:
+        raise ValueError(f"Tiles are not available for layers stored in EPSG:{srid}")
+
+    buffer_ratio = settings.TILE_BUFFER / settings.TILE_EXTENT
+    if srid == 3857:
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        pad = (maxx - minx) * buffer_ratio
+        bounds = (minx - pad, miny - pad, maxx + pad, maxy + pad)
+    else:
+        bounds = tile_bounds_lonlat(z, x, y, buffer_ratio)
+
+    # Lines and polygons come from the pyramid level simplified for this zoom
+    table = get_data_table(layer.data_table)
+    statement = (
+        feature_statement(layer, level_for_zoom(layer, z))
+        .where(bbox_filter(table, bounds))
+        .order_by(table.c.id)
+    )
+    chunk_size = settings.TILE_RENDER_CHUNK_SIZE
+    builder = _TileBuilder(layer, z, x, y, srid)
+    result = await session.stream(statement, execution_options={"yield_per": chunk_size})
+    try:
+        async for rows in result.partitions(chunk_size):
+            await run_in_threadpool(builder.add_rows, rows)
+            if builder.full:
+                break
+    finally:
+        await result.close()
+    return await run_in_threadpool(builder.encode)
@@ -0,0 +1,356 @@
+import struct
+from typing import Any, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.geometry import Geometry, GeometryError, iter_positions
+
+settings = get_settings()
+
+# Stored geometries are either ISO WKB, or TWKB prefixed with TWKB_MAGIC. WKB
+# always starts with a byte order marker (0 or 1), so the prefix is enough to
+# tell the two apart when reading.
+TWKB_MAGIC = b"T"
+
+_WKB_CODES = {
+    "Point": 1,
+    "LineString": 2,
+    "Polygon": 3,
+    "MultiPoint": 4,
+    "MultiLineString": 5,
+    "MultiPolygon": 6,
+    "GeometryCollection": 7,
+}
+_WKB_TYPES = {code: name for name, code in _WKB_CODES.items()}
+
+_EWKB_Z = 0x80000000
+_EWKB_M = 0x40000000
+_EWKB_SRID = 0x20000000
+
+
+# --- WKB --------------------------------------------------------------------
+
+def _dimensions(geometry: Geometry) -> int:
+    for position in iter_positions(geometry):
+        return 3 if len(position) > 2 else 2
+    return 2
+
+
+def _write_wkb(geometry: Geometry, dims: int, out: List[bytes]) -> None:
+    geom_type = geometry["type"]
+    code = _WKB_CODES.get(geom_type)
+    if code is None:
+        raise GeometryError(f"Unsupported geometry type: {geom_type}")
+    if dims == 3:
+        code += 1000
+    out.append(struct.pack("<BI", 1, code))
+    position_format = "<" + "d" * dims
+
+    def position(p):
+        if dims == 3:
+            return struct.pack(position_format, p[0], p[1], p[2] if len(p) > 2 else 0.0)
+        return struct.pack(position_format, p[0], p[1])
+
+    def sequence(points):
+        out.append(struct.pack("<I", len(points)))
+        out.extend(position(p) for p in points)
+
+    coordinates = geometry.get("coordinates")
+    if geom_type == "GeometryCollection":
+        members = geometry.get("geometries") or []
+        out.append(struct.pack("<I", len(members)))
+        for member in members:
+            _write_wkb(member, dims, out)
+    elif geom_type == "Point":
+        if coordinates:
+            out.append(position(coordinates))
+        else:
+            # Empty points are encoded as NaN coordinates
+            out.append(struct.pack(position_format, *([float("nan")] * dims)))
+    elif geom_type == "LineString":
+        sequence(coordinates or [])
+    elif geom_type == "Polygon":
+        rings = coordinates or []
+        out.append(struct.pack("<I", len(rings)))
+        for ring in rings:
+            sequence(ring)
+    else:
+        member_type = geom_type[5:]
+        members = coordinates or []
+        out.append(struct.pack("<I", len(members)))
+        for member in members:
+            _write_wkb({"type": member_type, "coordinates": member}, dims, out)
+
+
+def to_wkb(geometry: Geometry) -> bytes:
+    """
+    Encode a geometry as little-endian ISO WKB (2D, or 3D when it has Z values).
+    """
+    out: List[bytes] = []
+    _write_wkb(geometry, _dimensions(geometry), out)
+    return b"".join(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def unpack(self, fmt: str) -> Tuple[Any, ...]:
+        try:
+            values = struct.unpack_from(fmt, self.data, self.pos)
+        except struct.error:
+            raise GeometryError("Truncated WKB")
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def varint(self) -> int:
+        result = shift = 0
+        data = self.data
+        while True:
+            if self.pos >= len(data):
+                raise GeometryError("Truncated TWKB")
+            byte = data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return result
+
+    def svarint(self) -> int:
+        value = self.varint()
+        return (value >> 1) ^ -(value & 1)
+
+
+def _read_wkb(reader: _Reader) -> Geometry:
+    (byte_order,) = reader.unpack("B")
+    if byte_order not in (0, 1):
+        raise GeometryError("Invalid WKB byte order")
+    endian = "<" if byte_order == 1 else ">"
+    (code,) = reader.unpack(endian + "I")
+
+    has_z = bool(code & _EWKB_Z)
+    has_m = bool(code & _EWKB_M)
+    if code & _EWKB_SRID:
+        reader.unpack(endian + "I")
+    code &= 0x0FFFFFFF
+    if code >= 3000:
+        has_z = has_m = True
+    elif code >= 2000:
+        has_m = True
+    elif code >= 1000:
+        has_z = True
+    base = code % 1000
+    geom_type = _WKB_TYPES.get(base)
+    if geom_type is None:
+        raise GeometryError(f"Unsupported WKB geometry code: {code}")
+
+    dims = 2 + has_z + has_m
+    position_format = endian + "d" * dims
+
+    def position():
+        values = reader.unpack(position_format)
+        # M values are dropped; Z is kept
+        return list(values[:3]) if has_z else list(values[:2])
+
+    def sequence():
+        (count,) = reader.unpack(endian + "I")
+        return [position() for _ in range(count)]
+
+    if geom_type == "Point":
+        coordinates = position()
+        if coordinates[0] != coordinates[0]:  # NaN: empty point
+            coordinates = []
+        return {"type": "Point", "coordinates": coordinates}
+    if geom_type == "LineString":
+        return {"type": geom_type, "coordinates": sequence()}
+    if geom_type == "Polygon":
+        (count,) = reader.unpack(endian + "I")
+        return {"type": geom_type, "coordinates": [sequence() for _ in range(count)]}
+
+    (count,) = reader.unpack(endian + "I")
+    members = [_read_wkb(reader) for _ in range(count)]
+    if geom_type == "GeometryCollection":
+        return {"type": geom_type, "geometries": members}
+    return {"type": geom_type, "coordinates": [m["coordinates"] for m in members]}
+
+
+def parse_wkb(data: bytes) -> Geometry:
+    """
+    Decode WKB, ISO WKB (Z/M) or PostGIS EWKB into a geometry dict.
+    """
+    return _read_wkb(_Reader(bytes(data)))
+
+
+# --- TWKB -------------------------------------------------------------------
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _varint(value: int, out: bytearray) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _TWKBWriter:
+    def __init__(self, precision: int):
+        self.scale = 10 ** precision
+        self.header = (_zigzag(precision) & 0x0F) << 4
+        self.out = bytearray()
+
+    def geometry(self, geometry: Geometry) -> None:
+        geom_type = geometry["type"]
+        out = self.out
+        out.append(self.header | _WKB_CODES[geom_type])
+        coordinates = geometry.get("coordinates")
+        if geom_type == "GeometryCollection":
+            members = geometry.get("geometries") or []
+            out.append(0x10 if not members else 0x00)
+            if members:
+                _varint(len(members), out)
+                for member in members:
+                    self.geometry(member)
+            return
+        if not coordinates:
+            out.append(0x10)  # empty
+            return
+        out.append(0x00)
+
+        self.last = [0, 0]
+        if geom_type == "Point":
+            self.positions([coordinates], with_count=False)
+        elif geom_type == "LineString":
+            self.positions(coordinates)
+        elif geom_type == "MultiPoint":
+            _varint(len(coordinates), out)
+            self.positions(coordinates, with_count=False)
+        elif geom_type in ("Polygon", "MultiLineString"):
+            _varint(len(coordinates), out)
+            for part in coordinates:
+                self.positions(part)
+        else:
+            _varint(len(coordinates), out)
+            for polygon in coordinates:
+                _varint(len(polygon), out)
+                for ring in polygon:
+                    self.positions(ring)
+
+    def positions(self, points, with_count: bool = True) -> None:
+        out = self.out
+        if with_count:
+            _varint(len(points), out)
+        scale = self.scale
+        last = self.last
+        for p in points:
+            for axis in (0, 1):
+                value = int(round(p[axis] * scale))
+                _varint(_zigzag(value - last[axis]), out)
+                last[axis] = value
+
+
+def to_twkb(geometry: Geometry, precision: int = 7) -> bytes:
+    """
+    Encode a 2D geometry as TWKB, rounding coordinates to ``precision`` decimals.
+    """
+    if not -8 <= precision <= 7:
+        raise GeometryError("TWKB precision must be between -8 and 7")
+    writer = _TWKBWriter(precision)
+    writer.geometry(geometry)
+    return bytes(writer.out)
+
+
+def _read_twkb(reader: _Reader) -> Geometry:
+    data = reader.data
+    if reader.pos + 2 > len(data):
+        raise GeometryError("Truncated TWKB")
+    header = data[reader.pos]
+    metadata = data[reader.pos + 1]
+    reader.pos += 2
+    geom_type = _WKB_TYPES.get(header & 0x0F)
+    if geom_type is None:
+        raise GeometryError("Unsupported TWKB geometry type")
+    zigzag_precision = header >> 4
+    precision = (zigzag_precision >> 1) ^ -(zigzag_precision & 1)
+    scale = 10.0 ** precision
+
+    if metadata & 0x08:
+        raise GeometryError("TWKB with extended dimensions is not supported")
+    if metadata & 0x10:
+        if geom_type == "GeometryCollection":
+            return {"type": geom_type, "geometries": []}
+        return {"type": geom_type, "coordinates": []}
+    if metadata & 0x01:
+        # Skip the bounding box: min/delta pairs for x and y
+        for _ in range(4):
+            reader.varint()
+    if metadata & 0x02:
+        reader.varint()
+
+    if geom_type == "GeometryCollection":
+        count = reader.varint()
+        if metadata & 0x04:
+            for _ in range(count):
+                reader.varint()
+        return {"type": geom_type, "geometries": [_read_twkb(reader) for _ in range(count)]}
+
+    last = [0, 0]
+
+    def positions(count):
+        points = []
+        for _ in range(count):
+            last[0] += reader.svarint()
+            last[1] += reader.svarint()
+            points.append([last[0] / scale, last[1] / scale])
+        return points
+
+    if geom_type == "Point":
+        return {"type": geom_type, "coordinates": positions(1)[0]}
+    if geom_type == "LineString":
+        return {"type": geom_type, "coordinates": positions(reader.varint())}
+    if geom_type == "Polygon":
+        return {"type": geom_type, "coordinates": [positions(reader.varint()) for _ in range(reader.varint())]}
+
+    count = reader.varint()
+    if metadata & 0x04:
+        for _ in range(count):
+            reader.varint()
+    if geom_type == "MultiPoint":
+        return {"type": geom_type, "coordinates": positions(count)}
+    if geom_type == "MultiLineString":
+        return {"type": geom_type, "coordinates": [positions(reader.varint()) for _ in range(count)]}
+    polygons = []
+    for _ in range(count):
+        polygons.append([positions(reader.varint()) for _ in range(reader.varint())])
+    return {"type": geom_type, "coordinates": polygons}
+
+
+def parse_twkb(data: bytes) -> Geometry:
+    """
+    Decode a 2D TWKB geometry.
+    """
+    return _read_twkb(_Reader(bytes(data)))
+
+
+# --- Storage ----------------------------------------------------------------
+
+def encode_geometry(geometry: Geometry, encoding: Optional[str] = None) -> bytes:
+    """
+    Encode a geometry for storage using GEOMETRY_ENCODING ("wkb" or "twkb").
+
+    TWKB is only used for 2D geometries; anything with Z values is stored as WKB.
+    """
+    encoding = encoding or settings.GEOMETRY_ENCODING
+    if encoding == "twkb" and _dimensions(geometry) == 2:
+        return TWKB_MAGIC + to_twkb(geometry, settings.TWKB_PRECISION)
+    return to_wkb(geometry)
+
+
+def decode_geometry(data: bytes) -> Geometry:
+    """
+    Decode a stored geometry, whichever encoding it was written with.
+    """
+    if data[:1] == TWKB_MAGIC:
+        return _read_twkb(_Reader(bytes(data), 1))
+    return parse_wkb(data)
@@ -0,0 +1,82 @@
+"""
+Measure how long the app takes to come up, in fresh interpreters.
+
+Each run starts a new Python process and times importing app.main, building an
+extra app with create_app() and, with --lifespan, running the lifespan startup
+(schema check, pool warm-up, replica checks) against DATABASE_URL.
+
+Usage:
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 5 --lifespan --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+main.create_app()
+created = time.perf_counter()
+result = {"import": imported - started, "create_app": created - imported}
+if LIFESPAN:
+    async def run_lifespan():
+        began = time.perf_counter()
+        async with main.lifespan(main.app):
+            result["lifespan_startup"] = time.perf_counter() - began
+    asyncio.run(run_lifespan())
+print(json.dumps(result))
+"""
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(lifespan: bool) -> Dict[str, float]:
+    code = _PROBE.replace("LIFESPAN", "True" if lifespan else "False")
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for phase in samples[0]:
+        values = sorted(sample[phase] * 1000 for sample in samples)
+        summary[phase] = {
+            "min_ms": round(values[0], 2),
+            "median_ms": round(statistics.median(values), 2),
+            "max_ms": round(values[-1], 2),
+        }
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--lifespan", action="store_true", help="Also time the lifespan startup (needs a database)")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    samples = [run_once(args.lifespan) for _ in range(args.runs)]
+    results = {"benchmark": "startup", "runs": args.runs, "phases": summarize(samples)}
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
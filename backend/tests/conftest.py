@@ -12,6 +12,13 @@ if sys.platform.startswith("win"):
 
 # Import models to ensure they are registered in SQLModel.metadata
 from app.models.user import User
+from app.models.company import Company
+from app.models.user_company import UserCompany
+from app.models.project import Project
+from app.models.layer import Layer
+from app.models.export import LayerExport
+from app.models.job import Job
+from app.models.example_model import ExampleModel
 
 # Use SQLite in-memory database for testing (Async)
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -45,8 +52,65 @@ async def test_session(test_engine, setup_database):
     """
     Provides an asynchronous transactional session for each test.
     """
+    from app.core.user_cache import user_cache
+    # Ids restart with every test database, so cached users must not carry over
+    user_cache.clear()
     async_session = sessionmaker(
         test_engine, class_=AsyncSession, expire_on_commit=False
     )
     async with async_session() as session:
         yield session
+
+@pytest_asyncio.fixture(scope="function")
+async def make_layer(test_session):
+    """
+    Factory creating a project, a layer and its populated data table for a user.
+    Features are given as (wkt, properties) pairs.
+    """
+    from app.db.layer_tables import get_data_table
+    from app.services.geometry import parse_wkt
+    from app.services.layer_data import create_data_table, drop_data_table, feature_row
+
+    created = []
+
+    async def _make_layer(owner, features=(), name="test_layer", srid=4326, geometry_type=None):
+        project = Project(name=f"{name} project", owner_id=owner.id)
+        test_session.add(project)
+        await test_session.commit()
+        await test_session.refresh(project)
+
+        data_table = f"test_layer_data_{len(created) + 1}"
+        layer = Layer(
+            project_id=project.id,
+            name=name,
+            data_table=data_table,
+            srid=srid,
+            geometry_type=geometry_type,
+        )
+        test_session.add(layer)
+
+        conn = await test_session.connection()
+        await create_data_table(conn, data_table)
+        created.append(data_table)
+        rows = [feature_row(parse_wkt(wkt) if wkt else None, properties) for wkt, properties in features]
+        if rows:
+            await conn.execute(get_data_table(data_table).insert(), rows)
+        await test_session.commit()
+        await test_session.refresh(layer)
+        return layer
+
+    yield _make_layer
+
+    from app.services.clusters import cluster_indexes
+    from app.services.spatial_index import spatial_indexes
+    from app.services.tile_cache import tile_cache
+    for data_table in created:
+        spatial_indexes.invalidate(data_table)
+        cluster_indexes.invalidate(data_table)
+    tile_cache.clear()
+
+    await test_session.rollback()
+    conn = await test_session.connection()
+    for data_table in created:
+        await drop_data_table(conn, data_table)
+    await test_session.commit()
@@ -0,0 +1,62 @@
+"""
+A local stand-in OpenID Connect provider for tests.
+
+It serves a discovery document and a JWKS through an httpx MockTransport and
+signs ID tokens with its own RSA key, so OAuth code can be exercised without
+network access. ``requests`` records every path that was fetched.
+"""
+import time
+from typing import Any, Dict, List
+
+import httpx
+from joserfc import jwt
+from joserfc.jwk import RSAKey
+
+
+class LocalOIDCProvider:
+    def __init__(self, issuer: str = "https://oidc.test", kid: str = "stand-in-key"):
+        self.issuer = issuer
+        self.kid = kid
+        self.key = RSAKey.generate_key(2048, parameters={"kid": kid})
+        self.requests: List[str] = []
+        self.fail = False
+        self.transport = httpx.MockTransport(self.handle)
+
+    @property
+    def discovery_url(self) -> str:
+        return f"{self.issuer}/.well-known/openid-configuration"
+
+    def discovery(self) -> Dict[str, Any]:
+        return {
+            "issuer": self.issuer,
+            "authorization_endpoint": f"{self.issuer}/authorize",
+            "token_endpoint": f"{self.issuer}/token",
+            "userinfo_endpoint": f"{self.issuer}/userinfo",
+            "jwks_uri": f"{self.issuer}/jwks",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    def jwks(self) -> Dict[str, Any]:
+        return {"keys": [self.key.as_dict(private=False)]}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if self.fail:
+            return httpx.Response(503)
+        if request.url.path == "/.well-known/openid-configuration":
+            return httpx.Response(200, json=self.discovery())
+        if request.url.path == "/jwks":
+            return httpx.Response(200, json=self.jwks())
+        return httpx.Response(404)
+
+    def id_token(self, client_id: str, nonce: str, **claims: Any) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": self.issuer,
+            "aud": client_id,
+            "iat": now,
+            "exp": now + 300,
+            "nonce": nonce,
+            **claims,
+        }
+        return jwt.encode({"alg": "RS256", "kid": self.kid}, payload, self.key)
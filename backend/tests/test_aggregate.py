@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core import jwt
+from app.db.session import get_session
+from app.main import app
+from app.models.user import User
+from app.services import aggregate
+from app.services.aggregate import AggregationError, aggregate_layer, bin_rows, hex_cells, merge_stats, square_cells
+
+
+def test_points_fall_in_the_nearest_hexagon():
+    rng = np.random.default_rng(5)
+    x, y = rng.uniform(-50, 50, 5000), rng.uniform(-50, 50, 5000)
+    size = 3.0
+    cells = hex_cells(x, y, size)
+    cx = size * math.sqrt(3) * (cells[:, 0] + cells[:, 1] / 2)
+    cy = size * 1.5 * cells[:, 1]
+    distance = np.hypot(x - cx, y - cy)
+    assert distance.max() <= size
+    # No neighbouring centre is closer
+    for dq, dr in ((1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)):
+        nx = size * math.sqrt(3) * (cells[:, 0] + dq + (cells[:, 1] + dr) / 2)
+        ny = size * 1.5 * (cells[:, 1] + dr)
+        assert (np.hypot(x - nx, y - ny) >= distance - 1e-9).all()
+
+    assert square_cells(np.array([0.5, -0.5, 9.99]), np.array([0.5, 0.5, 10.0]), 10).tolist() == [[0, 0], [-1, 0], [0, 1]]
+
+
+def test_batches_merge_into_the_same_cells():
+    rows = [(i % 7, i % 5, i % 7, i % 5, float(i) if i % 3 else "n/a") for i in range(200)]
+    whole = bin_rows(rows, "square", 2.0)
+    merged = merge_stats([bin_rows(rows[start:start + 30], "square", 2.0) for start in range(0, len(rows), 30)])
+    assert merged.cells.tolist() == whole.cells.tolist()
+    for name in ("count", "values", "total", "minimum", "maximum"):
+        assert getattr(merged, name).tolist() == getattr(whole, name).tolist()
+    assert whole.count.sum() == 200
+    assert whole.values.sum() == len([i for i in range(200) if i % 3])
+
+
+@pytest.mark.asyncio
+async def test_aggregate_endpoint(test_session, make_layer):
+    """
+    Test that the endpoint returns per-cell statistics of a numeric property.
+    """
+    owner = User(email="aggregate@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    features = [
+        ("POINT (1 1)", {"value": 10}),
+        ("POINT (2 3)", {"value": 30}),
+        ("POINT (3 2)", {"value": "unknown"}),
+        ("POINT (15 5)", {"value": 7.5}),
+        ("LINESTRING (14 14, 16 16)", {}),
+    ]
+    layer = await make_layer(owner, features=features)
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    url = f"/api/v1/layers/{layer.id}/aggregate"
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(url, params={"shape": "square", "size": 10, "attribute": "value"}, headers=headers)
+        assert response.status_code == 200
+        cells = {f["id"]: f for f in response.json()["features"]}
+        assert set(cells) == {"0:0", "1:0", "1:1"}
+        assert cells["0:0"]["properties"] == {"count": 3, "sum": 40.0, "mean": 20.0, "min": 10.0, "max": 30.0}
+        assert cells["0:0"]["geometry"]["coordinates"] == [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]
+        assert cells["1:1"]["properties"] == {"count": 1, "sum": None, "mean": None, "min": None, "max": None}
+
+        response = await ac.get(url, params={"size": 2, "bbox": "0,0,5,5"}, headers=headers)
+        features = response.json()["features"]
+        assert sum(f["properties"]["count"] for f in features) == 3
+        assert set(features[0]["properties"]) == {"count"}
+        assert len(features[0]["geometry"]["coordinates"][0]) == 7
+
+        response = await ac.get(url, params={"shape": "triangle", "size": 1}, headers=headers)
+        assert response.status_code == 400
+        response = await ac.get(url, params={"size": 0}, headers=headers)
+        assert response.status_code == 422
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_aggregate_layer_merges_batches(test_session, make_layer, monkeypatch):
+    """
+    Test that batches merged a few at a time give the per-cell totals, and
+    that too many cells are refused.
+    """
+    owner = User(email="aggregate-merge@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner, features=[(f"POINT ({i % 3 * 10 + 1} {i % 5})", {"value": i}) for i in range(20)])
+    monkeypatch.setattr(aggregate.settings, "AGGREGATE_MAX_CELLS", 4)
+
+    stats = await aggregate_layer(test_session, layer, "square", 10, attribute="value", chunk_size=3)
+    assert stats.cells.tolist() == [[0, 0], [1, 0], [2, 0]]
+    assert stats.count.tolist() == [7, 7, 6]
+    assert stats.total.tolist() == [sum(range(0, 20, 3)), sum(range(1, 20, 3)), sum(range(2, 20, 3))]
+
+    with pytest.raises(AggregationError):
+        await aggregate_layer(test_session, layer, "square", 1, chunk_size=3)
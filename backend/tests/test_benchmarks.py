@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.endpoints import compare, percentile, run
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7.0
+
+
+@pytest.mark.asyncio
+async def test_endpoint_benchmark_runs_against_sqlite():
+    results = await run(["me", "tiles", "features"], requests=6, concurrency=3, features=50)
+    assert results["database"] == "sqlite"
+    for name in ("me", "tiles", "features"):
+        scenario = results["scenarios"][name]
+        assert scenario["requests"] == 6
+        assert scenario["errors"] == 0
+        assert scenario["p50_ms"] <= scenario["p99_ms"] <= scenario["max_ms"]
+
+    (line,) = compare({"scenarios": {"me": {**results["scenarios"]["me"], "throughput_rps": 1.0}}}, results)
+    assert line.startswith("me ")
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core import jwt
+from app.db.session import get_session
+from app.main import app
+from app.models.user import User
+from app.services.clusters import ClusterIndex, cluster_indexes
+
+
+def test_zooms_merge_cells_hierarchically():
+    rng = np.random.default_rng(3)
+    x = np.r_[rng.normal(2.35, 0.01, 500), rng.normal(13.4, 0.01, 300), [-70.0]]
+    y = np.r_[rng.normal(48.85, 0.01, 500), rng.normal(52.5, 0.01, 300), [-33.0]]
+    index = ClusterIndex(np.arange(len(x)), x, y, srid=4326, max_zoom=12, cell_pixels=60)
+
+    world = index.query(0)
+    assert sum(c["count"] for c in world) == 801
+    for coarse, fine in zip(index.zooms, index.zooms[1:]):
+        assert len(coarse) <= len(fine)
+        assert coarse.count.sum() == fine.count.sum() == 801
+
+    # At zoom 4 the two cities and the single point are apart
+    clusters = sorted(index.query(4), key=lambda c: -c["count"])
+    assert [c["count"] for c in clusters] == [500, 300, 1]
+    assert clusters[0]["centroid"] == pytest.approx([x[:500].mean(), y[:500].mean()])
+    assert clusters[0]["bbox"] == pytest.approx([x[:500].min(), y[:500].min(), x[:500].max(), y[:500].max()])
+    assert clusters[0]["feature_id"] is None
+    assert clusters[2]["feature_id"] == 800
+
+    paris = index.query(4, bbox=(0, 45, 5, 50))
+    assert [c["count"] for c in paris] == [500]
+    # Deeper zooms than were precomputed use the finest level
+    assert len(index.query(20)) == len(index.query(12)) > 3
+
+
+def test_empty_layer():
+    index = ClusterIndex(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), srid=3857, max_zoom=4, cell_pixels=60)
+    assert index.query(2) == []
+
+
+@pytest.mark.asyncio
+async def test_clusters_endpoint(test_session, make_layer):
+    """
+    Test that the endpoint returns cluster centroids, rejects non-point layers,
+    and serves later requests from the cached index.
+    """
+    owner = User(email="clusters@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    points = [(f"POINT ({10 + i * 0.001} {45 + i * 0.001})", {"i": i}) for i in range(20)] + [("POINT (-40 -20)", {"i": 20})]
+    layer = await make_layer(owner, features=points, geometry_type="POINT")
+    lines = await make_layer(owner, features=[("LINESTRING (0 0, 1 1)", {})], name="lines", geometry_type="LINESTRING")
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/layers/{layer.id}/clusters", params={"z": 3}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/geo+json")
+        features = sorted(response.json()["features"], key=lambda f: -f["properties"]["count"])
+        assert [f["properties"]["count"] for f in features] == [20, 1]
+        assert features[0]["geometry"]["coordinates"] == pytest.approx([10.0095, 45.0095])
+        assert features[0]["bbox"] == pytest.approx([10, 45, 10.019, 45.019])
+        assert "id" not in features[0] and features[1]["id"] is not None
+
+        index = cluster_indexes.get(layer.data_table, layer.version)
+        assert index is not None and index.size == 21
+
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/clusters", params={"z": 3, "bbox": "0,40,20,50"}, headers=headers
+        )
+        assert [f["properties"]["count"] for f in response.json()["features"]] == [20]
+        assert cluster_indexes.get(layer.data_table, layer.version) is index
+
+        response = await ac.get(f"/api/v1/layers/{lines.id}/clusters", params={"z": 3}, headers=headers)
+        assert response.status_code == 400
+        response = await ac.get(f"/api/v1/layers/{layer.id}/clusters", params={"z": 3, "bbox": "1,2"}, headers=headers)
+        assert response.status_code == 400
+    app.dependency_overrides.clear()
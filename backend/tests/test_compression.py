@@ -0,0 +1,78 @@
+import json
+import zlib
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core import jwt
+from app.core.compression import ENCODINGS, Compressor, compress, decompress, negotiate
+from app.db.session import get_session
+from app.main import app
+from app.models.user import User
+from app.services.tile_cache import tile_cache
+
+
+def test_negotiate_encoding():
+    offered = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br", offered) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", offered) == "gzip"
+    assert negotiate("*", offered) == "zstd"
+    assert negotiate("br;q=0, *;q=0.1", ["br", "gzip"]) == "gzip"
+    assert negotiate("identity", offered) is None
+    assert negotiate(None, offered) is None
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_streamed_compression_round_trip(encoding):
+    chunks = [json.dumps({"n": i, "name": "feature " * 20}).encode() for i in range(50)]
+    compressor = Compressor(encoding)
+    parts = [compressor.compress(chunk, flush=True) for chunk in chunks]
+    # Each flushed part decodes on its own, so streamed responses stay progressive
+    assert parts[0] and all(parts)
+    body = b"".join(parts) + compressor.finish()
+    assert decompress(body, encoding) == b"".join(chunks)
+    assert len(body) < len(b"".join(chunks)) / 5
+    assert decompress(compress(b"x" * 1000, encoding, 1), encoding) == b"x" * 1000
+
+
+@pytest.mark.asyncio
+async def test_compressed_responses(test_session, make_layer, monkeypatch):
+    """
+    Test that large GeoJSON is compressed as negotiated, small bodies are not,
+    and tiles are cached and served pre-compressed.
+    """
+    monkeypatch.setattr(tile_cache, "disk_dir", None)
+    owner = User(email="compression@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    features = [(f"POINT ({i % 50} {i // 50})", {"name": f"feature {i}"}) for i in range(200)]
+    layer = await make_layer(owner, features=features)
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for encoding in ENCODINGS:
+            response = await ac.get(
+                f"/api/v1/layers/{layer.id}/features", headers={**headers, "Accept-Encoding": encoding}
+            )
+            assert response.headers["content-encoding"] == encoding
+            assert "Accept-Encoding" in response.headers["vary"]
+            assert len(response.json()["features"]) == 200
+
+        response = await ac.get(f"/api/v1/layers/{layer.id}", headers={**headers, "Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/features", headers={**headers, "Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+
+        url = f"/api/v1/layers/{layer.id}/tiles/1/1/0.mvt"
+        response = await ac.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        cached = tile_cache.get((layer.id, layer.version, 1, 1, 0))
+        assert zlib.decompress(cached, 47) == response.content
+        response = await ac.get(url, headers={**headers, "Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.content == zlib.decompress(cached, 47)
+    app.dependency_overrides.clear()
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db.engine import warm_pool
+from app.db.pool import InstrumentedPool, install_idle_pre_ping, pool_stats
+
+
+def _engine(**kwargs):
+    return create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedPool, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_warm_pool_and_stats():
+    """
+    Test that warming opens pooled connections and that waits are measured.
+    """
+    engine = _engine(pool_size=2, max_overflow=0, pool_timeout=5)
+    try:
+        await warm_pool(engine, 5)
+        stats = pool_stats(engine.pool)
+        assert stats["checked_in"] == 2
+        assert stats["checked_out"] == 0
+
+        first = await engine.connect()
+        second = await engine.connect()
+        assert pool_stats(engine.pool)["checked_out"] == 2
+
+        async def release_later():
+            await asyncio.sleep(0.05)
+            await first.close()
+
+        release = asyncio.create_task(release_later())
+        third = await engine.connect()  # waits for the release
+        await release
+        stats = pool_stats(engine.pool)
+        assert stats["wait_seconds_max"] >= 0.04
+        assert stats["checkouts"] >= 5
+        await second.close()
+        await third.close()
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_idle_pre_ping():
+    """
+    Test that only connections idle for long enough are pinged on checkout.
+    """
+    engine = _engine(pool_size=1, max_overflow=0)
+    install_idle_pre_ping(engine.sync_engine, idle_seconds=0.05)
+    try:
+        for _ in range(3):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        assert engine.pool.pings == 0
+
+        await asyncio.sleep(0.06)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        assert engine.pool.pings == 1
+        assert engine.pool.ping_failures == 0
+    finally:
+        await engine.dispose()
@@ -0,0 +1,164 @@
+import json
+import struct
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import jwt
+from app.core.config import get_settings
+from app.db.session import get_session
+from app.main import app
+from app.models.export import LayerExport
+from app.models.user import User
+from app.services.exports import run_export
+from app.services.flatgeobuf import MAGIC, _level_bounds, hilbert, hilbert_order, packed_rtree
+from app.services.jobs import JobDispatcher, JobOwnershipLost
+from app.services.wkb import parse_wkb
+
+settings = get_settings()
+
+
+def test_hilbert_curve_visits_neighbours():
+    # On a 2x2 corner of the grid the curve goes through all four cells in turn
+    x = np.array([0, 0, 1, 1])
+    y = np.array([0, 1, 1, 0])
+    assert sorted(hilbert(x, y).tolist()) == [0, 1, 2, 3]
+    boxes = np.array([[10, 10, 10, 10], [0, 0, 0, 0], [np.nan] * 4, [0, 10, 0, 10]])
+    assert hilbert_order(boxes).tolist()[-1] == 2
+
+
+def test_packed_rtree_layout():
+    assert _level_bounds(40, 16) == [(4, 44), (1, 4), (0, 1)]
+    assert _level_bounds(1, 16) == [(1, 2), (0, 1)]
+
+    boxes = np.array([[i, i, i + 1, i + 1] for i in range(40)], dtype=np.float64)
+    nodes = np.frombuffer(packed_rtree(boxes, np.arange(40, dtype=np.uint64) * 100), dtype="<f8,<f8,<f8,<f8,<u8")
+    assert len(nodes) == 44
+    assert tuple(nodes[0])[:4] == (0, 0, 40, 40)
+    # Parents point at their first child; leaves hold feature offsets
+    assert [node[4] for node in nodes[1:4]] == [4, 20, 36]
+    assert tuple(nodes[2])[:4] == (16, 16, 32, 32)
+    assert nodes[43][4] == 3900
+
+
+async def _run_export(ac, headers, layer, export_format, dispatcher):
+    response = await ac.post(f"/api/v1/layers/{layer.id}/exports", params={"format": export_format}, headers=headers)
+    assert response.status_code == 202
+    assert await dispatcher.drain() == 1
+    export = (await ac.get(f"/api/v1/layers/{layer.id}/exports/{response.json()['id']}", headers=headers)).json()
+    assert export["status"] == "completed", export
+    return export
+
+
+@pytest.mark.asyncio
+async def test_export_and_ranged_download(test_engine, test_session, make_layer, monkeypatch, tmp_path):
+    """
+    Test that exports write readable GeoParquet and FlatGeobuf files and that
+    downloads honour Range requests.
+    """
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 4)
+    dispatcher = JobDispatcher(session_factory=sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+    owner = User(email="exports@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    features = [
+        (f"POINT ({i % 5} {i // 5})", {"name": f"p{i}", "value": i if i % 2 else i + 0.5, "tags": ["a"] if i == 3 else None})
+        for i in range(10)
+    ]
+    layer = await make_layer(owner, features=features, name="Export me", geometry_type="POINT")
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        export = await _run_export(ac, headers, layer, "parquet", dispatcher)
+        assert export["features"] == 10
+        url = f"/api/v1/layers/{layer.id}/exports/{export['id']}/download"
+        response = await ac.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].endswith('"Export_me.parquet"')
+        assert len(response.content) == export["size_bytes"]
+
+        path = tmp_path / "export.parquet"
+        path.write_bytes(response.content)
+        parquet = pq.ParquetFile(path)
+        assert parquet.metadata.num_row_groups == 3
+        geo = json.loads(parquet.schema_arrow.metadata[b"geo"])
+        assert geo["columns"]["geometry"]["geometry_types"] == ["Point"]
+        assert geo["columns"]["geometry"]["bbox"] == [0, 0, 4, 1]
+        rows = parquet.read().to_pylist()
+        assert sorted(row["name"] for row in rows) == [f"p{i}" for i in range(10)]
+        row = next(row for row in rows if row["name"] == "p3")
+        assert parse_wkb(row["geometry"]) == {"type": "Point", "coordinates": [3.0, 0.0]}
+        assert row["bbox"] == {"xmin": 3.0, "ymin": 0.0, "xmax": 3.0, "ymax": 0.0}
+        assert row["value"] == 3.0 and row["tags"] == '["a"]'
+
+        response = await ac.get(url, headers={**headers, "Range": "bytes=0-3"})
+        assert response.status_code == 206
+        assert response.content == b"PAR1"
+        assert response.headers["content-range"] == f"bytes 0-3/{export['size_bytes']}"
+
+        export = await _run_export(ac, headers, layer, "fgb", dispatcher)
+        url = f"/api/v1/layers/{layer.id}/exports/{export['id']}/download"
+        # FlatGeobuf is stored pre-compressed too; ranges come from the plain file
+        assert sorted(p.name for p in tmp_path.glob(f"*_{export['id']}.fgb*")) == [
+            f"layer_{layer.id}_export_{export['id']}.fgb" + suffix for suffix in ("", ".br", ".gz", ".zst")
+        ]
+        response = await ac.get(url, headers={**headers, "Accept-Encoding": "br"})
+        assert response.headers["content-encoding"] == "br"
+        assert "accept-ranges" not in response.headers
+        response = await ac.get(url, headers={**headers, "Range": "bytes=0-7"})
+        assert response.status_code == 206
+        assert response.content == MAGIC
+        response = await ac.get(url, headers={**headers, "Accept-Encoding": "identity"})
+        data = response.content
+        assert data[:8] == MAGIC
+        (header_size,) = struct.unpack_from("<I", data, 8)
+        index_start = 12 + header_size
+        # 10 leaves plus the root; feature offsets in the leaves point at size-prefixed features
+        nodes = np.frombuffer(data, dtype="<f8,<f8,<f8,<f8,<u8", count=11, offset=index_start)
+        features_start = index_start + 11 * 40
+        offsets = sorted(int(node[4]) for node in nodes[1:])
+        for offset, following in zip(offsets, offsets[1:] + [len(data) - features_start]):
+            (size,) = struct.unpack_from("<I", data, features_start + offset)
+            assert size + 4 == following - offset
+
+        response = await ac.post(f"/api/v1/layers/{layer.id}/exports", params={"format": "shp"}, headers=headers)
+        assert response.status_code == 400
+        response = await ac.get(f"/api/v1/layers/{layer.id}/exports/999", headers=headers)
+        assert response.status_code == 404
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_export_that_lost_its_job_leaves_no_result(test_engine, test_session, make_layer, monkeypatch, tmp_path):
+    """
+    Test that an export run whose job was taken over records nothing and
+    leaves no file behind.
+    """
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    owner = User(email="lost-export@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner, features=[("POINT (1 2)", {})], geometry_type="POINT")
+    export = LayerExport(layer_id=layer.id, format="parquet")
+    test_session.add(export)
+    await test_session.commit()
+    await test_session.refresh(export)
+
+    async def taken_over():
+        raise JobOwnershipLost("taken over")
+
+    session_factory = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    with pytest.raises(JobOwnershipLost):
+        await run_export(export.id, session_factory, ensure_owned=taken_over)
+    await test_session.refresh(export)
+    assert export.status == "running" and export.completed_at is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,190 @@
+import io
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.main import app
+from app.models.user import User
+from app.models.project import Project
+from app.models.layer import Layer
+from app.core import jwt
+from app.core.config import get_settings
+from app.db.session import get_session
+from app.db.layer_tables import get_data_table
+from app.services.ingest import IngestError, IngestResult, ingest_file, read_features
+from app.services.jobs import JobDispatcher
+from app.services.layer_data import drop_data_table
+
+settings = get_settings()
+
+
+async def _create_project(test_session, email):
+    owner = User(email=email, auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    project = Project(name="Ingest project", owner_id=owner.id)
+    test_session.add(project)
+    await test_session.commit()
+    await test_session.refresh(project)
+    token = jwt.create_access_token(data={"sub": str(owner.id)})
+    return project, {"Authorization": f"Bearer {token}"}
+
+
+async def _upload(ac, headers, project_id, dispatcher, data, file):
+    """
+    Upload a file and run the ingest job it queued; returns the finished job.
+    """
+    response = await ac.post(f"/api/v1/projects/{project_id}/layers", headers=headers, data=data, files={"file": file})
+    assert response.status_code == 202
+    assert response.json()["kind"] == "ingest"
+    assert await dispatcher.drain() == 1
+    response = await ac.get(f"/api/v1/jobs/{response.json()['id']}", headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+async def _drop_layer_tables(test_session):
+    layers = (await test_session.exec(select(Layer))).all()
+    conn = await test_session.connection()
+    for layer in layers:
+        await drop_data_table(conn, layer.data_table)
+    await test_session.commit()
+
+
+def test_geometry_type_summary():
+    assert IngestResult(geometry_types={"Point"}).geometry_type == "POINT"
+    assert IngestResult(geometry_types={"Polygon", "MultiPolygon"}).geometry_type == "MULTIPOLYGON"
+    assert IngestResult(geometry_types={"Point", "LineString"}).geometry_type == "GEOMETRY"
+    assert IngestResult().geometry_type is None
+
+
+@pytest.mark.parametrize("input_format, data, message", [
+    ("csv", 'wkt\n"SRID=abc;POINT (1 2)"', "Invalid SRID on line 2"),
+    ("csv", 'wkt\n"SRID=4326 POINT (1 2)"', "Invalid SRID on line 2"),
+    ("csv", 'wkt\n"SRID=4326;POINT (1 2)"\n"SRID=4326 POINT (3 4)"', "Invalid WKT on line 3"),
+    ("geojson", "[1, 2]", "expected an object, got list"),
+    ("geojson", '"text"', "expected an object, got str"),
+    ("geojson", '{"type": "FeatureCollection", "features": [1]}', "got int"),
+    ("ndjson", "[]", "got list"),
+])
+def test_invalid_input_raises_ingest_error(input_format, data, message):
+    with pytest.raises(IngestError, match=message):
+        list(read_features(io.BytesIO(data.encode()), input_format, IngestResult()))
+
+
+@pytest.mark.asyncio
+async def test_ingest_geojson_upload(test_engine, test_session, monkeypatch, tmp_path):
+    """
+    Test creating a layer from an uploaded GeoJSON FeatureCollection.
+    """
+    monkeypatch.setattr(settings, "JOB_UPLOAD_DIR", str(tmp_path))
+    dispatcher = JobDispatcher(session_factory=sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+    app.dependency_overrides[get_session] = lambda: test_session
+    project, headers = await _create_project(test_session, "geojson@example.com")
+
+    collection = {
+        "type": "FeatureCollection",
+        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}},
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [100, 200]}, "properties": {"n": 1}},
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [300, 400]}, "properties": {"n": 2}},
+        ],
+    }
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        job = await _upload(
+            ac, headers, project.id, dispatcher,
+            {"name": "points"}, ("points.geojson", json.dumps(collection), "application/geo+json"),
+        )
+        assert job["status"] == "completed", job
+        assert job["result"]["features"] == 2
+        assert job["progress_done"] == 2
+        assert list(tmp_path.iterdir()) == []
+
+        layer = await test_session.get(Layer, job["layer_id"])
+        assert layer.srid == 3857
+        assert layer.geometry_type == "POINT"
+
+        response = await ac.get(f"/api/v1/layers/{job['layer_id']}/features", headers=headers)
+        features = response.json()["features"]
+        assert [f["properties"]["n"] for f in features] == [1, 2]
+        assert features[1]["geometry"]["coordinates"] == [300.0, 400.0]
+
+    await _drop_layer_tables(test_session)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_ingest_csv_in_batches(test_session):
+    """
+    Test loading a CSV-with-WKT file in several COPY batches.
+    """
+    project, _ = await _create_project(test_session, "csv@example.com")
+    lines = ["id,name,wkt"] + [f'{i},feature {i},"POLYGON (({i} 0, {i + 1} 0, {i + 1} 1, {i} 0))"' for i in range(7)]
+    stream = io.BytesIO("\n".join(lines).encode())
+
+    layer, result = await ingest_file(test_session, project.id, "parcels", stream, "csv", batch_size=3)
+
+    assert result.features == 7
+    assert layer.srid == 4326
+    assert layer.geometry_type == "POLYGON"
+
+    table = get_data_table(layer.data_table)
+    rows = (await test_session.exec(select(table.c.properties, table.c.minx).order_by(table.c.id))).all()
+    assert len(rows) == 7
+    assert rows[6] == ({"id": 6, "name": "feature 6"}, 6.0)
+
+    await _drop_layer_tables(test_session)
+
+
+@pytest.mark.asyncio
+async def test_ingest_ndjson_and_invalid_input(test_engine, test_session, monkeypatch, tmp_path):
+    """
+    Test newline-delimited GeoJSON ingestion and the error for a bad line.
+    """
+    monkeypatch.setattr(settings, "JOB_UPLOAD_DIR", str(tmp_path))
+    dispatcher = JobDispatcher(session_factory=sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+    app.dependency_overrides[get_session] = lambda: test_session
+    project, headers = await _create_project(test_session, "ndjson@example.com")
+    # A failed ingestion rolls the session back and expires loaded objects
+    project_id = project.id
+
+    good = "\n".join([
+        json.dumps({"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[0, 0], [1, 1]]}, "properties": {}}),
+        json.dumps({"type": "Feature", "geometry": {"type": "MultiLineString", "coordinates": [[[0, 0], [1, 1]]]}, "properties": {}}),
+    ])
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        job = await _upload(
+            ac, headers, project_id, dispatcher,
+            {"name": "roads", "srid": "4269"}, ("roads.ndjson", good, "application/geo+json-seq"),
+        )
+        assert job["status"] == "completed", job
+        layer = await test_session.get(Layer, job["layer_id"])
+        assert layer.geometry_type == "MULTILINESTRING"
+        assert layer.srid == 4269
+
+        job = await _upload(
+            ac, headers, project_id, dispatcher,
+            {"name": "broken"}, ("broken.ndjson", good + "\n{not json", "application/geo+json-seq"),
+        )
+        assert job["status"] == "failed"
+        assert "line 3" in job["error"]
+        assert job["layer_id"] is None
+        assert list(tmp_path.iterdir()) == []
+
+        response = await ac.post(
+            f"/api/v1/projects/{project_id}/layers",
+            headers=headers,
+            data={"name": "unknown"},
+            files={"file": ("data.bin", b"", "application/octet-stream")},
+        )
+        assert response.status_code == 400
+
+    await _drop_layer_tables(test_session)
+    app.dependency_overrides.clear()
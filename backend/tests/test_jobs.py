@@ -0,0 +1,230 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import jwt
+from app.db.session import get_session
+from app.main import app
+from app.models.job import Job
+from app.models.layer import Layer
+from app.models.user import User
+from app.services import job_handlers
+from app.services.jobs import JobDispatcher, enqueue_job
+from app.services.layer_data import drop_data_table
+
+
+@pytest.mark.asyncio
+async def test_claim_and_stale_recovery(test_engine, test_session, make_layer, monkeypatch):
+    """
+    Test that a job is claimed once, and that jobs of a worker that stopped
+    responding are requeued until they run out of attempts.
+    """
+    factory = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    first = JobDispatcher(session_factory=factory, stale_seconds=60, max_attempts=2)
+    second = JobDispatcher(session_factory=factory, stale_seconds=60, max_attempts=2)
+    second.worker_id = "other:1"
+
+    owner = User(email="claims@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner)
+    job = await enqueue_job(test_session, "pyramid", layer.project_id, layer_id=layer.id)
+
+    assert await first.claim() == job.id
+    assert await second.claim() is None
+    await test_session.refresh(job)
+    assert (job.status, job.attempts, job.worker) == ("running", 1, first.worker_id)
+
+    # A fresh heartbeat keeps the job claimed
+    assert await second.recover_stale() == 0
+    job.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+    test_session.add(job)
+    await test_session.commit()
+    assert await second.recover_stale() == 1
+    await test_session.refresh(job)
+    assert (job.status, job.worker) == ("pending", None)
+
+    assert await second.claim() == job.id
+    job.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+    test_session.add(job)
+    await test_session.commit()
+    assert await first.recover_stale() == 1
+    await test_session.refresh(job)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert await first.claim() is None
+
+
+@pytest.mark.asyncio
+async def test_job_progress_and_listings(test_engine, test_session, make_layer, monkeypatch):
+    """
+    Test that handlers report progress, failures are recorded and jobs can be
+    polled and listed per project and layer by their owner only.
+    """
+    seen = []
+
+    async def counting_job(context):
+        for done in range(1, 4):
+            await context.progress(done, 3)
+        seen.append(context.params["label"])
+        return {"label": context.params["label"]}
+
+    async def broken_job(context):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(job_handlers.HANDLERS, "count", counting_job)
+    monkeypatch.setitem(job_handlers.HANDLERS, "broken", broken_job)
+    dispatcher = JobDispatcher(session_factory=sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+    owner = User(email="jobs@example.com", auth_provider="local")
+    stranger = User(email="not-jobs@example.com", auth_provider="local")
+    test_session.add_all([owner, stranger])
+    await test_session.commit()
+    await test_session.refresh(owner)
+    await test_session.refresh(stranger)
+    layer = await make_layer(owner)
+    project_id, layer_id = layer.project_id, layer.id
+    jobs = [
+        await enqueue_job(test_session, "count", project_id, layer_id=layer_id, params={"label": "a"}),
+        await enqueue_job(test_session, "broken", project_id),
+        await enqueue_job(test_session, "nope", project_id),
+    ]
+    counted, broken, unknown = (job.id for job in jobs)
+    assert await dispatcher.drain() == 3
+    assert seen == ["a"]
+    # The jobs ran in the dispatcher's sessions; the routes share this one
+    for job in jobs:
+        test_session.expire(job)
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        body = (await ac.get(f"/api/v1/jobs/{counted}", headers=headers)).json()
+        assert body["status"] == "completed"
+        assert (body["progress_done"], body["progress_total"]) == (3, 3)
+        assert body["result"] == {"label": "a"}
+        assert body["attempts"] == 1
+        body = (await ac.get(f"/api/v1/jobs/{broken}", headers=headers)).json()
+        assert (body["status"], body["error"]) == ("failed", "boom")
+        body = (await ac.get(f"/api/v1/jobs/{unknown}", headers=headers)).json()
+        assert body["error"] == "Unknown job kind 'nope'"
+
+        response = await ac.get(f"/api/v1/projects/{project_id}/jobs", params={"limit": 2}, headers=headers)
+        page = response.json()
+        assert [job["id"] for job in page["items"]] == [counted, broken]
+        response = await ac.get(
+            f"/api/v1/projects/{project_id}/jobs", params={"cursor": page["next_cursor"]}, headers=headers
+        )
+        assert [job["id"] for job in response.json()["items"]] == [unknown]
+        response = await ac.get(f"/api/v1/projects/{project_id}/jobs", params={"status": "failed"}, headers=headers)
+        assert [job["id"] for job in response.json()["items"]] == [broken, unknown]
+        response = await ac.get(f"/api/v1/layers/{layer_id}/jobs", headers=headers)
+        assert [job["id"] for job in response.json()["items"]] == [counted]
+
+        response = await ac.post(f"/api/v1/layers/{layer_id}/pyramid", params={"zooms": "2,4"}, headers=headers)
+        assert response.status_code == 202
+        assert response.json()["status"] == "pending"
+        pending = await test_session.get(Job, response.json()["id"])
+        assert pending.params == {"zooms": [2, 4]}
+
+        other = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(stranger.id)})}"}
+        response = await ac.get(f"/api/v1/jobs/{counted}", headers=other)
+        assert response.status_code == 404
+        response = await ac.get(f"/api/v1/projects/{project_id}/jobs", headers=other)
+        assert response.status_code == 404
+    app.dependency_overrides.clear()
+
+
+async def _take_over(factory, job_id):
+    # What another worker does after recover_stale requeued the job
+    async with factory() as session:
+        await session.execute(
+            update(Job).where(Job.id == job_id).values(worker="other:1", attempts=Job.attempts + 1, status="running")
+        )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_run_that_lost_its_job_is_cancelled(test_engine, test_session, make_layer, monkeypatch, tmp_path):
+    """
+    Test that a run whose job was claimed again stops, writes nothing to the
+    job and leaves the upload of an ingest job to the new run.
+    """
+    factory = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def sleeping_job(context):
+        await context.progress(1, 3)
+        await _take_over(factory, context.job.id)
+        await asyncio.sleep(10)
+
+    async def progress_job(context):
+        await _take_over(factory, context.job.id)
+        await context.progress(3, 3)
+
+    async def quiet_job(context):
+        await _take_over(factory, context.job.id)
+        return {"done": True}
+
+    monkeypatch.setitem(job_handlers.HANDLERS, "sleeping", sleeping_job)
+    monkeypatch.setitem(job_handlers.HANDLERS, "progress", progress_job)
+    monkeypatch.setitem(job_handlers.HANDLERS, "quiet", quiet_job)
+    # Heartbeats every 10ms
+    dispatcher = JobDispatcher(session_factory=factory, stale_seconds=0.03)
+
+    owner = User(email="takeover@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner)
+    project_id = layer.project_id
+    job_ids = [(await enqueue_job(test_session, kind, project_id)).id for kind in ("sleeping", "progress", "quiet")]
+    assert await asyncio.wait_for(dispatcher.drain(), 5) == 3
+    async with factory() as session:
+        for job_id in job_ids:
+            job = await session.get(Job, job_id)
+            assert (job.status, job.worker, job.result, job.error) == ("running", "other:1", None, None)
+
+    # An ingest run taken over after loading the file drops its layer and keeps the file
+    ingest_file = job_handlers.ingest_file
+
+    async def ingest_then_lose(session, *args, **kwargs):
+        loaded = await ingest_file(session, *args, **kwargs)
+        await _take_over(factory, job_id)
+        return loaded
+
+    path = tmp_path / "points.ndjson"
+    path.write_text(json.dumps({"type": "Feature", "geometry": {"type": "Point", "coordinates": [1, 2]}, "properties": {}}))
+    params = {"path": str(path), "name": "taken", "format": "ndjson"}
+    job_id = (await enqueue_job(test_session, "ingest", project_id, params=params)).id
+    monkeypatch.setattr(job_handlers, "ingest_file", ingest_then_lose)
+    # Noticed when the layer is attached, not by a heartbeat cancelling a query
+    dispatcher = JobDispatcher(session_factory=factory)
+    assert await dispatcher.drain() == 1
+    assert path.exists()
+    async with factory() as session:
+        assert (await session.exec(select(Layer).where(Layer.name == "taken"))).first() is None
+        job = await session.get(Job, job_id)
+        assert (job.status, job.layer_id) == ("running", None)
+
+    # The run that took it over loads the file as usual
+    monkeypatch.setattr(job_handlers, "ingest_file", ingest_file)
+    async with factory() as session:
+        await session.execute(update(Job).where(Job.id == job_id).values(status="pending", worker=None))
+        await session.commit()
+    assert await dispatcher.drain() == 1
+    assert not path.exists()
+    async with factory() as session:
+        job = await session.get(Job, job_id)
+        assert job.status == "completed"
+        layer = await session.get(Layer, job.layer_id)
+        assert layer.name == "taken"
+        await drop_data_table(await session.connection(), layer.data_table)
+        await session.commit()
@@ -0,0 +1,129 @@
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.models.user import User
+from app.core import jwt
+from app.db.session import get_session
+from app.services.features import stream_feature_collection
+
+
+async def _create_owner(test_session, email):
+    owner = User(email=email, auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    return owner
+
+
+@pytest.mark.asyncio
+async def test_stream_features_endpoint(test_session, make_layer):
+    """
+    Test that the features endpoint streams a valid GeoJSON FeatureCollection.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = await _create_owner(test_session, "features@example.com")
+    layer = await make_layer(owner, features=[
+        ("POINT (1 1)", {"name": "a"}),
+        ("POINT (5 5)", {"name": "b"}),
+        ("POLYGON ((0 0, 2 0, 2 2, 0 0))", {"name": "c"}),
+        (None, {"name": "no geometry"}),
+    ])
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/layers/{layer.id}/features", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/geo+json"
+        collection = response.json()
+        assert collection["type"] == "FeatureCollection"
+        assert [f["properties"]["name"] for f in collection["features"]] == ["a", "b", "c", "no geometry"]
+        assert collection["features"][0]["geometry"] == {"type": "Point", "coordinates": [1.0, 1.0]}
+        assert collection["features"][3]["geometry"] is None
+
+        response = await ac.get(f"/api/v1/layers/{layer.id}/features?bbox=0,0,3,3", headers=headers)
+        assert [f["properties"]["name"] for f in response.json()["features"]] == ["a", "c"]
+
+        response = await ac.get(f"/api/v1/layers/{layer.id}/features?bbox=0,0,3", headers=headers)
+        assert response.status_code == 400
+
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_stream_features_in_chunks(test_session, make_layer):
+    """
+    Test that rows are written out chunk by chunk rather than all at once.
+    """
+    owner = await _create_owner(test_session, "chunks@example.com")
+    layer = await make_layer(owner, features=[(f"POINT ({i} {i})", {"i": i}) for i in range(5)])
+
+    chunks = [c async for c in stream_feature_collection(test_session, layer, chunk_size=2)]
+
+    # Header, three chunks of rows (2 + 2 + 1), footer
+    assert len(chunks) == 5
+    collection = json.loads(b"".join(chunks))
+    assert [f["properties"]["i"] for f in collection["features"]] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_stream_empty_layer(test_session, make_layer):
+    owner = await _create_owner(test_session, "empty@example.com")
+    layer = await make_layer(owner)
+
+    chunks = [c async for c in stream_feature_collection(test_session, layer)]
+    assert json.loads(b"".join(chunks)) == {"type": "FeatureCollection", "features": []}
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests(test_session, make_layer):
+    """
+    Test that layer responses carry validators and that a current ETag gets a
+    304 without the data table being read.
+    """
+    from app.services.layer_data import drop_data_table, touch_layer
+
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = await _create_owner(test_session, "etags@example.com")
+    layer = await make_layer(owner, features=[("POINT (1 1)", {"name": "a"})])
+    token = jwt.create_access_token(data={"sub": str(owner.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/layers/{layer.id}", headers=headers)
+        assert response.json()["version"] == 1
+        etag = response.headers["etag"]
+        assert etag == f'W/"{layer.id}-1"'
+        last_modified = response.headers["last-modified"]
+
+        response = await ac.get(f"/api/v1/layers/{layer.id}/features", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["etag"] == etag
+
+        # Validators are checked before any data is read
+        conn = await test_session.connection()
+        await drop_data_table(conn, layer.data_table)
+        await test_session.commit()
+        for url in ("features", "tiles/2/1/1.mvt", "clusters?z=2", "aggregate?size=10"):
+            response = await ac.get(f"/api/v1/layers/{layer.id}/{url}", headers={**headers, "If-None-Match": etag})
+            assert response.status_code == 304, url
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/features", headers={**headers, "If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+
+        touch_layer(layer)
+        test_session.add(layer)
+        await test_session.commit()
+        response = await ac.get(f"/api/v1/layers/{layer.id}", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'W/"{layer.id}-2"'
+        assert response.json()["version"] == 2
+
+    app.dependency_overrides.clear()
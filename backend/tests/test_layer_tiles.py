@@ -0,0 +1,251 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.models.user import User
+from app.core import jwt
+from app.db.session import get_session
+from app.services.geometry import parse_wkt, to_wkt
+from app.services.mvt import TileLayerEncoder, TileTransform, encode_tile
+from app.services.tile_cache import TileCache, tile_cache
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _fields(data):
+    """
+    Minimal protobuf reader yielding (field, value) pairs.
+    """
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise AssertionError(f"Unexpected wire type {wire_type}")
+        yield field, value
+
+
+def _packed_varints(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def decode_tile(data):
+    """
+    Decode a tile into {layer_name: {"features": [...], "keys": [...], "extent": int}}.
+    """
+    layers = {}
+    for field, layer_bytes in _fields(data):
+        assert field == 3
+        layer = {"features": [], "keys": []}
+        for lfield, value in _fields(layer_bytes):
+            if lfield == 1:
+                layer["name"] = value.decode()
+            elif lfield == 2:
+                layer["features"].append(dict(_fields(value)))
+            elif lfield == 3:
+                layer["keys"].append(value.decode())
+            elif lfield == 5:
+                layer["extent"] = value
+        layers[layer["name"]] = layer
+    return layers
+
+
+@pytest.fixture(autouse=True)
+def isolated_tile_cache(tmp_path):
+    tile_cache.disk_dir = str(tmp_path / "tiles")
+    tile_cache.clear()
+    yield
+    tile_cache.clear()
+
+
+def test_wkt_round_trip():
+    """
+    Test parsing and formatting WKT geometries.
+    """
+    wkt = "MULTIPOLYGON (((0 0, 10 0, 10 10, 0 10, 0 0), (2 2, 2 4, 4 4, 2 2)), ((20 20, 30 20, 30 30, 20 20)))"
+    geometry = parse_wkt(wkt)
+    assert geometry["type"] == "MultiPolygon"
+    assert geometry["coordinates"][0][1][1] == [2.0, 4.0]
+    assert to_wkt(geometry) == wkt
+    assert parse_wkt("SRID=4326;POINT (1.5 -2)") == {"type": "Point", "coordinates": [1.5, -2.0]}
+
+
+def test_polygon_is_clipped_to_tile_buffer():
+    """
+    Test that a polygon covering the whole world is clipped to the tile plus buffer.
+    """
+    transform = TileTransform(2, 1, 1)
+    encoder = TileLayerEncoder("world")
+    world = parse_wkt("POLYGON ((-180 -85, 180 -85, 180 85, -180 85, -180 -85))")
+    assert encoder.add_feature(world, transform, {"name": "world"}, feature_id=1, buffer=64)
+
+    feature = decode_tile(encode_tile([encoder]))["world"]["features"][0]
+    assert feature[3] == 3  # POLYGON
+    commands = _packed_varints(feature[4])
+    # MoveTo(1), LineTo(3), ClosePath(1): a square clipped at -64..4160
+    assert commands[0] == 9 and commands[3] == 26 and commands[-1] == 15
+    assert len(commands) == 11
+    points, x, y = [], 0, 0
+    for dx, dy in [(commands[1], commands[2])] + list(zip(commands[4:10:2], commands[5:10:2])):
+        x += (dx >> 1) ^ -(dx & 1)
+        y += (dy >> 1) ^ -(dy & 1)
+        points.append((x, y))
+    assert {p[0] for p in points} == {-64, 4160}
+    assert {p[1] for p in points} == {-64, 4160}
+
+
+def test_points_outside_tile_are_dropped():
+    transform = TileTransform(1, 0, 0)
+    encoder = TileLayerEncoder("points")
+    assert not encoder.add_feature(parse_wkt("POINT (90 -45)"), transform)
+    assert encoder.add_feature(parse_wkt("POINT (-90 45)"), transform)
+    assert encode_tile([TileLayerEncoder("empty")]) == b""
+
+
+def test_tile_cache_lru_bounds(tmp_path):
+    """
+    Test that both cache levels evict least recently used tiles.
+    """
+    cache = TileCache(memory_max_bytes=10, disk_dir=str(tmp_path), disk_max_bytes=10)
+    cache.set((1, 1, 0, 0, 0), b"aaaaa")
+    cache.set((1, 1, 1, 0, 0), b"bbbbb")
+    assert cache.get((1, 1, 0, 0, 0)) == b"aaaaa"
+    cache.set((1, 1, 1, 1, 0), b"ccccc")
+
+    # Memory evicted (1, 1, 1, 0, 0), the disk level evicted the oldest write instead
+    assert list(cache._memory) == [(1, 1, 0, 0, 0), (1, 1, 1, 1, 0)]
+    assert list(cache._disk) == [(1, 1, 1, 0, 0), (1, 1, 1, 1, 0)]
+    assert cache.get((1, 1, 1, 0, 0)) == b"bbbbb"
+    assert list(cache._memory) == [(1, 1, 1, 1, 0), (1, 1, 1, 0, 0)]
+
+    # A fresh cache over the same directory still finds the disk tiles
+    reopened = TileCache(memory_max_bytes=10, disk_dir=str(tmp_path), disk_max_bytes=10)
+    assert reopened.get((1, 1, 1, 1, 0)) == b"ccccc"
+
+    reopened.invalidate_layer(1)
+    assert reopened.get((1, 1, 1, 1, 0)) is None
+
+
+@pytest.mark.asyncio
+async def test_layer_tile_endpoint(test_session, make_layer):
+    """
+    Test that the tile endpoint returns a clipped MVT tile and caches it.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="tiles@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+
+    layer = await make_layer(owner, name="cities", features=[
+        ("POINT (-74.0 40.7)", {"name": "New York", "population": 8400000}),
+        ("POINT (139.7 35.7)", {"name": "Tokyo", "population": 13900000}),
+        ("LINESTRING (-80 30, -70 45)", {"name": "coast"}),
+    ])
+    token = jwt.create_access_token(data={"sub": str(owner.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        # Zoom 2, tile (1, 1) covers North America
+        response = await ac.get(f"/api/v1/layers/{layer.id}/tiles/2/1/1.mvt", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+
+        tile = decode_tile(response.content)
+        assert set(tile) == {"cities"}
+        assert len(tile["cities"]["features"]) == 2
+        assert tile["cities"]["extent"] == 4096
+        assert "population" in tile["cities"]["keys"]
+        assert (layer.id, layer.version, 2, 1, 1) in tile_cache._memory
+
+        # Asia has only Tokyo
+        response = await ac.get(f"/api/v1/layers/{layer.id}/tiles/2/3/1.mvt", headers=headers)
+        assert len(decode_tile(response.content)["cities"]["features"]) == 1
+
+        # Southern hemisphere is empty
+        response = await ac.get(f"/api/v1/layers/{layer.id}/tiles/2/1/3.mvt", headers=headers)
+        assert response.status_code == 204
+
+        response = await ac.get(f"/api/v1/layers/{layer.id}/tiles/2/4/0.mvt", headers=headers)
+        assert response.status_code == 404
+
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_layer_tile_requires_owner(test_session, make_layer):
+    """
+    Test that another user's layer is not served.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="owner@example.com", auth_provider="local")
+    other = User(email="other@example.com", auth_provider="local")
+    test_session.add(owner)
+    test_session.add(other)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    await test_session.refresh(other)
+
+    layer = await make_layer(owner, features=[("POINT (0 0)", {})])
+    token = jwt.create_access_token(data={"sub": str(other.id)})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/tiles/0/0/0.mvt",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert response.status_code == 404
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_render_tile_thins_and_caps_features(test_session, make_layer, monkeypatch):
+    """
+    Test that low-zoom tiles keep one point per grid cell and stop at TILE_MAX_FEATURES.
+    """
+    from app.services import tiles
+    from app.services.tiles import render_tile
+
+    owner = User(email="dense@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    features = [(f"POINT ({i * 0.00001} {i * 0.00001})", {}) for i in range(100)]
+    features.append(("LINESTRING (-10 -10, 10 10)", {}))
+    layer = await make_layer(owner, features=features)
+    monkeypatch.setattr(tiles.settings, "TILE_RENDER_CHUNK_SIZE", 7)
+
+    thinned = decode_tile(await render_tile(test_session, layer, 2, 2, 1))["test_layer"]["features"]
+    assert len(thinned) == 2  # one point and the line
+
+    monkeypatch.setattr(tiles.settings, "TILE_POINT_THIN_MAX_ZOOM", 1)
+    full = decode_tile(await render_tile(test_session, layer, 2, 2, 1))["test_layer"]["features"]
+    assert len(full) == 101
+
+    monkeypatch.setattr(tiles.settings, "TILE_MAX_FEATURES", 10)
+    capped = decode_tile(await render_tile(test_session, layer, 2, 2, 1))["test_layer"]["features"]
+    assert len(capped) == 10
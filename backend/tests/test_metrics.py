@@ -0,0 +1,43 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core.metrics import Registry
+from app.main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("job_seconds", "Job time.", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, kind="export")
+    text = registry.render()
+    assert "# TYPE job_seconds histogram" in text
+    assert 'job_seconds_bucket{kind="export",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{kind="export",le="1"} 3' in text
+    assert 'job_seconds_bucket{kind="export",le="+Inf"} 4' in text
+    assert 'job_seconds_count{kind="export"} 4' in text
+    assert 'job_seconds_sum{kind="export"} 4.25' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates_and_pool():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/api/v1/health/health")
+        await ac.get("/api/v1/layers/123/features")  # 401 without a token
+        await ac.get("/no/such/path")
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/health/health",status="200"}' in text
+    # Path parameters are not label values
+    assert 'route="/api/v1/layers/{layer_id}/features",status="401"' in text
+    assert "/layers/123/" not in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'http_response_size_bytes_count{method="GET",route="/api/v1/health/health"}' in text
+    # The scrape itself is still in flight
+    assert 'http_requests_in_flight{method="GET"} 1' in text
+    assert 'db_pool_connections{database="primary",state="size"}' in text
+    assert 'cache_hits_total{cache="tile"}' in text
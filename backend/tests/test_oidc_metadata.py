@@ -0,0 +1,71 @@
+import pytest
+from authlib.integrations.starlette_client import OAuth
+from app.core.oidc import ProviderMetadataCache
+from tests.oidc_provider import LocalOIDCProvider
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_fetches_once_and_persists(tmp_path):
+    """
+    Test that discovery documents and keys are cached in memory and on disk.
+    """
+    provider = LocalOIDCProvider()
+    cache = ProviderMetadataCache(str(tmp_path), ttl_seconds=60, transport=provider.transport)
+
+    entry = await cache.get(provider.discovery_url)
+    assert entry["metadata"]["issuer"] == provider.issuer
+    assert entry["jwks"] == provider.jwks()
+    assert provider.requests == ["/.well-known/openid-configuration", "/jwks"]
+
+    await cache.get(provider.discovery_url)
+    assert len(provider.requests) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A new process starts from the disk copy
+    restarted = ProviderMetadataCache(str(tmp_path), ttl_seconds=60, transport=provider.transport)
+    assert (await restarted.get(provider.discovery_url))["jwks"] == provider.jwks()
+    assert len(provider.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_last_good_copy(tmp_path):
+    provider = LocalOIDCProvider()
+    cache = ProviderMetadataCache(str(tmp_path), ttl_seconds=60, transport=provider.transport)
+    await cache.fetch(provider.discovery_url)
+    cache.load(provider.discovery_url)["fetched_at"] -= 3600  # expired
+
+    provider.fail = True
+    await cache.refresh(provider.discovery_url)
+    assert cache.load(provider.discovery_url)["metadata"]["issuer"] == provider.issuer
+
+    provider.fail = False
+    await cache.refresh(provider.discovery_url)
+    assert cache.is_fresh(cache.load(provider.discovery_url))
+
+
+@pytest.mark.asyncio
+async def test_id_token_validation_uses_cached_metadata(tmp_path):
+    """
+    Test that an Authlib client fed by the cache validates ID tokens without
+    fetching discovery documents or keys during the callback.
+    """
+    provider = LocalOIDCProvider()
+    cache = ProviderMetadataCache(str(tmp_path), ttl_seconds=60, transport=provider.transport)
+    await cache.fetch(provider.discovery_url)
+
+    client = OAuth().register(
+        name="standin",
+        client_id="client-123",
+        client_secret="secret",
+        server_metadata_url=provider.discovery_url,
+    )
+    cache.attach(provider.discovery_url, client)
+    fetched = len(provider.requests)
+
+    token = {
+        "access_token": "access",
+        "id_token": provider.id_token("client-123", nonce="n-1", sub="42", email="standin@example.com"),
+    }
+    user_info = await client.parse_id_token(token, nonce="n-1")
+    assert user_info["email"] == "standin@example.com"
+    assert len(provider.requests) == fetched
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import select
+
+from app.core.http import SharedTransport
+from app.core.oauth import LazyOAuth
+from app.db.session import get_session
+from app.main import app
+from app.models.user import User
+
+
+def test_provider_clients_use_shared_pool_and_timeout():
+    client = LazyOAuth().github
+    assert client.client_kwargs["timeout"] == 10.0
+    assert client.client_kwargs["transport"].name == "github"
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_survives_client_close_and_records_latency():
+    """
+    Test that closing a per-call client keeps the shared pool open, and that
+    calls are counted per provider.
+    """
+    shared = SharedTransport(max_connections=4, max_keepalive_connections=2, keepalive_expiry=5)
+    shared._transport = httpx.MockTransport(
+        lambda request: httpx.Response(503 if request.url.path == "/down" else 200)
+    )
+
+    for path in ("/user", "/down"):
+        async with httpx.AsyncClient(transport=shared.for_provider("github")) as client:
+            await client.get(f"https://api.github.test{path}")
+    async with httpx.AsyncClient(transport=shared.for_provider("google")) as client:
+        await client.get("https://accounts.google.test/userinfo")
+
+    stats = shared.stats()
+    assert stats["github"]["calls"] == 2
+    assert stats["github"]["errors"] == 1
+    assert stats["google"]["calls"] == 1
+    assert stats["github"]["seconds_max"] >= stats["github"]["seconds_avg"] >= 0
+    await shared.aclose()
+
+
+@pytest.mark.asyncio
+async def test_github_callback_fetches_profile_and_emails_concurrently(test_session):
+    in_flight = 0
+    peak = 0
+
+    async def github_get(path, token=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        if path == "user":
+            return httpx.Response(200, json={"email": None, "id": 4242})
+        return httpx.Response(200, json=[
+            {"email": "old@example.com", "primary": False, "verified": True},
+            {"email": "concurrent@example.com", "primary": True, "verified": True},
+        ])
+
+    with patch("app.api.v1.routes_oauth.oauth") as mock_oauth:
+        mock_oauth.github.authorize_access_token = AsyncMock(return_value={"access_token": "gh"})
+        mock_oauth.github.get = github_get
+        app.dependency_overrides[get_session] = lambda: test_session
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/api/v1/auth/github/callback")
+
+    app.dependency_overrides.clear()
+    assert response.status_code == 307
+    assert peak == 2
+    user = (await test_session.exec(select(User).where(User.email == "concurrent@example.com"))).first()
+    assert user is not None and user.provider_id == "4242"
@@ -0,0 +1,120 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.models.user import User
+from app.models.project import Project
+from app.models.layer import Layer
+from app.core import jwt
+from app.db.session import get_session
+from app.services.pagination import CursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"name": "roads", "id": 7})
+    assert "=" not in cursor
+    assert decode_cursor(cursor, ("name", "id")) == ("roads", 7)
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, ("id",))
+    with pytest.raises(CursorError):
+        decode_cursor("not a cursor!", ("id",))
+    for forged in ({"name": [1], "id": 1}, {"name": {"a": 1}, "id": 1}, {"name": None, "id": 1}, {"name": "x", "id": True}):
+        with pytest.raises(CursorError):
+            decode_cursor(encode_cursor(forged), ("name", "id"))
+
+
+async def _pages(ac, url, headers, **params):
+    names, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = await ac.get(url, params=query, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        names.append([item["name"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return names
+
+
+@pytest.mark.asyncio
+async def test_list_projects_and_layers_by_keyset(test_session):
+    """
+    Test that projects and layers are listed page by page in (name, id) or id order.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="pages@example.com", auth_provider="local")
+    other = User(email="pages-other@example.com", auth_provider="local")
+    test_session.add_all([owner, other])
+    await test_session.commit()
+    await test_session.refresh(owner)
+    await test_session.refresh(other)
+
+    projects = [Project(name=name, owner_id=owner.id) for name in ["c", "a", "b", "a", "d"]]
+    test_session.add_all(projects + [Project(name="hidden", owner_id=other.id)])
+    await test_session.commit()
+    project_id = projects[0].id
+    test_session.add_all([
+        Layer(project_id=project_id, name=name, data_table=f"pages_{i}") for i, name in enumerate(["z", "y", "x"])
+    ])
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        pages = await _pages(ac, "/api/v1/projects", headers, limit=2)
+        assert pages == [["a", "a"], ["b", "c"], ["d"]]
+
+        pages = await _pages(ac, "/api/v1/projects", headers, limit=3, order="id")
+        assert pages == [["c", "a", "b"], ["a", "d"]]
+
+        pages = await _pages(ac, f"/api/v1/projects/{project_id}/layers", headers, limit=2)
+        assert pages == [["x", "y"], ["z"]]
+
+        # A cursor from one ordering cannot be used with another
+        response = await ac.get("/api/v1/projects", params={"limit": 2}, headers=headers)
+        cursor = response.json()["next_cursor"]
+        response = await ac.get("/api/v1/projects", params={"order": "id", "cursor": cursor}, headers=headers)
+        assert response.status_code == 400
+
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_feature_pages(test_session, make_layer):
+    """
+    Test that layer features can be read page by page, with and without filters.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="feature-pages@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+
+    layer = await make_layer(owner, features=[(f"POINT ({i} {i})", {"n": i}) for i in range(10)])
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    url = f"/api/v1/layers/{layer.id}/features"
+
+    async def read_all(**params):
+        pages, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = await ac.get(url, params=query, headers=headers)
+            assert response.status_code == 200
+            body = response.json()
+            pages.append([f["properties"]["n"] for f in body["features"]])
+            cursor = body.get("next_cursor")
+            if cursor is None:
+                return pages
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert await read_all(limit=4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+        assert await read_all(limit=5) == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+        assert await read_all(limit=2, bbox="2.5,2.5,6,6") == [[3, 4], [5, 6]]
+        assert await read_all(limit=1, intersects="POLYGON ((0.5 0.5, 3.5 0.5, 3.5 3.5, 0.5 0.5))") == [[1], [2], [3]]
+
+        response = await ac.get(url, params={"cursor": "bogus"}, headers=headers)
+        assert response.status_code == 400
+
+    app.dependency_overrides.clear()
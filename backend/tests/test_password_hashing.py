@@ -0,0 +1,47 @@
+import asyncio
+import time
+import pytest
+from app.core.security import PasswordHasher, PasswordHasherBusy, hash_password_async, verify_password_async
+
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify():
+    hashed = await hash_password_async("secret")
+    assert await verify_password_async("secret", hashed)
+    assert not await verify_password_async("wrong", hashed)
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_the_event_loop():
+    """
+    Test that the event loop keeps running other tasks while passwords are hashed.
+    """
+    hasher = PasswordHasher(workers=2, max_queue=8)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    try:
+        await asyncio.gather(*(hasher.hash(f"password {i}") for i in range(6)))
+    finally:
+        task.cancel()
+        hasher.shutdown()
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert len(ticks) > 2
+    # A blocked loop would show a gap of several Argon2 runs
+    assert max(gaps) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_hashing_queue_is_bounded():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(*(hasher.hash("pw") for _ in range(3)), return_exceptions=True)
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    assert hasher.pending == 0
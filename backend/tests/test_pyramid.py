@@ -0,0 +1,114 @@
+import math
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import inspect as sa_inspect
+from sqlmodel import select
+
+from app.core import jwt
+from app.db.layer_tables import get_pyramid_table
+from app.db.session import get_session
+from app.main import app
+from app.models.user import User
+from app.services.pyramid import build_pyramid, level_for_resolution, level_for_zoom, level_tolerance
+from app.services.simplify import simplify_geometry, simplify_line, vertex_count
+from app.services.tiles import render_tile
+
+
+def test_douglas_peucker():
+    line = [[0, 0], [1, 0.05], [2, -0.05], [3, 0], [4, 2], [5, 0]]
+    assert simplify_line(line, 0.1) == [[0, 0], [3, 0], [4, 2], [5, 0]]
+    assert simplify_line(line, 0.01) == line
+    assert simplify_line(line, 5) == [[0, 0], [5, 0]]
+
+
+def test_polygons_keep_a_ring_and_drop_small_holes():
+    square = [[0, 0], [10, 0], [10, 0.01], [10, 10], [0, 10], [0, 0]]
+    hole = [[4, 4], [4.1, 4], [4.1, 4.1], [4, 4.1], [4, 4]]
+    simplified = simplify_geometry({"type": "Polygon", "coordinates": [square, hole]}, 0.5)
+    assert simplified["coordinates"] == [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]
+
+    # Far below the tolerance, the exterior becomes a triangle rather than vanishing
+    (ring,) = simplify_geometry({"type": "Polygon", "coordinates": [square]}, 100)["coordinates"]
+    assert len(ring) == 4 and ring[0] == ring[-1]
+
+
+def test_level_selection():
+    class FakeLayer:
+        srid = 4326
+        pyramid_zooms = "3,6,9"
+
+    layer = FakeLayer()
+    assert [level_for_zoom(layer, z) for z in (0, 3, 4, 9, 10)] == [3, 3, 6, 9, None]
+    assert level_for_resolution(layer, None) is None
+    assert level_for_resolution(layer, level_tolerance(4326, 6)) == 6
+    assert level_for_resolution(layer, 1.0) == 3
+    assert level_for_resolution(layer, level_tolerance(4326, 12)) is None
+
+
+def _wiggly_line(points=2000):
+    # A coastline-like line across 40 degrees with detail far below a pixel at low zooms
+    coords = ", ".join(
+        f"{-20 + 40 * i / points} {0.001 * math.sin(i)}" for i in range(points + 1)
+    )
+    return f"LINESTRING ({coords})"
+
+
+@pytest.mark.asyncio
+async def test_reads_use_the_pyramid(test_session, make_layer):
+    """
+    Test that tiles and features read simplified geometries at low resolution
+    and full-resolution ones when zoomed in.
+    """
+    owner = User(email="pyramid@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner, features=[(_wiggly_line(), {"name": "coast"}), ("POINT (1 1)", {"name": "p"})])
+
+    written = await build_pyramid(test_session, layer, zooms=[3, 12])
+    await test_session.commit()
+    assert written == 2  # one row per level for the line, none for the point
+    assert layer.pyramid_zooms == "3,12"
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        url = f"/api/v1/layers/{layer.id}/features"
+        full = (await ac.get(url, headers=headers)).json()["features"]
+        coarse = (await ac.get(url, params={"resolution": 0.01}, headers=headers)).json()["features"]
+    app.dependency_overrides.clear()
+
+    assert vertex_count(full[0]["geometry"]) == 2001
+    assert vertex_count(coarse[0]["geometry"]) < 10
+    assert coarse[1]["geometry"] == full[1]["geometry"]
+
+    simplified_tile = await render_tile(test_session, layer, 3, 4, 3)
+    layer.pyramid_zooms = None
+    full_tile = await render_tile(test_session, layer, 3, 4, 3)
+    assert len(simplified_tile) * 10 < len(full_tile)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_replaces_the_pyramid_table(test_session, make_layer):
+    """
+    Test that a rebuild writes to a separate table and swaps it into place.
+    """
+    owner = User(email="rebuild@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner, features=[(_wiggly_line(), {})])
+
+    assert await build_pyramid(test_session, layer, zooms=[3, 12]) == 2
+    await test_session.commit()
+    assert await build_pyramid(test_session, layer, zooms=[3]) == 1
+    await test_session.commit()
+
+    lod = get_pyramid_table(layer.data_table)
+    rows = (await test_session.exec(select(lod.c.level, lod.c.id))).all()
+    assert rows == [(3, 1)]
+    conn = await test_session.connection()
+    names = await conn.run_sync(lambda sync_conn: sa_inspect(sync_conn).get_table_names())
+    assert lod.name in names
+    assert get_pyramid_table(layer.data_table, building=True).name not in names
@@ -0,0 +1,160 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.main import app
+from app.models.user import User
+from app.models.project import Project
+from app.models.layer import Layer
+from app.core import jwt
+from app.db.engine import replicas
+from app.db.layer_tables import get_data_table
+from app.db.replicas import ReplicaSet
+from app.db.session import get_session
+from app.services.geometry import parse_wkt
+from app.services.layer_data import create_data_table, feature_row, touch_layer
+
+
+@pytest.mark.asyncio
+async def test_replica_selection():
+    """
+    Test that only healthy replicas within the lag limit are chosen.
+    """
+    fast = create_async_engine("sqlite+aiosqlite://")
+    slow = create_async_engine("sqlite+aiosqlite://")
+    broken = create_async_engine("sqlite+aiosqlite:////nonexistent/dir/replica.db")
+    replica_set = ReplicaSet(max_lag=5.0)
+    try:
+        fast_replica = replica_set.add("fast", fast)
+        slow_replica = replica_set.add("slow", slow)
+        broken_replica = replica_set.add("broken", broken)
+        assert replica_set.choose() is None  # nothing checked yet
+
+        await replica_set.check_all()
+        assert fast_replica.healthy and slow_replica.healthy
+        assert not broken_replica.healthy
+        assert replica_set.choose() in (fast_replica, slow_replica)
+
+        # Much slower than the fastest replica: left out of the rotation
+        fast_replica.latency, slow_replica.latency = 0.001, 0.05
+        assert all(replica_set.choose() is fast_replica for _ in range(20))
+
+        # Too far behind the primary
+        fast_replica.lag = 30.0
+        assert replica_set.choose() is slow_replica
+
+        replica_set.mark_unhealthy(slow_replica)
+        assert replica_set.choose() is None
+    finally:
+        await replica_set.stop()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_with_primary_fallback(test_session):
+    """
+    Test that listings read from a replica and that rows the replica has not
+    received yet are found on the primary.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="replica@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    test_session.add(Project(name="on primary", owner_id=owner.id))
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+
+    # An empty replica: it has the schema but none of the rows yet
+    replica_engine = create_async_engine("sqlite+aiosqlite://")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    replica = replicas.add("lagging", replica_engine)
+    await replicas.check(replica)
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            # The user is only on the primary, authentication still succeeds
+            response = await ac.get("/api/v1/users/me", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["email"] == "replica@example.com"
+
+            response = await ac.get("/api/v1/projects", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["items"] == []
+
+            replicas.mark_unhealthy(replica)
+            response = await ac.get("/api/v1/projects", headers=headers)
+            assert [p["name"] for p in response.json()["items"]] == ["on primary"]
+    finally:
+        replicas.replicas.remove(replica)
+        await replica_engine.dispose()
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_layer_reads_skip_a_replica_behind_on_the_layer(test_session, make_layer):
+    """
+    Test that a replica with an older version of a layer, or one that is
+    lagging, is not used for its data, so ETags and cached tiles always match
+    the current version.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="replica-layer@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    layer = await make_layer(owner, features=[("POINT (1 1)", {"n": 1}), ("POINT (2 2)", {"n": 2})])
+    touch_layer(layer)
+    test_session.add(layer)
+    await test_session.commit()
+    layer_id, project_id, data_table = layer.id, layer.project_id, layer.data_table
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+
+    # The replica still has version 1, with one feature
+    replica_engine = create_async_engine("sqlite+aiosqlite://")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await create_data_table(conn, data_table)
+        await conn.execute(get_data_table(data_table).insert(), [feature_row(parse_wkt("POINT (1 1)"), {"n": 1})])
+    async with AsyncSession(replica_engine) as replica_session:
+        replica_session.add(Project(id=project_id, name="replicated", owner_id=owner.id))
+        replica_session.add(Layer(id=layer_id, project_id=project_id, name="test_layer", data_table=data_table, version=1))
+        await replica_session.commit()
+    replica = replicas.add("behind", replica_engine)
+    await replicas.check(replica)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get(f"/api/v1/layers/{layer_id}/features", headers=headers)
+            assert response.headers["etag"] == f'W/"{layer_id}-2"'
+            assert len(response.json()["features"]) == 2
+
+            # Caught up with the layer: its data is read from the replica
+            async with AsyncSession(replica_engine) as replica_session:
+                await replica_session.execute(update(Layer).where(Layer.id == layer_id).values(version=2))
+                await replica_session.commit()
+            response = await ac.get(f"/api/v1/layers/{layer_id}/features", headers=headers)
+            assert response.headers["etag"] == f'W/"{layer_id}-2"'
+            assert len(response.json()["features"]) == 1
+
+            # Lagging, or not checked for a while: the version comes from the primary
+            replica.lag = 1.0
+            response = await ac.get(f"/api/v1/layers/{layer_id}/features", headers=headers)
+            assert len(response.json()["features"]) == 1
+            async with AsyncSession(replica_engine) as replica_session:
+                await replica_session.execute(update(Layer).where(Layer.id == layer_id).values(version=1))
+                await replica_session.commit()
+            response = await ac.get(f"/api/v1/layers/{layer_id}/features", headers=headers)
+            assert len(response.json()["features"]) == 2
+            replica.lag, replica.checked_at = 0.0, replica.checked_at - 3 * replicas.check_interval
+            response = await ac.get(f"/api/v1/layers/{layer_id}/features", headers=headers)
+            assert len(response.json()["features"]) == 2
+    finally:
+        replicas.replicas.remove(replica)
+        await replica_engine.dispose()
+        app.dependency_overrides.clear()
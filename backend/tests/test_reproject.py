@@ -0,0 +1,85 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import jwt
+from app.db.layer_tables import get_data_table
+from app.db.session import get_session
+from app.main import app
+from app.models.layer import Layer
+from app.models.user import User
+from app.services.jobs import JobDispatcher
+from app.services.mvt import lonlat_to_mercator
+from app.services.reproject import ReprojectionError, get_transformer, reproject_geometries
+
+
+def test_reproject_geometry_batch():
+    geometries = [
+        {"type": "Point", "coordinates": [2.35, 48.85, 35.0]},
+        None,
+        {"type": "LineString", "coordinates": [[0, 0], [10, 20]]},
+        {"type": "Point", "coordinates": [0, 100]},
+        {"type": "GeometryCollection", "geometries": [{"type": "Point", "coordinates": [-70, -33]}]},
+    ]
+    out = reproject_geometries(geometries, 4326, 3857)
+    assert out[0]["coordinates"][:2] == pytest.approx(list(lonlat_to_mercator(2.35, 48.85)))
+    assert out[0]["coordinates"][2] == 35.0
+    assert out[1] is None
+    assert out[2]["coordinates"][1] == pytest.approx(list(lonlat_to_mercator(10, 20)))
+    # Out of range latitudes have no Web Mercator coordinates
+    assert out[3] is None
+    assert out[4]["geometries"][0]["coordinates"] == pytest.approx(list(lonlat_to_mercator(-70, -33)))
+
+    back = reproject_geometries(out[:1], 3857, 4326)
+    assert back[0]["coordinates"] == pytest.approx([2.35, 48.85, 35.0])
+    assert get_transformer(4326, 3857) is get_transformer(4326, 3857)
+    with pytest.raises(ReprojectionError):
+        get_transformer(4326, 999999)
+
+
+@pytest.mark.asyncio
+async def test_feature_reads_and_reproject_job(test_engine, test_session, make_layer):
+    """
+    Test reading features in another SRID and reprojecting a layer's storage.
+    """
+    owner = User(email="reproject@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+    # EPSG:2154 (Lambert-93) coordinates of Paris and Lyon
+    features = [("POINT (652469 6862035)", {"name": "Paris"}), ("POINT (842666 6519924)", {"name": "Lyon"})]
+    layer = await make_layer(owner, features=features, srid=2154, geometry_type="POINT")
+    layer_id, data_table = layer.id, layer.data_table
+    dispatcher = JobDispatcher(session_factory=sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+
+    app.dependency_overrides[get_session] = lambda: test_session
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/layers/{layer_id}/features", params={"srid": 4326, "limit": 1}, headers=headers)
+        body = response.json()
+        assert body["features"][0]["geometry"]["coordinates"] == pytest.approx([2.35, 48.85], abs=0.01)
+        assert "next_cursor" in body
+
+        response = await ac.get(f"/api/v1/layers/{layer_id}/features", params={"srid": 999999}, headers=headers)
+        assert response.status_code == 400
+        response = await ac.post(f"/api/v1/layers/{layer_id}/reproject", params={"srid": 2154}, headers=headers)
+        assert response.status_code == 400
+
+        response = await ac.post(f"/api/v1/layers/{layer_id}/reproject", params={"srid": 3857}, headers=headers)
+        assert response.status_code == 202
+        assert await dispatcher.drain() == 1
+        job = (await ac.get(f"/api/v1/jobs/{response.json()['id']}", headers=headers)).json()
+        assert job["status"] == "completed", job
+        assert job["result"] == {"source_srid": 2154, "srid": 3857, "features": 2}
+
+        test_session.expire(layer)
+        assert (await test_session.get(Layer, layer_id)).srid == 3857
+        table = get_data_table(data_table)
+        minx, miny = (await test_session.exec(select(table.c.minx, table.c.miny).order_by(table.c.id))).first()
+        assert (minx, miny) == pytest.approx(lonlat_to_mercator(2.35, 48.85), abs=2000)
+        # Web Mercator layers can be tiled
+        response = await ac.get(f"/api/v1/layers/{layer_id}/tiles/5/16/11.mvt", headers=headers)
+        assert response.status_code == 200
+    app.dependency_overrides.clear()
@@ -0,0 +1,163 @@
+import random
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.models.user import User
+from app.models.example_model import ExampleModel
+from app.core import jwt
+from app.db.session import get_session
+from app.services.geometry import geometries_intersect, parse_wkt
+from app.services.rtree import PackedRTree, SpatialIndex
+from app.services.spatial_index import EXAMPLE_INDEX_KEY, find_examples, spatial_indexes
+from app.services.wkb import to_wkb
+
+
+def _random_items(count, seed=42):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        x, y = rng.uniform(-180, 170), rng.uniform(-90, 80)
+        items.append((i, (x, y, x + rng.uniform(0, 10), y + rng.uniform(0, 10))))
+    return items
+
+
+def _brute_force(items, bbox):
+    return sorted(i for i, b in items if b[0] <= bbox[2] and b[2] >= bbox[0] and b[1] <= bbox[3] and b[3] >= bbox[1])
+
+
+def test_packed_rtree_matches_brute_force():
+    """
+    Test that the packed R-tree returns exactly the overlapping items.
+    """
+    items = _random_items(5000)
+    tree = PackedRTree(items, node_size=8)
+    assert len(tree) == 5000
+    # Flat storage: 4 doubles per node, leaves first
+    assert len(tree.boxes) == 4 * len(tree.refs)
+
+    rng = random.Random(7)
+    for _ in range(50):
+        x, y = rng.uniform(-180, 180), rng.uniform(-90, 90)
+        bbox = (x, y, x + rng.uniform(0, 30), y + rng.uniform(0, 30))
+        assert sorted(tree.search(bbox)) == _brute_force(items, bbox)
+
+    assert PackedRTree([]).search((0, 0, 1, 1)) == []
+
+
+def test_spatial_index_incremental_writes():
+    """
+    Test that inserts, updates and removals are visible before and after a rebuild.
+    """
+    items = _random_items(1000)
+    index = SpatialIndex(items, min_rebuild=10, rebuild_ratio=0.01)
+    current = dict(items)
+
+    index.insert(5000, (0, 0, 1, 1))
+    current[5000] = (0, 0, 1, 1)
+    index.insert(3, (200, 200, 201, 201))
+    current[3] = (200, 200, 201, 201)
+    index.remove(4)
+    del current[4]
+    assert index.pending and index.hidden
+    assert sorted(index.search((-180, -90, 180, 90))) == _brute_force(current.items(), (-180, -90, 180, 90))
+    assert index.search((199, 199, 202, 202)) == [3]
+
+    for i in range(100, 106):
+        index.remove(i)
+        del current[i]
+    # The write buffer outgrew its threshold and was bulk loaded
+    assert not index.pending and not index.hidden
+    assert len(index) == len(current)
+    assert sorted(index.search((-180, -90, 180, 90))) == _brute_force(current.items(), (-180, -90, 180, 90))
+    assert index.search((199, 199, 202, 202)) == [3]
+
+
+def test_geometries_intersect():
+    square = parse_wkt("POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0), (4 4, 6 4, 6 6, 4 6, 4 4))")
+    assert geometries_intersect(square, parse_wkt("POINT (1 1)"))
+    assert not geometries_intersect(square, parse_wkt("POINT (5 5)"))  # in the hole
+    assert geometries_intersect(square, parse_wkt("POINT (10 5)"))  # on the boundary
+    assert geometries_intersect(square, parse_wkt("LINESTRING (-5 5, 15 5)"))
+    assert not geometries_intersect(square, parse_wkt("LINESTRING (11 0, 11 10)"))
+    assert geometries_intersect(square, parse_wkt("POLYGON ((2 2, 3 2, 3 3, 2 2))"))  # contained
+    assert geometries_intersect(parse_wkt("POLYGON ((2 2, 3 2, 3 3, 2 2))"), square)
+    # Bboxes overlap but the geometries do not
+    assert not geometries_intersect(parse_wkt("LINESTRING (0 0, 10 10)"), parse_wkt("LINESTRING (6 0, 10 4)"))
+
+
+@pytest.mark.asyncio
+async def test_find_examples_uses_incremental_index(test_session):
+    """
+    Test bbox and intersects queries over ExampleModel through the R-tree.
+    """
+    spatial_indexes.invalidate(EXAMPLE_INDEX_KEY)
+    test_session.add(ExampleModel(name="a", geom=to_wkb(parse_wkt("POINT (1 1)"))))
+    test_session.add(ExampleModel(name="b", geom=to_wkb(parse_wkt("LINESTRING (0 0, 10 10)"))))
+    test_session.add(ExampleModel(name="c", geom=to_wkb(parse_wkt("POINT (50 50)"))))
+    test_session.add(ExampleModel(name="d", geom=None))
+    await test_session.commit()
+
+    found = await find_examples(test_session, bbox=(0, 0, 2, 2))
+    assert [e.name for e in found] == ["a", "b"]
+    assert spatial_indexes.get(EXAMPLE_INDEX_KEY) is not None
+
+    found = await find_examples(test_session, intersects=parse_wkt("POLYGON ((6 0, 10 0, 10 4, 6 0))"))
+    assert found == []
+
+    # Writes after the index was built update it in place
+    test_session.add(ExampleModel(name="e", geom=to_wkb(parse_wkt("POINT (8 1)"))))
+    await test_session.commit()
+    found = await find_examples(test_session, intersects=parse_wkt("POLYGON ((6 0, 10 0, 10 4, 6 0))"))
+    assert [e.name for e in found] == ["e"]
+
+    await test_session.delete(found[0])
+    await test_session.commit()
+    assert await find_examples(test_session, intersects=parse_wkt("POINT (8 1)")) == []
+
+    spatial_indexes.invalidate(EXAMPLE_INDEX_KEY)
+
+
+@pytest.mark.asyncio
+async def test_layer_features_intersects_filter(test_session, make_layer):
+    """
+    Test that the features endpoint answers intersects queries (R-tree path on SQLite).
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    owner = User(email="rtree@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+
+    layer = await make_layer(owner, features=[
+        ("POINT (1 1)", {"name": "inside"}),
+        ("POINT (9 1)", {"name": "bbox only"}),
+        ("POINT (20 20)", {"name": "outside"}),
+    ])
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(owner.id)})}"}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/features",
+            params={"intersects": "POLYGON ((0 0, 10 10, 0 10, 0 0))"},
+            headers=headers,
+        )
+        assert [f["properties"]["name"] for f in response.json()["features"]] == ["inside"]
+        assert spatial_indexes.get(layer.data_table, layer.version) is not None
+
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/features",
+            params={"bbox": "0,0,10,10"},
+            headers=headers,
+        )
+        assert [f["properties"]["name"] for f in response.json()["features"]] == ["inside", "bbox only"]
+
+        response = await ac.get(
+            f"/api/v1/layers/{layer.id}/features",
+            params={"bbox": "0,0,10,10", "intersects": "POINT (1 1)"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    app.dependency_overrides.clear()
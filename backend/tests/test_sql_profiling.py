@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.profiling import QueryProfilingMiddleware, install_query_profiling, parameter_shape
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"id": 5, "name": "secret"}) == "{id: int, name: str}"
+    assert parameter_shape((5, None)) == "(int, NoneType)"
+    assert parameter_shape([(1, "a"), (2, "b")], executemany=True) == "2 x (int, str)"
+    assert parameter_shape(None) == "()"
+
+
+@pytest.mark.asyncio
+async def test_requests_are_profiled(caplog):
+    """
+    Test that queries are counted per request, reported in Server-Timing and
+    logged with their route when slow or too many.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_query_profiling(engine.sync_engine, slow_query_seconds=0)
+
+    app = FastAPI()
+    app.add_middleware(QueryProfilingMiddleware, max_queries=2, server_timing=True)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        async with engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT :id"), {"id": item_id})
+        return {"id": item_id}
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.db.profiling"):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+                response = await ac.get("/items/7")
+    finally:
+        await engine.dispose()
+
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="3 queries"')
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Slow query")]
+    assert len(slow) == 3
+    assert "GET /items/{item_id}: SELECT ? -- parameters (int)" in slow[0]
+    assert "7" not in slow[0].split("parameters")[1]
+    assert any("GET /items/{item_id} ran 3 queries" in r.getMessage() for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_failed_queries_are_recorded(caplog):
+    """
+    Test that a failing statement is counted and logged, and leaves no start
+    time behind to skew the statements after it.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_query_profiling(engine.sync_engine, slow_query_seconds=0)
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.db.profiling"):
+            async with engine.connect() as conn:
+                with pytest.raises(Exception):
+                    await conn.execute(text("SELECT * FROM missing_table"))
+                await conn.execute(text("SELECT 1"))
+                assert conn.sync_connection.info["query_start"] == []
+    finally:
+        await engine.dispose()
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert any(m.startswith("Slow failed query") and "missing_table" in m for m in messages)
+    assert any(m.startswith("Slow query") and "SELECT 1" in m for m in messages)
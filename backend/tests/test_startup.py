@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.oauth import LazyOAuth
+from app.db.schema import SchemaOutOfDate, check_schema, expected_heads
+from app.main import create_app
+
+
+def test_create_app_builds_independent_apps():
+    first, second = create_app(), create_app()
+    assert first is not second
+    paths = first.openapi()["paths"]
+    assert "/api/v1/layers/{layer_id}/features" in paths
+    assert "/api/v1/auth/google/login" in paths
+
+
+def test_oauth_clients_are_registered_on_first_use():
+    oauth = LazyOAuth()
+    assert oauth._registry is None
+    client = oauth.github
+    assert client.name == "github"
+    assert oauth.github is client
+    assert oauth._registry is not None
+    with pytest.raises(AttributeError):
+        oauth.unknown_provider
+
+
+@pytest.mark.asyncio
+async def test_schema_check():
+    """
+    Test that startup compares the database revision with the migration head.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        # Never migrated
+        assert await check_schema(engine, mode="warn") is False
+        with pytest.raises(SchemaOutOfDate):
+            await check_schema(engine, mode="error")
+        assert await check_schema(engine, mode="off") is True
+
+        (head,) = expected_heads()
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+            await conn.exec_driver_sql("INSERT INTO alembic_version VALUES ('63391d50b833')")
+        with pytest.raises(SchemaOutOfDate, match="alembic upgrade head"):
+            await check_schema(engine, mode="error")
+
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f"UPDATE alembic_version SET version_num = '{head}'")
+        assert await check_schema(engine, mode="error") is True
+    finally:
+        await engine.dispose()
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.db.layer_tables import get_data_table
+from app.models.project import Project
+from app.models.user import User
+from app.services.geometry import geometry_bbox
+from app.services.layer_data import drop_data_table
+from app.services.synthetic import DEFAULT_EXTENT, iter_batches, load_synthetic_layer
+from app.services.wkb import decode_geometry
+
+
+@pytest.mark.parametrize("kind,geom_type", [("point", "Point"), ("line", "LineString"), ("polygon", "Polygon")])
+def test_generated_rows_are_valid_features(kind, geom_type):
+    (rows,) = list(iter_batches(kind, 200, batch_size=500, vertices=6, seed=1))
+    assert len(rows) == 200
+    for row in rows:
+        geometry = decode_geometry(row["geom"])
+        assert geometry["type"] == geom_type
+        assert geometry_bbox(geometry) == pytest.approx((row["minx"], row["miny"], row["maxx"], row["maxy"]))
+        assert row["properties"]["category"]
+    if kind == "polygon":
+        ring = geometry["coordinates"][0]
+        assert len(ring) == 7 and ring[0] == ring[-1]
+    minx, miny, maxx, maxy = DEFAULT_EXTENT
+    assert all(minx - 1 <= row["minx"] and row["maxy"] <= maxy + 1 for row in rows)
+
+
+def test_generation_is_reproducible_and_clustered():
+    first = [row["geom"] for batch in iter_batches("point", 2000, batch_size=700, seed=3) for row in batch]
+    again = [row["geom"] for batch in iter_batches("point", 2000, batch_size=700, seed=3) for row in batch]
+    assert first == again and len(first) == 2000
+
+    # Clustered data leaves most of a coarse grid empty, uniform data would not
+    minx, miny, maxx, maxy = DEFAULT_EXTENT
+    cells = set()
+    for geom in first:
+        x, y = decode_geometry(geom)["coordinates"]
+        cells.add((int((x - minx) / (maxx - minx) * 20), int((y - miny) / (maxy - miny) * 20)))
+    assert len(cells) < 300
+
+
+@pytest.mark.asyncio
+async def test_load_synthetic_layer(test_session):
+    user = User(email="synthetic@example.com", hashed_password="x", is_active=True)
+    test_session.add(user)
+    await test_session.commit()
+    project = Project(name="Synthetic", owner_id=user.id)
+    test_session.add(project)
+    await test_session.commit()
+
+    layer = await load_synthetic_layer(test_session, project.id, "synthetic", "polygon", 1234, batch_size=500, seed=5)
+    try:
+        assert layer.geometry_type == "POLYGON" and layer.srid == 4326
+        table = get_data_table(layer.data_table)
+        count = (await test_session.execute(select(func.count()).select_from(table))).scalar_one()
+        assert count == 1234
+    finally:
+        await drop_data_table(await test_session.connection(), layer.data_table)
+        await test_session.commit()
@@ -0,0 +1,74 @@
+import time
+from sqlalchemy import event
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.models.user import User
+from app.core import jwt
+from app.core.user_cache import UserCache, user_cache
+from app.db.session import get_session
+
+
+def test_user_cache_bounds_and_expiry():
+    cache = UserCache(max_entries=2, ttl_seconds=60)
+    cache.set("t1", {"id": 1, "email": "a"})
+    cache.set("t2", {"id": 2, "email": "b"})
+    assert cache.get("t1")["email"] == "a"
+    cache.set("t3", {"id": 1, "email": "a"})
+    # t2 was least recently used
+    assert cache.get("t2") is None
+    assert len(cache) == 2
+
+    cache.invalidate_user(1)
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Entries never outlive the token
+    cache.set("expired", {"id": 3}, token_expires_at=time.time() - 1)
+    assert cache.get("expired") is None
+    assert not UserCache(max_entries=10, ttl_seconds=0).enabled
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_until_updated(test_session, test_engine):
+    """
+    Test that repeat requests skip the user lookup and that updates invalidate it.
+    """
+    app.dependency_overrides[get_session] = lambda: test_session
+
+    user = User(email="cached@example.com", auth_provider="local")
+    test_session.add(user)
+    await test_session.commit()
+    await test_session.refresh(user)
+    headers = {"Authorization": f"Bearer {jwt.create_access_token(data={'sub': str(user.id)})}"}
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/v1/users/me", headers=headers)
+        assert response.json()["email"] == "cached@example.com"
+        hits = user_cache.hits
+
+        test_session.expunge_all()
+        event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            response = await ac.get("/api/v1/users/me", headers=headers)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+        assert response.json()["email"] == "cached@example.com"
+        assert user_cache.hits == hits + 1
+        assert statements == []
+
+        user = await test_session.get(User, user.id)
+        user.email = "renamed@example.com"
+        test_session.add(user)
+        await test_session.commit()
+
+        response = await ac.get("/api/v1/users/me", headers=headers)
+        assert response.json()["email"] == "renamed@example.com"
+
+    app.dependency_overrides.clear()
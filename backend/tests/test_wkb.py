@@ -0,0 +1,71 @@
+import struct
+import pytest
+from sqlmodel import select
+from app.models.user import User
+from app.db.layer_tables import get_data_table
+from app.services.geometry import GeometryError, parse_wkt
+from app.services.wkb import TWKB_MAGIC, decode_geometry, encode_geometry, parse_twkb, parse_wkb, to_twkb, to_wkb
+
+GEOMETRIES = [
+    "POINT (1.5 -2)",
+    "POINT Z (1 2 3)",
+    "LINESTRING (0 0, 10 10, 20 5)",
+    "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0), (2 2, 2 4, 4 4, 2 2))",
+    "MULTIPOINT ((0 0), (1 1))",
+    "MULTILINESTRING ((0 0, 1 1), (2 2, 3 3))",
+    "MULTIPOLYGON (((0 0, 10 0, 10 10, 0 0)), ((20 20, 30 20, 30 30, 20 20)))",
+    "GEOMETRYCOLLECTION (POINT (1 1), LINESTRING (0 0, 1 1))",
+]
+
+
+@pytest.mark.parametrize("wkt", GEOMETRIES)
+def test_wkb_round_trip(wkt):
+    geometry = parse_wkt(wkt)
+    assert parse_wkb(to_wkb(geometry)) == geometry
+    assert decode_geometry(encode_geometry(geometry, "wkb")) == geometry
+
+
+@pytest.mark.parametrize("wkt", [g for g in GEOMETRIES if " Z " not in g])
+def test_twkb_round_trip(wkt):
+    geometry = parse_wkt(wkt)
+    assert parse_twkb(to_twkb(geometry, precision=7)) == geometry
+    stored = encode_geometry(geometry, "twkb")
+    assert stored.startswith(TWKB_MAGIC)
+    assert decode_geometry(stored) == geometry
+    # Delta-encoded varints are much smaller than 16 bytes per position
+    assert len(stored) < len(to_wkb(geometry))
+
+
+def test_twkb_rounds_to_precision():
+    geometry = parse_twkb(to_twkb({"type": "Point", "coordinates": [1.23456789, -0.987654321]}, precision=3))
+    assert geometry == {"type": "Point", "coordinates": [1.235, -0.988]}
+    # 3D geometries are always stored as exact WKB
+    assert not encode_geometry(parse_wkt("POINT Z (1 2 3)"), "twkb").startswith(TWKB_MAGIC)
+
+
+def test_parse_ewkb_and_big_endian():
+    # PostGIS EWKB: Z flag and SRID 4326, big-endian
+    data = struct.pack(">BII3d", 0, 0x80000001 | 0x20000000, 4326, 1.0, 2.0, 3.0)
+    assert parse_wkb(data) == {"type": "Point", "coordinates": [1.0, 2.0, 3.0]}
+    # ISO WKB with M (2001): the measure is dropped
+    data = struct.pack("<BI3d", 1, 2001, 1.0, 2.0, 9.0)
+    assert parse_wkb(data) == {"type": "Point", "coordinates": [1.0, 2.0]}
+    with pytest.raises(GeometryError):
+        parse_wkb(b"\x01\x02\x00\x00\x00\x05")
+
+
+@pytest.mark.asyncio
+async def test_layer_table_stores_wkb(test_session, make_layer):
+    """
+    Test that layer data tables hold binary geometries.
+    """
+    owner = User(email="wkb@example.com", auth_provider="local")
+    test_session.add(owner)
+    await test_session.commit()
+    await test_session.refresh(owner)
+
+    layer = await make_layer(owner, features=[("POLYGON ((0 0, 1 0, 1 1, 0 0))", {})])
+    table = get_data_table(layer.data_table)
+    geom = (await test_session.exec(select(table.c.geom))).one()
+    assert isinstance(geom, bytes)
+    assert decode_geometry(geom) == parse_wkt("POLYGON ((0 0, 1 0, 1 1, 0 0))")